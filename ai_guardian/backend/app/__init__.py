@@ -12,6 +12,21 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(camera_bp)
     
+    # Push metric snapshots and new alerts to dashboards instead of having them poll
+    from app.config.settings import Config
+    from app.routes import registry, build_status
+    from app.utils.event_publisher import EventPublisher
+    publisher = EventPublisher(
+        socketio,
+        snapshot=lambda worker: build_status(worker, include_frame=False),
+        get_worker=registry.get,
+        min_interval=Config.EVENT_MIN_INTERVAL,
+        max_alerts=Config.EVENT_CLIENT_QUEUE_SIZE,
+        default_patient_id=Config.DEFAULT_PATIENT_ID
+    )
+    registry.add_listener(publisher.on_monitor_update)
+    app.extensions['event_publisher'] = publisher
+    
     return app, socketio
 
 app, socketio = create_app()
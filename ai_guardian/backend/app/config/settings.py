@@ -10,10 +10,16 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
     
     # Camera settings
-    CAMERA_INDEX = 0
+    CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', 0))
     FRAME_WIDTH = 640
     FRAME_HEIGHT = 480
     FPS = 30
+    CAPTURE_THREADED = True  # capture on a background thread, keep only the newest frame
+    CAPTURE_GRAB_ON_SKIP = False  # grab() without decoding frames nobody waits for
+    JPEG_QUALITY = 95  # live feed encoding, done once per processed frame
+    STREAM_MAX_FPS = 15  # default per-client cap for the MJPEG live feed
+    EVENT_MIN_INTERVAL = 0.5  # seconds between pushed metric snapshots per patient
+    EVENT_CLIENT_QUEUE_SIZE = 50  # alerts held per Socket.IO client before the oldest are dropped
     
     # Alert thresholds
     FALL_CONFIDENCE_THRESHOLD = 0.6
@@ -23,9 +29,82 @@ class Config:
     HEART_RATE_MAX = 150
     BREATHING_RATE_MIN = 8
     BREATHING_RATE_MAX = 25
+    TREMOR_WINDOW_SIZE = 64  # frames of hand landmarks per spectral estimate
+    TREMOR_BAND_HZ = (4.0, 12.0)  # pathological tremor band (capped at half the frame rate)
+    TREMOR_REFERENCE_AMPLITUDE = 0.03  # band RMS displacement, as a fraction of hand size, scored 1.0
+    BREATHING_FLOW_MODE = 'roi'  # 'full' (whole frame), 'roi' (chest only, downscaled) or 'lk' (sparse)
+    BREATHING_PYRAMID_LEVEL = 2  # chest flow computed at 1/2**level resolution
     
-    # Model paths
+    # Face localisation (shared by heart rate and skin colour analysis)
+    FACE_REDETECT_INTERVAL = 10  # frames tracked between full cascade passes
+    FACE_TRACK_MIN_SCORE = 0.6
+    
+    # Multi-patient monitoring
+    DEFAULT_PATIENT_ID = 'P001'
+    MAX_MONITORS = 16
+    RESOURCE_WINDOW_SECONDS = 60  # CPU utilisation behind the bed-capacity estimate is measured over this
+    MONITOR_MAX_FPS = 20
+    REGISTRY_DETECTOR_WORKERS = None  # shared detector threads; None = one per core
+    MONITOR_EXECUTION = 'thread'  # 'thread' or 'process' (worker pool, shared-memory frames)
+    MONITOR_POOL_WORKERS = None  # worker processes; None = one per core
+    MONITOR_POOL_MAX_RESTARTS = 3  # worker crashes a stream survives before it is marked failed
+    SHARED_FRAME_SLOTS = 3
+    
+    # Detector execution
+    PARALLEL_DETECTORS = True  # run independent detectors on a thread pool
+    DETECTOR_WORKERS = 5
+    
+    # Object detection runtime: 'ultralytics' (PyTorch), 'onnx' or 'onnx-int8' (ONNX Runtime on CPU).
+    # ONNX files (see Model paths) are exported/quantised from YOLO_MODEL_PATH on first use if missing.
+    OBJECT_BACKEND = os.getenv('OBJECT_BACKEND', 'ultralytics')
+    OBJECT_ONNX_PROVIDERS = ['CPUExecutionProvider']  # e.g. ['OpenVINOExecutionProvider'] with onnxruntime-openvino
+    
+    # Cross-stream object detection: one YOLO call per batch of frames from all monitors
+    OBJECT_BATCHING = True
+    OBJECT_BATCH_MAX_SIZE = 8
+    OBJECT_BATCH_MAX_WAIT = 0.01  # seconds to wait for other streams after the first frame
+    OBJECT_BATCH_TIMEOUT = 2.0  # seconds a frame waits for its batch before detection is skipped
+    
+    # Alert/risk rules for all monitors of the node are evaluated in one vectorised pass per tick
+    ALERT_TICK_INTERVAL = 0.1  # seconds; a few frames at MONITOR_MAX_FPS
+    
+    # Re-raising the same alert type for a patient: minimum gap, plus a token bucket
+    # (burst, tokens/s). Suppressed re-raises reopen the previous alert and count as repeats.
+    ALERT_COOLDOWN_SECONDS = 30.0
+    ALERT_COOLDOWNS = {'DANGEROUS_OBJECT': 10.0}  # per alert type overrides
+    ALERT_BUCKET_SIZE = 3
+    ALERT_BUCKET_RATE = 1 / 60
+    
+    # Detector rates in Hz (None = every frame). Pose always runs since it gates
+    # the others; rPPG, breathing and tremor buffers assume the full frame rate.
+    DETECTOR_RATES = {
+        'tremor': None,
+        'face': None,
+        'heart_rate': None,
+        'breathing': None,
+        'objects': 2.0,
+        'health_color': 1.0,
+    }
+    
+    # Seed for the detectors' random variation; session replays use the recorded seed
+    RANDOM_SEED = None
+    
+    # Session history retention (per patient, in records)
+    METRICS_HISTORY_SIZE = 36000  # ~30 min at 20 fps
+    ALERT_HISTORY_SIZE = 10000
+    HISTORY_SPILL_BATCH = 500  # evicted metric records handed to the spill hook at once
+    METRICS_STORE_MAX_ROWS = 432000  # columnar metric samples kept in memory (~6 h at 20 fps)
+    
+    # On-disk metric persistence (segment files, written off the frame thread)
+    METRICS_PERSIST = True
+    METRICS_LOG_DIR = os.getenv('METRICS_LOG_DIR', 'logs/metrics')
+    SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+    SEGMENT_MAX_SECONDS = 3600
+    
+    # Model paths; the ONNX exports live next to the YOLO weights they came from
     YOLO_MODEL_PATH = 'models/yolov8n.pt'
+    OBJECT_ONNX_PATH = os.path.splitext(YOLO_MODEL_PATH)[0] + '.onnx'
+    OBJECT_ONNX_INT8_PATH = os.path.splitext(YOLO_MODEL_PATH)[0] + '-int8.onnx'
     
     # Alert levels
     ALERT_LEVELS = {
@@ -1,19 +1,35 @@
 import cv2
 import numpy as np
-from typing import Dict
-from collections import deque
+from typing import Dict, Tuple
+from app.utils.frame_context import FrameContext
+from app.models.pose_landmarks import Joint, X, Y, VISIBILITY, SHOULDERS, HIPS, as_landmark_array
+from app.utils.spectral import SlidingDFT
 
 class BreathingDetector:
     """Detects breathing patterns and sleep apnea using optical flow"""
     
-    def __init__(self, window_size: int = 150, fps: int = 30):
+    MODES = ('full', 'roi', 'lk')
+    
+    def __init__(self, window_size: int = 150, fps: int = 30, mode: str = 'full',
+                 pyramid_level: int = 2, max_points: int = 40):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown breathing flow mode {mode!r}; expected one of {self.MODES}')
+        
         self.window_size = window_size
         self.fps = fps
-        self.chest_motion_history = deque(maxlen=window_size)
+        # 'full': dense flow over the whole frame; 'roi': dense flow on the chest only,
+        # downscaled by 2**pyramid_level; 'lk': sparse Lucas-Kanade on torso points
+        self.mode = mode
+        self.pyramid_level = pyramid_level if mode != 'full' else 0
+        self.max_points = max_points
+        # Breathing typically occurs at 0.1-0.5 Hz
+        self.chest_motion_history = SlidingDFT(window_size, fps, 0.1, 0.5)
         self.prev_frame = None
+        self.prev_points = None
         
-    def detect_breathing(self, frame: np.ndarray) -> Dict:
-        """Detect breathing patterns"""
+    def detect_breathing(self, frame: np.ndarray, context: FrameContext = None,
+                         landmarks: np.ndarray = None) -> Dict:
+        """Detect breathing patterns; pose landmarks, if given, place the chest region"""
         result = {
             'breathing_rate': 0,
             'breathing_detected': False,
@@ -21,25 +37,23 @@ class BreathingDetector:
             'chest_motion': 0.0
         }
         
-        if self.prev_frame is None:
-            self.prev_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            return result
-        
-        # Calculate optical flow
-        current_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        flow = cv2.calcOpticalFlowFarneback(
-            self.prev_frame, current_gray, None, 0.5, 3, 15, 3, 5, 1.2, 0
-        )
+        current_gray = FrameContext.of(frame, context).gray_pyramid(self.pyramid_level)
         
-        # Extract chest region (approximate center-left area)
-        h, w = flow.shape[:2]
-        chest_region = flow[h//3:2*h//3, w//4:3*w//4]
+        if self.prev_frame is None or self.prev_frame.shape != current_gray.shape:
+            self.prev_frame = current_gray
+            self.prev_points = None
+            return result
         
-        # Calculate motion magnitude in chest region
-        motion_magnitude = np.sqrt(
-            chest_region[:,:,0]**2 + chest_region[:,:,1]**2
-        )
-        mean_motion = np.mean(motion_magnitude)
+        if self.mode == 'full':
+            mean_motion = self._full_frame_motion(current_gray)
+        else:
+            x, y, w, h = self._chest_roi(current_gray.shape, landmarks)
+            if self.mode == 'roi':
+                mean_motion = self._roi_motion(current_gray, x, y, w, h)
+            else:
+                mean_motion = self._sparse_motion(current_gray, x, y, w, h)
+            # Report motion in full-resolution pixels whatever the level
+            mean_motion *= 2 ** self.pyramid_level
         
         self.chest_motion_history.append(mean_motion)
         result['chest_motion'] = mean_motion
@@ -56,33 +70,97 @@ class BreathingDetector:
         self.prev_frame = current_gray
         return result
     
-    def _calculate_breathing_rate(self) -> float:
-        """Calculate breathing rate from motion history"""
-        if len(self.chest_motion_history) < 60:
-            return 0.0
-        
-        signal = np.array(list(self.chest_motion_history))
+    def _full_frame_motion(self, current_gray: np.ndarray) -> float:
+        """Dense flow over the whole frame, averaged over a fixed central crop"""
+        flow = cv2.calcOpticalFlowFarneback(
+            self.prev_frame, current_gray, None, 0.5, 3, 15, 3, 5, 1.2, 0
+        )
         
-        # Normalize
-        if np.std(signal) == 0:
-            return 0.0
+        # Extract chest region (approximate center-left area)
+        h, w = flow.shape[:2]
+        chest_region = flow[h//3:2*h//3, w//4:3*w//4]
         
-        signal = (signal - np.mean(signal)) / np.std(signal)
+        # Calculate motion magnitude in chest region
+        motion_magnitude = np.sqrt(
+            chest_region[:,:,0]**2 + chest_region[:,:,1]**2
+        )
+        return float(np.mean(motion_magnitude))
+    
+    def _roi_motion(self, current_gray: np.ndarray, x: int, y: int, w: int, h: int) -> float:
+        """Dense flow computed on the chest region only"""
+        prev_roi = self.prev_frame[y:y+h, x:x+w]
+        roi = current_gray[y:y+h, x:x+w]
         
-        # Simple peak detection for breathing cycles
-        # Breathing typically occurs at 0.1-0.5 Hz
-        fft = np.fft.fft(signal)
-        freqs = np.fft.fftfreq(len(signal), 1.0 / self.fps)
+        # The image is already downscaled, so fewer flow levels and a smaller window suffice
+        flow = cv2.calcOpticalFlowFarneback(
+            prev_roi, roi, None, 0.5, 2, max(15 >> self.pyramid_level, 5), 3, 5, 1.2, 0
+        )
+        return float(np.mean(np.sqrt(flow[:,:,0]**2 + flow[:,:,1]**2)))
+    
+    def _sparse_motion(self, current_gray: np.ndarray, x: int, y: int, w: int, h: int) -> float:
+        """Lucas-Kanade tracking of corner points on the torso"""
+        # Re-seed when tracking has lost too many points
+        if self.prev_points is None or len(self.prev_points) < self.max_points // 2:
+            mask = np.zeros_like(self.prev_frame)
+            mask[y:y+h, x:x+w] = 255
+            self.prev_points = cv2.goodFeaturesToTrack(
+                self.prev_frame, maxCorners=self.max_points, qualityLevel=0.01,
+                minDistance=3, mask=mask
+            )
+            if self.prev_points is None:
+                return 0.0
+        
+        points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_frame, current_gray, self.prev_points, None, winSize=(15, 15), maxLevel=2
+        )
+        tracked = status.reshape(-1) == 1
+        if not np.any(tracked):
+            self.prev_points = None
+            return 0.0
         
-        # Get positive frequencies in breathing range
-        idx = np.where((freqs > 0.1) & (freqs < 0.5))[0]
+        displacement = (points - self.prev_points).reshape(-1, 2)[tracked]
+        self.prev_points = points[tracked].reshape(-1, 1, 2)
+        return float(np.mean(np.sqrt(displacement[:, 0]**2 + displacement[:, 1]**2)))
+    
+    def _chest_roi(self, shape: Tuple[int, int], landmarks: np.ndarray = None) -> Tuple[int, int, int, int]:
+        """Chest box (x, y, w, h) in image coordinates: shoulders down towards the hips"""
+        h, w = shape[:2]
+        fallback = (w // 4, h // 3, w // 2, h // 3)
+        landmarks = as_landmark_array(landmarks) if landmarks is not None else None
+        if landmarks is None or len(landmarks) <= Joint.RIGHT_HIP:
+            return fallback
+        
+        shoulders, hips = landmarks[SHOULDERS], landmarks[HIPS]
+        if shoulders[:, VISIBILITY].min() < 0.5:
+            return fallback
+        
+        x1, x2 = shoulders[:, X].min(), shoulders[:, X].max()
+        top = shoulders[:, Y].mean()
+        if hips[:, VISIBILITY].min() >= 0.5:
+            torso = hips[:, Y].mean() - top
+        else:
+            torso = 1.5 * (x2 - x1)  # hips out of view: estimate from shoulder width
+        
+        # Upper 60% of the torso covers the chest and upper abdomen
+        x1, x2 = int(x1 * w), int(x2 * w)
+        y1, y2 = int(top * h), int((top + 0.6 * torso) * h)
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, w), min(y2, h)
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return fallback
+        return x1, y1, x2 - x1, y2 - y1
+    
+    def _calculate_breathing_rate(self) -> float:
+        """Calculate breathing rate from motion history"""
+        if len(self.chest_motion_history) < 60:
+            return 0.0
         
-        if len(idx) == 0:
+        # Flat signal: no breathing motion at all
+        if self.chest_motion_history.std == 0:
             return 0.0
         
-        power = np.abs(fft[idx]) ** 2
-        dominant_freq_idx = np.argmax(power)
-        dominant_freq = freqs[idx][dominant_freq_idx]
+        # Dominant frequency of the incrementally updated band spectrum
+        dominant_freq, _ = self.chest_motion_history.dominant()
         
         # Convert to breaths per minute
         breathing_rate = dominant_freq * 60
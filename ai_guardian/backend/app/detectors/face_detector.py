@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+import threading
+from typing import Optional, Tuple
+from app.utils.frame_context import FrameContext
+
+class FaceDetector:
+    """Localises the patient's face once per frame and tracks it between re-detections"""
+
+    def __init__(self, redetect_interval: int = 10, min_track_score: float = 0.6,
+                 search_margin: float = 0.25):
+        # Load the Haar cascade once instead of on every frame
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+        self.redetect_interval = redetect_interval
+        self.min_track_score = min_track_score
+        self.search_margin = search_margin
+
+        self.face_region = None
+        self.tracked = False
+        self._template = None
+        self._frames_since_detection = 0
+        self._last_frame = None
+        self._lock = threading.Lock()
+
+    def detect_face(self, frame: np.ndarray, context: FrameContext = None) -> Optional[Tuple]:
+        """Return the face box (x, y, w, h) for this frame, or None if no face is found"""
+        # Several detectors may ask about the same frame, possibly concurrently;
+        # localise it only once
+        with self._lock:
+            if frame is not self._last_frame:
+                self._localise(FrameContext.of(frame, context).gray)
+                self._last_frame = frame
+            return self.face_region
+
+    def _localise(self, gray: np.ndarray):
+        """Update face_region for a new frame"""
+        # Track the previous box cheaply until the next periodic re-detection
+        if self._template is not None and self._frames_since_detection < self.redetect_interval:
+            region = self._track(gray)
+            if region is not None:
+                self._frames_since_detection += 1
+                self.face_region = region
+                self.tracked = True
+                return
+
+        self.face_region = self._detect(gray)
+        self.tracked = False
+
+    def reset(self):
+        """Forget the tracked face so the next frame runs a full detection"""
+        self.face_region = None
+        self.tracked = False
+        self._template = None
+        self._frames_since_detection = 0
+        self._last_frame = None
+
+    def _detect(self, gray: np.ndarray) -> Optional[Tuple]:
+        """Run the full-frame cascade and remember the face as the tracking template"""
+        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+
+        if len(faces) == 0:
+            self._template = None
+            return None
+
+        x, y, w, h = (int(v) for v in faces[0])
+        self._template = gray[y:y+h, x:x+w].copy()
+        self._frames_since_detection = 0
+        return (x, y, w, h)
+
+    def _track(self, gray: np.ndarray) -> Optional[Tuple]:
+        """Find the face template in a window around its last position"""
+        x, y, w, h = self.face_region
+        frame_h, frame_w = gray.shape[:2]
+
+        # Search only a margin around the previous box
+        mx = int(w * self.search_margin)
+        my = int(h * self.search_margin)
+        x0, y0 = max(x - mx, 0), max(y - my, 0)
+        x1, y1 = min(x + w + mx, frame_w), min(y + h + my, frame_h)
+        search = gray[y0:y1, x0:x1]
+
+        th, tw = self._template.shape[:2]
+        if search.shape[0] < th or search.shape[1] < tw:
+            return None
+
+        scores = cv2.matchTemplate(search, self._template, cv2.TM_CCOEFF_NORMED)
+        _, max_score, _, max_loc = cv2.minMaxLoc(scores)
+
+        if max_score < self.min_track_score:
+            return None
+
+        return (x0 + max_loc[0], y0 + max_loc[1], tw, th)
@@ -1,16 +1,19 @@
 import cv2
 import numpy as np
 from typing import Dict, Tuple
+from app.detectors.face_detector import FaceDetector
+from app.utils.frame_context import FrameContext
 
 class HealthColorDetector:
     """Detects health conditions through face color analysis"""
     
-    def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+    def __init__(self, face_detector: FaceDetector = None, seed: int = None):
+        self.face_detector = face_detector
+        # Own generator so a seeded run (e.g. a session replay) is reproducible
+        self.rng = np.random.default_rng(seed)
         
-    def detect_health_indicators(self, frame: np.ndarray) -> Dict:
+    def detect_health_indicators(self, frame: np.ndarray, face_region: Tuple = None,
+                                 context: FrameContext = None) -> Dict:
         """Detect health indicators from face color"""
         result = {
             'diabetes_risk': 0.0,
@@ -19,15 +22,17 @@ class HealthColorDetector:
             'face_detected': False
         }
         
-        # Detect face
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        # Detect face if not provided
+        if face_region is None:
+            if self.face_detector is None:
+                self.face_detector = FaceDetector()
+            face_region = self.face_detector.detect_face(frame, context)
         
-        if len(faces) == 0:
+        if face_region is None:
             return result
         
         result['face_detected'] = True
-        x, y, w, h = faces[0]
+        x, y, w, h = face_region
         face_roi = frame[y:y+h, x:x+w]
         
         # Convert to HSV for better color analysis
@@ -80,8 +85,8 @@ class HealthColorDetector:
             color_status = 'CYANOTIC - Respiratory Risk'
         
         # Add random variation for demonstration
-        diabetes_risk += np.random.normal(0, 0.05)
-        bp_risk += np.random.normal(0, 0.05)
+        diabetes_risk += self.rng.normal(0, 0.05)
+        bp_risk += self.rng.normal(0, 0.05)
         
         diabetes_risk = np.clip(diabetes_risk, 0, 1)
         bp_risk = np.clip(bp_risk, 0, 1)
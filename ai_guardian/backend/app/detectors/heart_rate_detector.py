@@ -1,19 +1,24 @@
 import cv2
 import numpy as np
 from typing import Dict, Tuple
-from collections import deque
+from app.detectors.face_detector import FaceDetector
+from app.utils.frame_context import FrameContext
+from app.utils.spectral import SlidingDFT
 
 class HeartRateDetector:
     """Detects heart rate using rPPG (remote photoplethysmography)"""
     
-    def __init__(self, window_size: int = 150, fps: int = 30):
+    def __init__(self, window_size: int = 150, fps: int = 30, face_detector: FaceDetector = None):
         self.window_size = window_size
         self.fps = fps
-        self.green_channel_history = deque(maxlen=window_size)
+        # Heart rate band: 0.7 Hz - 4 Hz
+        self.green_channel_history = SlidingDFT(window_size, fps, 0.7, 4.0)
         self.last_heart_rate = 0
         self.stress_level = 0.0
+        self.face_detector = face_detector
         
-    def detect_heart_rate(self, frame: np.ndarray, face_region: Tuple = None) -> Dict:
+    def detect_heart_rate(self, frame: np.ndarray, face_region: Tuple = None,
+                          context: FrameContext = None) -> Dict:
         """Detect heart rate from face region"""
         result = {
             'heart_rate': 0,
@@ -24,7 +29,7 @@ class HeartRateDetector:
         
         # Try to detect face if not provided
         if face_region is None:
-            face_region = self._detect_face(frame)
+            face_region = self._detect_face(frame, context)
         
         if face_region is None:
             return result
@@ -56,55 +61,29 @@ class HeartRateDetector:
         
         return result
     
-    def _detect_face(self, frame: np.ndarray) -> Tuple:
-        """Detect face region using cascades"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    def _detect_face(self, frame: np.ndarray, context: FrameContext = None) -> Tuple:
+        """Detect face region using the shared face detector"""
+        # Created lazily so monitors that pass face_region never load a cascade here
+        if self.face_detector is None:
+            self.face_detector = FaceDetector()
         
-        if len(faces) > 0:
-            x, y, w, h = faces[0]
-            return (x, y, w, h)
-        
-        return None
+        return self.face_detector.detect_face(frame, context)
     
     def _calculate_heart_rate(self) -> Tuple[float, float]:
         """Calculate heart rate from green channel history"""
         if len(self.green_channel_history) < 60:
             return 0, 0.0
         
-        signal = np.array(list(self.green_channel_history))
-        
-        # Normalize signal
-        signal = (signal - np.mean(signal)) / np.std(signal)
-        
-        # Apply bandpass filter (0.7 Hz - 4 Hz for heart rate)
-        # Simple FFT-based approach
-        fft = np.fft.fft(signal)
-        freqs = np.fft.fftfreq(len(signal), 1.0 / self.fps)
-        
-        # Get positive frequencies
-        idx = np.where((freqs > 0.7) & (freqs < 4.0))[0]
-        
-        if len(idx) == 0:
+        if self.green_channel_history.std == 0:
             return 0, 0.0
         
-        # Find dominant frequency
-        power = np.abs(fft[idx]) ** 2
-        dominant_freq_idx = np.argmax(power)
-        dominant_freq = freqs[idx][dominant_freq_idx]
+        # Band power is kept up to date sample by sample; normalising the signal
+        # would scale every bin equally, so the peak and its share are unchanged
+        dominant_freq, confidence = self.green_channel_history.dominant()
         
         # Convert frequency to BPM
         heart_rate = dominant_freq * 60
         
-        # Calculate confidence
-        if len(power) > 0:
-            confidence = power[dominant_freq_idx] / np.sum(power)
-        else:
-            confidence = 0.0
-        
         return heart_rate, confidence
     
     def _calculate_stress_level(self, heart_rate: float) -> float:
@@ -0,0 +1,180 @@
+import os
+import ast
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Detections are plain dicts: {'class': name, 'confidence': float, 'bbox': [x1, y1, x2, y2]}
+BACKENDS = ('ultralytics', 'onnx', 'onnx-int8')
+
+class UltralyticsBackend:
+    """YOLO through the Ultralytics PyTorch runtime"""
+
+    def __init__(self, model_path: str = None, confidence_threshold: float = 0.5):
+        from ultralytics import YOLO
+        # Try to load model, fallback to nano if full model not available
+        try:
+            self.model = YOLO(model_path or 'yolov8n.pt')
+        except:
+            self.model = YOLO('yolov8n.pt')
+        self.confidence_threshold = confidence_threshold
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        results = self.model(frames, conf=self.confidence_threshold, verbose=False)
+        return [self._parse(result) for result in results]
+
+    def _parse(self, result) -> List[Dict]:
+        detections = []
+        if result.boxes is None:
+            return detections
+        for box in result.boxes:
+            class_id = int(box.cls[0])
+            detections.append({
+                'class': result.names[class_id],
+                'confidence': float(box.conf[0]),
+                'bbox': box.xyxy[0].tolist()
+            })
+        return detections
+
+class OnnxBackend:
+    """YOLOv8 exported to ONNX, run on CPU with ONNX Runtime (FP32 or INT8-quantised)"""
+
+    def __init__(self, model_path: str, confidence_threshold: float = 0.5, iou_threshold: float = 0.45,
+                 providers: List[str] = None, input_size: int = 640):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=providers or ['CPUExecutionProvider']
+        )
+        self.confidence_threshold = confidence_threshold
+        self.iou_threshold = iou_threshold
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Spatial axes are symbolic in dynamic exports; fall back to the export size
+        height, width = model_input.shape[2], model_input.shape[3]
+        self.input_size = (
+            height if isinstance(height, int) else input_size,
+            width if isinstance(width, int) else input_size
+        )
+        # Exported with dynamic=True the batch axis is symbolic; otherwise frames go one by one
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+        # Ultralytics stores the class names in the model metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        prepared = [self._letterbox(frame) for frame in frames]
+        if self.dynamic_batch:
+            blob = np.stack([image for image, _, _ in prepared])
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: image[None]})[0] for image, _, _ in prepared
+            ])
+
+        return [
+            self._decode(output, scale, pad, frame.shape[:2])
+            for output, (_, scale, pad), frame in zip(outputs, prepared, frames)
+        ]
+
+    def _letterbox(self, frame: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        """Resize keeping aspect ratio, pad to the model size; returns CHW float32 RGB"""
+        height, width = self.input_size
+        h, w = frame.shape[:2]
+        scale = min(height / h, width / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        left = int(round((width - new_w) / 2 - 0.1))
+        top = int(round((height - new_h) / 2 - 0.1))
+
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        padded = cv2.copyMakeBorder(
+            resized, top, height - new_h - top, left, width - new_w - left,
+            cv2.BORDER_CONSTANT, value=(114, 114, 114)
+        )
+        image = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        return np.ascontiguousarray(image, dtype=np.float32) / 255.0, scale, (left, top)
+
+    def _decode(self, output: np.ndarray, scale: float, pad: Tuple[int, int],
+                shape: Tuple[int, int]) -> List[Dict]:
+        """(4 + classes, anchors) YOLOv8 head -> detections in frame coordinates"""
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        class_ids = np.argmax(class_scores, axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+
+        keep = confidences >= self.confidence_threshold
+        if not np.any(keep):
+            return []
+        boxes, class_ids, confidences = predictions[keep, :4], class_ids[keep], confidences[keep]
+
+        # Centre/size to corners, then undo the letterbox
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+        xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / scale
+        xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / scale
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+
+        # Per-class NMS: offset each class so boxes of different classes never overlap
+        offset = class_ids[:, None] * 4096.0
+        rects = np.concatenate([xyxy[:, :2] + offset, xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), confidences.tolist(),
+                                   self.confidence_threshold, self.iou_threshold)
+
+        return [
+            {
+                'class': self.names.get(int(class_ids[i]), str(int(class_ids[i]))),
+                'confidence': float(confidences[i]),
+                'bbox': xyxy[i].tolist()
+            } for i in np.array(indices).reshape(-1)
+        ]
+
+def export_onnx(model_path: str, onnx_path: str) -> str:
+    """Export an Ultralytics model to ONNX with a dynamic batch axis"""
+    from ultralytics import YOLO
+    exported = YOLO(model_path or 'yolov8n.pt').export(format='onnx', dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(onnx_path):
+        os.makedirs(os.path.dirname(onnx_path) or '.', exist_ok=True)
+        os.replace(exported, onnx_path)
+    return onnx_path
+
+def quantize_onnx(onnx_path: str, int8_path: str) -> str:
+    """Dynamic INT8 quantisation of the ONNX weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+def create_backend(name: str = 'ultralytics', model_path: str = None, onnx_path: str = 'yolov8n.onnx',
+                   int8_path: str = 'yolov8n-int8.onnx', confidence_threshold: float = 0.5,
+                   providers: List[str] = None):
+    """Build the configured backend, exporting/quantising ONNX files on first use.
+    An ONNX backend that cannot be built falls back to Ultralytics. Returns None when
+    no backend can be loaded, so callers run without object detection."""
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown object detection backend {name!r}; expected one of {BACKENDS}')
+
+    if name != 'ultralytics':
+        try:
+            if not os.path.exists(onnx_path):
+                export_onnx(model_path, onnx_path)
+            path = onnx_path
+            if name == 'onnx-int8':
+                if not os.path.exists(int8_path):
+                    quantize_onnx(onnx_path, int8_path)
+                path = int8_path
+            return OnnxBackend(path, confidence_threshold, providers=providers)
+        except Exception as e:
+            # Missing weights, a failed export or an onnxruntime session error
+            print(f"⚠️ Object detection backend '{name}' unavailable ({e}); falling back to 'ultralytics'")
+
+    try:
+        return UltralyticsBackend(model_path, confidence_threshold)
+    except ImportError as e:
+        print(f"⚠️ Object detection backend 'ultralytics' unavailable: {e}")
+    except Exception as e:
+        print(f"⚠️ Object detection model {model_path!r} could not be loaded: {e}")
+    return None
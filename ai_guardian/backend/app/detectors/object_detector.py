@@ -1,28 +1,45 @@
 import cv2
 import numpy as np
 from typing import List, Tuple, Dict
+from app.detectors.object_backends import create_backend
+from app.utils.batch_inference import BatchInferenceService
+
+def create_batch_service(backend: str = 'ultralytics', max_batch_size: int = 8, max_wait: float = 0.01,
+                         timeout: float = 5.0, **backend_options) -> BatchInferenceService:
+    """One object model serving batched requests from every monitor, or None if unavailable"""
+    model = create_backend(backend, **backend_options)
+    if model is None:
+        return None
+    return BatchInferenceService(
+        model.detect_batch,
+        max_batch_size=max_batch_size,
+        max_wait=max_wait,
+        name='objects',
+        timeout=timeout
+    )
 
 class ObjectDetector:
     """Detects dangerous objects using YOLO"""
     
-    def __init__(self, model_path: str = None):
-        try:
-            from ultralytics import YOLO
-            self.yolo_available = True
-            # Try to load model, fallback to nano if full model not available
-            try:
-                self.model = YOLO(model_path or 'yolov8n.pt')
-            except:
-                self.model = YOLO('yolov8n.pt')
-        except ImportError:
-            self.yolo_available = False
-            self.model = None
-        
+    def __init__(self, model_path: str = None, inference_service: BatchInferenceService = None,
+                 backend: str = 'ultralytics', **backend_options):
         # Dangerous objects to detect
         self.dangerous_objects = ['knife', 'scissors', 'gun', 'weapon', 'bottle']
         self.confidence_threshold = 0.5
         
-    def detect_objects(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict]:
+        # With a shared service, frames join cross-stream batches and no model is loaded here
+        self.inference_service = inference_service
+        if inference_service is not None:
+            self.model = None
+            self.yolo_available = True
+        else:
+            self.model = create_backend(
+                backend, model_path=model_path,
+                confidence_threshold=self.confidence_threshold, **backend_options
+            )
+            self.yolo_available = self.model is not None
+        
+    def detect_objects(self, frame: np.ndarray, draw: bool = True) -> Tuple[np.ndarray, Dict]:
         """Detect objects in frame"""
         detected_objects = {
             'dangerous_objects': [],
@@ -30,43 +47,34 @@ class ObjectDetector:
             'has_danger': False
         }
         
-        if not self.yolo_available or self.model is None:
+        if not self.yolo_available:
             return frame, detected_objects
         
         try:
-            results = self.model(frame, conf=self.confidence_threshold, verbose=False)
+            # Every backend returns the same {'class', 'confidence', 'bbox'} dicts
+            if self.inference_service is not None:
+                detections = self.inference_service.predict(frame)
+            else:
+                detections = self.model.detect_batch([frame])[0]
             
-            if results and len(results) > 0:
-                result = results[0]
+            for detection in detections:
+                detected_objects['all_detections'].append(detection)
                 
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        class_id = int(box.cls[0])
-                        class_name = result.names[class_id]
-                        confidence = float(box.conf[0])
-                        
-                        detection = {
-                            'class': class_name,
-                            'confidence': confidence,
-                            'bbox': box.xyxy[0].tolist()
-                        }
-                        
-                        detected_objects['all_detections'].append(detection)
-                        
-                        # Check if it's a dangerous object
-                        if any(danger in class_name.lower() for danger in self.dangerous_objects):
-                            detected_objects['dangerous_objects'].append(detection)
-                            detected_objects['has_danger'] = True
-                            
-            # Draw detections
-            frame = self._draw_detections(frame, detected_objects)
+                # Check if it's a dangerous object
+                if any(danger in detection['class'].lower() for danger in self.dangerous_objects):
+                    detected_objects['dangerous_objects'].append(detection)
+                    detected_objects['has_danger'] = True
+            
+            # Draw detections (callers sharing the frame draw later instead)
+            if draw:
+                frame = self.draw_detections(frame, detected_objects)
             
         except Exception as e:
             print(f"Error in object detection: {e}")
         
         return frame, detected_objects
     
-    def _draw_detections(self, frame: np.ndarray, detections: Dict) -> np.ndarray:
+    def draw_detections(self, frame: np.ndarray, detections: Dict) -> np.ndarray:
         """Draw detection boxes on frame"""
         # Draw dangerous objects in red
         for detection in detections['dangerous_objects']:
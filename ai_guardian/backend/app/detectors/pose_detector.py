@@ -1,7 +1,12 @@
 import cv2
 import numpy as np
 import mediapipe as mp
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict
+from app.models.pose_landmarks import (
+    NOSE, LEFT_WRIST, NUM_LANDMARKS, X, Y, VISIBILITY, SHOULDERS, HIPS, WRISTS,
+    as_landmark_array, empty_landmarks, landmarks_from_mediapipe
+)
+from app.utils.frame_context import FrameContext
 
 class PoseDetector:
     """Detects human pose using MediaPipe"""
@@ -16,20 +21,15 @@ class PoseDetector:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         
-    def detect_pose(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict]:
-        """Detect pose landmarks in frame"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def detect_pose(self, frame: np.ndarray, context: FrameContext = None) -> Tuple[np.ndarray, Dict]:
+        """Detect pose landmarks in frame; landmarks are a (33, 4) [x, y, z, visibility] array"""
+        rgb_frame = FrameContext.of(frame, context).rgb
         results = self.pose.process(rgb_frame)
         
-        landmarks = []
         if results.pose_landmarks:
-            for landmark in results.pose_landmarks.landmark:
-                landmarks.append({
-                    'x': landmark.x,
-                    'y': landmark.y,
-                    'z': landmark.z,
-                    'visibility': landmark.visibility
-                })
+            landmarks = landmarks_from_mediapipe(results.pose_landmarks)
+        else:
+            landmarks = empty_landmarks()
         
         return frame, {
             'landmarks': landmarks,
@@ -38,26 +38,17 @@ class PoseDetector:
     
     def draw_pose(self, frame: np.ndarray, pose_data: Dict) -> np.ndarray:
         """Draw pose landmarks on frame"""
-        if not pose_data['landmarks']:
+        landmarks = as_landmark_array(pose_data['landmarks'])
+        if len(landmarks) == 0:
             return frame
         
-        # Reconstruct landmarks for drawing
-        class LandmarkData:
-            def __init__(self, x, y, z, visibility):
-                self.x = x
-                self.y = y
-                self.z = z
-                self.visibility = visibility
-        
-        h, w, c = frame.shape
         landmarks_proto = mp.framework.formats.landmark_pb2.NormalizedLandmarkList()
-        
-        for landmark_dict in pose_data['landmarks']:
+        for x, y, z, visibility in landmarks.tolist():
             landmark = landmarks_proto.landmark.add()
-            landmark.x = landmark_dict['x']
-            landmark.y = landmark_dict['y']
-            landmark.z = landmark_dict['z']
-            landmark.visibility = landmark_dict['visibility']
+            landmark.x = x
+            landmark.y = y
+            landmark.z = z
+            landmark.visibility = visibility
         
         self.mp_drawing.draw_landmarks(
             frame,
@@ -67,92 +58,86 @@ class PoseDetector:
         
         return frame
     
-    def calculate_angle(self, point1: Dict, point2: Dict, point3: Dict) -> float:
-        """Calculate angle between three points"""
-        x1, y1 = point1['x'], point1['y']
-        x2, y2 = point2['x'], point2['y']
-        x3, y3 = point3['x'], point3['y']
-        
-        angle = np.arctan2(y3 - y2, x3 - x2) - np.arctan2(y1 - y2, x1 - x2)
+    def calculate_angle(self, point1: np.ndarray, point2: np.ndarray, point3: np.ndarray) -> np.ndarray:
+        """Calculate angle at point2 between three landmark rows (or stacks of rows)"""
+        angle = (np.arctan2(point3[..., Y] - point2[..., Y], point3[..., X] - point2[..., X]) -
+                 np.arctan2(point1[..., Y] - point2[..., Y], point1[..., X] - point2[..., X]))
         return np.abs(np.degrees(angle))
     
-    def detect_fall_risk(self, landmarks: List[Dict]) -> float:
+    # The rules below take one (33, 4) frame or a (T, 33, 4) window and
+    # return a float or a (T,) array respectively
+    
+    def detect_fall_risk(self, landmarks: np.ndarray):
         """Detect fall risk based on pose"""
-        if len(landmarks) < 32:
-            return 0.0
-        
-        # Get key joints
-        nose = landmarks[0]
-        left_shoulder = landmarks[11]
-        right_shoulder = landmarks[12]
-        left_hip = landmarks[23]
-        right_hip = landmarks[24]
-        left_ankle = landmarks[27]
-        right_ankle = landmarks[28]
+        landmarks = as_landmark_array(landmarks)
+        if landmarks.shape[-2] < NUM_LANDMARKS - 1:
+            return self._no_risk(landmarks)
         
-        # Calculate body angle
-        shoulder_y = (left_shoulder['y'] + right_shoulder['y']) / 2
-        hip_y = (left_hip['y'] + right_hip['y']) / 2
-        ankle_y = (left_ankle['y'] + right_ankle['y']) / 2
+        nose = landmarks[..., NOSE, :]
+        shoulder = (landmarks[..., SHOULDERS[0], :] + landmarks[..., SHOULDERS[1], :]) / 2
+        hip_y = (landmarks[..., HIPS[0], Y] + landmarks[..., HIPS[1], Y]) / 2
         
         # If hip is below shoulders significantly, person is falling
-        if hip_y > shoulder_y + 0.15:
-            return 0.9
-        
+        falling = hip_y > shoulder[..., Y] + 0.15
         # If lying down (nose close to ground)
-        if nose['y'] > 0.8:
-            return 0.85
-        
-        # Check if leaning forward excessively
-        nose_x = nose['x']
-        shoulder_x = (left_shoulder['x'] + right_shoulder['x']) / 2
-        if abs(nose_x - shoulder_x) > 0.15:
-            return 0.6
+        lying = nose[..., Y] > 0.8
+        # Leaning forward excessively
+        leaning = np.abs(nose[..., X] - shoulder[..., X]) > 0.15
         
-        return 0.0
+        # First matching rule wins; boolean masks avoid per-call np.where overhead
+        risk = 0.9 * falling + 0.85 * (~falling & lying) + 0.6 * (~falling & ~lying & leaning)
+        return self._as_result(risk)
     
-    def detect_self_harm_risk(self, landmarks: List[Dict]) -> float:
+    def detect_self_harm_risk(self, landmarks: np.ndarray):
         """Detect potential self-harm actions"""
-        if len(landmarks) < 32:
-            return 0.0
-        
-        nose = landmarks[0]
-        left_wrist = landmarks[15]
-        right_wrist = landmarks[16]
-        left_hand = landmarks[19]
-        right_hand = landmarks[20]
+        landmarks = as_landmark_array(landmarks)
+        if landmarks.shape[-2] < NUM_LANDMARKS - 1:
+            return self._no_risk(landmarks)
         
         # Check if hands are near face/neck
-        face_region = nose['y'] - 0.1
-        
-        hands_near_face = 0
-        if left_wrist['y'] < face_region and left_wrist['visibility'] > 0.5:
-            hands_near_face += 1
-        if right_wrist['y'] < face_region and right_wrist['visibility'] > 0.5:
-            hands_near_face += 1
+        face_region = landmarks[..., NOSE, Y] - 0.1
+        wrists = landmarks[..., WRISTS[0]:WRISTS[1] + 1, :]
+        near_face = (wrists[..., Y] < face_region[..., None]) & (wrists[..., VISIBILITY] > 0.5)
         
-        return min(0.5 * hands_near_face, 1.0)
+        return self._as_result(np.minimum(0.5 * near_face.sum(axis=-1), 1.0))
     
-    def detect_aggressive_motion(self, landmarks: List[Dict], prev_landmarks: List[Dict]) -> float:
-        """Detect aggressive or violent motions"""
-        if not prev_landmarks or len(landmarks) < 32:
-            return 0.0
-        
-        # Calculate motion in arms
-        left_shoulder = landmarks[11]
-        left_wrist = landmarks[15]
-        prev_left_wrist = prev_landmarks[15] if len(prev_landmarks) > 15 else None
-        
-        if not prev_left_wrist:
-            return 0.0
-        
-        # Calculate motion speed
-        motion_x = abs(left_wrist['x'] - prev_left_wrist['x'])
-        motion_y = abs(left_wrist['y'] - prev_left_wrist['y'])
-        motion_speed = np.sqrt(motion_x**2 + motion_y**2)
+    def detect_aggressive_motion(self, landmarks: np.ndarray, prev_landmarks: np.ndarray = None):
+        """Detect aggressive or violent motions from wrist speed between consecutive frames.
+        For a window, frame t is compared with t - 1 and the first frame with prev_landmarks."""
+        landmarks = as_landmark_array(landmarks)
+        prev_landmarks = as_landmark_array(prev_landmarks) if prev_landmarks is not None else None
+        if landmarks.shape[-2] < NUM_LANDMARKS - 1:
+            return self._no_risk(landmarks)
+        
+        wrist = landmarks[..., LEFT_WRIST, :2]
+        has_prev = prev_landmarks is not None and prev_landmarks.shape[-2] > LEFT_WRIST
+        prev_wrist = prev_landmarks[..., LEFT_WRIST, :2] if has_prev else None
+        
+        if landmarks.ndim == 2:
+            if prev_wrist is None:
+                return 0.0
+            previous = prev_wrist
+        else:
+            first = prev_wrist if prev_wrist is not None else wrist[0]
+            previous = np.concatenate([first[None], wrist[:-1]])
         
         # High speed arm movement could indicate aggression
-        if motion_speed > 0.1:
-            return 0.7
-        
-        return 0.0
+        motion_speed = np.sqrt(np.square(wrist - previous).sum(axis=-1))
+        risk = 0.7 * (motion_speed > 0.1)
+        if landmarks.ndim == 3 and prev_wrist is None:
+            risk[0] = 0.0
+        return self._as_result(risk)
+    
+    def detect_safety_risks(self, landmarks: np.ndarray, prev_landmarks: np.ndarray = None) -> Dict:
+        """All pose safety rules for one frame or a (T, 33, 4) window in one call"""
+        return {
+            'fall_risk': self.detect_fall_risk(landmarks),
+            'self_harm_risk': self.detect_self_harm_risk(landmarks),
+            'aggressive_motion': self.detect_aggressive_motion(landmarks, prev_landmarks)
+        }
+    
+    def _no_risk(self, landmarks: np.ndarray):
+        return np.zeros(landmarks.shape[0]) if landmarks.ndim == 3 else 0.0
+    
+    def _as_result(self, risk: np.ndarray):
+        return float(risk) if risk.ndim == 0 else risk
@@ -1,13 +1,46 @@
 import cv2
+import time
 import numpy as np
 import mediapipe as mp
-from typing import Dict, List
-from collections import deque
+from typing import Dict, List, Tuple
+from app.utils.frame_context import FrameContext
+
+class HandHistory:
+    """Preallocated circular buffer of one hand's landmark positions"""
+    
+    def __init__(self, window_size: int, num_landmarks: int = 21):
+        self.window_size = window_size
+        self.positions = np.zeros((window_size, num_landmarks, 2), dtype=np.float32)
+        self.timestamps = np.zeros(window_size, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+    
+    @property
+    def last_timestamp(self) -> float:
+        return self.timestamps[self._next - 1] if self.count else None
+    
+    def append(self, points: np.ndarray, timestamp: float):
+        self.positions[self._next] = points
+        self.timestamps[self._next] = timestamp
+        self._next = (self._next + 1) % self.window_size
+        self.count = min(self.count + 1, self.window_size)
+    
+    def ordered(self):
+        """(positions, timestamps) from oldest to newest"""
+        if self.count < self.window_size:
+            return self.positions[:self.count], self.timestamps[:self.count]
+        return np.roll(self.positions, -self._next, axis=0), np.roll(self.timestamps, -self._next)
+    
+    def clear(self):
+        self._next = 0
+        self.count = 0
 
 class TremorDetector:
     """Detects tremors (Parkinson's symptoms) using hand tracking"""
     
-    def __init__(self, window_size: int = 30):
+    def __init__(self, window_size: int = 64, fps: float = 30, band: Tuple[float, float] = (4.0, 12.0),
+                 reference_amplitude: float = 0.03, min_samples: int = 16, max_gap: float = 0.5,
+                 mirrored: bool = False):
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=False,
@@ -15,12 +48,27 @@ class TremorDetector:
             model_complexity=1
         )
         self.window_size = window_size
-        self.hand_position_history = deque(maxlen=window_size)
+        self.fps = fps
+        self.band = band
+        # Band RMS displacement, relative to hand size, that scores 1.0
+        self.reference_amplitude = reference_amplitude
+        self.min_samples = min_samples
+        self.max_gap = max_gap
+        # MediaPipe labels handedness as if the image were mirrored (selfie view)
+        self.mirrored = mirrored
+        
+        # One buffer per tracked hand so left and right signals never mix
+        self.hand_histories = {
+            'left': HandHistory(window_size),
+            'right': HandHistory(window_size)
+        }
+        self._taper = np.hanning(window_size).astype(np.float32)
         
-    def detect_tremor(self, frame: np.ndarray) -> Dict:
+    def detect_tremor(self, frame: np.ndarray, context: FrameContext = None, timestamp: float = None) -> Dict:
         """Detect tremors in hand movements"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = FrameContext.of(frame, context).rgb
         results = self.hands.process(rgb_frame)
+        timestamp = time.monotonic() if timestamp is None else timestamp
         
         tremor_data = {
             'tremor_score': 0.0,
@@ -33,30 +81,33 @@ class TremorDetector:
         if not results.multi_hand_landmarks:
             return tremor_data
         
+        handedness = getattr(results, 'multi_handedness', None) or []
         for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-            # Get wrist position
-            wrist = hand_landmarks.landmark[0]
-            position = np.array([wrist.x, wrist.y])
+            hand = self._hand_label(handedness, hand_idx)
+            history = self.hand_histories[hand]
+            
+            # A hand that was out of view restarts its signal
+            last = history.last_timestamp
+            if last is not None and timestamp - last > self.max_gap:
+                history.clear()
+            
+            points = np.array([(lm.x, lm.y) for lm in hand_landmarks.landmark], dtype=np.float32)
+            history.append(points, timestamp)
+            
+            if history.count < self.min_samples:
+                continue
             
-            self.hand_position_history.append(position)
+            tremor_score, frequency = self._calculate_tremor_score(history)
+            tremor_data[f'{hand}_hand_tremor'] = tremor_score
             
-            # Calculate tremor score based on velocity variance
-            if len(self.hand_position_history) > 5:
-                tremor_score = self._calculate_tremor_score(
-                    list(self.hand_position_history)
-                )
-                
-                if hand_idx == 0:
-                    tremor_data['right_hand_tremor'] = tremor_score
-                else:
-                    tremor_data['left_hand_tremor'] = tremor_score
-                
-                tremor_data['hand_positions'].append({
-                    'hand': 'right' if hand_idx == 0 else 'left',
-                    'x': wrist.x,
-                    'y': wrist.y,
-                    'tremor': tremor_score
-                })
+            wrist = hand_landmarks.landmark[0]
+            tremor_data['hand_positions'].append({
+                'hand': hand,
+                'x': wrist.x,
+                'y': wrist.y,
+                'tremor': tremor_score,
+                'frequency': frequency
+            })
         
         # Overall tremor score
         tremor_data['tremor_score'] = max(
@@ -67,27 +118,54 @@ class TremorDetector:
         
         return tremor_data
     
-    def _calculate_tremor_score(self, positions: List[np.ndarray]) -> float:
-        """Calculate tremor score from position history"""
-        if len(positions) < 3:
-            return 0.0
+    def _hand_label(self, handedness: List, hand_idx: int) -> str:
+        """'left' or 'right' hand of the patient"""
+        if hand_idx >= len(handedness):
+            return 'right' if hand_idx == 0 else 'left'
+        
+        label = handedness[hand_idx].classification[0].label.lower()
+        if not self.mirrored:
+            label = 'right' if label == 'left' else 'left'
+        return label
+    
+    def _calculate_tremor_score(self, history: HandHistory) -> Tuple[float, float]:
+        """Tremor score and dominant tremor frequency from one hand's position history.
+        
+        All 21 landmarks and both axes are transformed in one rfft; the score is the
+        band-limited RMS displacement relative to hand size.
+        """
+        positions, timestamps = history.ordered()
+        n = len(positions)
         
-        positions = np.array(positions)
+        # Sample rate from the actual frame times; the monitor may run below camera fps
+        duration = timestamps[-1] - timestamps[0]
+        fps = (n - 1) / duration if duration > 0 else self.fps
+        low, high = self.band[0], min(self.band[1], fps / 2)
+        if high <= low:
+            return 0.0, 0.0
         
-        # Calculate velocities
-        velocities = np.diff(positions, axis=0)
+        taper = self._taper if n == self.window_size else np.hanning(n).astype(np.float32)
+        signal = (positions - positions.mean(axis=0)) * taper[:, None, None]
+        spectrum = np.fft.rfft(signal, axis=0)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).sum(axis=(1, 2)) / positions.shape[1]
         
-        # Calculate velocity magnitudes
-        vel_magnitudes = np.linalg.norm(velocities, axis=1)
+        freqs = np.fft.rfftfreq(n, 1.0 / fps)
+        in_band = (freqs >= low) & (freqs <= high)
+        if not np.any(in_band):
+            return 0.0, 0.0
+        band_power = power[in_band]
         
-        # Calculate high-frequency components (tremor)
-        # High variance in small time windows indicates tremor
-        high_freq_variance = np.var(vel_magnitudes[-5:]) if len(vel_magnitudes) >= 5 else 0
+        # Parseval: one-sided band power back to RMS displacement, undoing the taper gain
+        rms = np.sqrt(2 * band_power.sum() / (n * np.sum(taper ** 2)))
         
-        # Normalize to 0-1 range
-        tremor_score = min(high_freq_variance * 100, 1.0)
+        # Wrist to middle-finger knuckle, so distance from the camera does not matter
+        hand_size = np.median(np.linalg.norm(positions[:, 9] - positions[:, 0], axis=1))
+        if hand_size <= 0:
+            return 0.0, 0.0
         
-        return tremor_score
+        tremor_score = float(min(rms / hand_size / self.reference_amplitude, 1.0))
+        frequency = float(freqs[in_band][np.argmax(band_power)])
+        return tremor_score, frequency
     
     def detect_parkinsons_risk(self, tremor_data: Dict) -> str:
         """Assess Parkinson's risk based on tremor"""
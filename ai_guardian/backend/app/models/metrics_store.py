@@ -0,0 +1,158 @@
+import threading
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Optional
+
+HEALTH_FIELDS = ('heart_rate', 'breathing_rate', 'stress_level', 'tremor_score')
+SAFETY_FIELDS = ('fall_risk', 'self_harm_risk', 'aggressive_motion', 'dangerous_objects')
+
+# Rollup bucket widths in seconds
+ROLLUP_RESOLUTIONS = {
+    '1s': 1.0,
+    '1min': 60.0,
+    '1h': 3600.0
+}
+
+class MetricsStore:
+    """Columnar time series: one preallocated NumPy array per metric plus timestamps"""
+
+    def __init__(self, fields: Iterable[str], chunk_size: int = 4096, max_rows: int = None,
+                 dtype=np.float32):
+        self.fields = tuple(fields)
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.dtype = np.dtype(dtype)
+
+        # Epoch seconds; appended in time order so ranges are found by binary search
+        self.timestamps = np.empty(chunk_size, dtype=np.float64)
+        self.columns = {name: np.empty(chunk_size, dtype=self.dtype) for name in self.fields}
+        self._size = 0
+        self._lock = threading.Lock()
+
+        # Optional sink(timestamp, values) that also receives every sample, e.g. a disk log
+        self.sink: Optional[Callable[[float, Dict[str, float]], None]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """Append one sample; fields missing from values are stored as NaN"""
+        with self._lock:
+            if self._size == len(self.timestamps):
+                self._make_room()
+
+            row = self._size
+            self.timestamps[row] = timestamp
+            for name in self.fields:
+                self.columns[name][row] = values.get(name, np.nan)
+            self._size += 1
+
+        if self.sink is not None:
+            self.sink(timestamp, values)
+
+    def _make_room(self):
+        """Grow by one chunk, or drop the oldest chunk once max_rows is reached"""
+        capacity = len(self.timestamps)
+        if self.max_rows is not None and capacity + self.chunk_size > self.max_rows:
+            drop = min(self.chunk_size, self._size)
+            keep = self._size - drop
+            self.timestamps[:keep] = self.timestamps[drop:self._size]
+            for column in self.columns.values():
+                column[:keep] = column[drop:self._size]
+            self._size = keep
+            return
+
+        self.timestamps = self._grown(self.timestamps, capacity + self.chunk_size)
+        for name, column in self.columns.items():
+            self.columns[name] = self._grown(column, capacity + self.chunk_size)
+
+    def _grown(self, array: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.empty(capacity, dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _bounds(self, start: Optional[float], end: Optional[float]):
+        """Row range [lo, hi) covering start <= timestamp < end"""
+        timestamps = self.timestamps[:self._size]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = self._size if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return lo, max(lo, hi)
+
+    def range(self, start: float = None, end: float = None, fields: Iterable[str] = None) -> Dict[str, np.ndarray]:
+        """Copy out the samples with start <= timestamp < end"""
+        fields = tuple(fields) if fields is not None else self.fields
+        with self._lock:
+            lo, hi = self._bounds(start, end)
+            data = {'timestamp': self.timestamps[lo:hi].copy()}
+            for name in fields:
+                data[name] = self.columns[name][lo:hi].copy()
+        return data
+
+    def oldest_timestamp(self) -> Optional[float]:
+        """Timestamp of the oldest sample still held in memory"""
+        with self._lock:
+            return float(self.timestamps[0]) if self._size else None
+
+    def rollup(self, resolution: str = '1min', start: float = None, end: float = None,
+               fields: Iterable[str] = None) -> Dict:
+        """Min/max/mean per time bucket, computed with one reduceat pass per field"""
+        fields = tuple(fields) if fields is not None else self.fields
+        with self._lock:
+            lo, hi = self._bounds(start, end)
+            return rollup_columns(
+                self.timestamps[lo:hi], {name: self.columns[name][lo:hi] for name in fields}, resolution
+            )
+
+def _empty_rollup(resolution: str, fields: Iterable[str]) -> Dict:
+    result = {'resolution': resolution, 'timestamp': np.empty(0), 'count': np.empty(0, dtype=np.int64)}
+    for name in fields:
+        result[name] = {'min': np.empty(0), 'max': np.empty(0), 'mean': np.empty(0)}
+    return result
+
+def rollup_columns(timestamps: np.ndarray, columns: Dict[str, np.ndarray], resolution: str = '1min') -> Dict:
+    """Min/max/mean per time bucket of time-ordered samples; columns may be memory-mapped views"""
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f'Unknown resolution {resolution!r}; expected one of {list(ROLLUP_RESOLUTIONS)}')
+    width = ROLLUP_RESOLUTIONS[resolution]
+    if len(timestamps) == 0:
+        return _empty_rollup(resolution, columns)
+
+    # Rows are time ordered, so each bucket is one contiguous run
+    buckets = np.floor(timestamps / width).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(buckets)])
+
+    result = {'resolution': resolution, 'timestamp': buckets[starts] * width, 'count': counts}
+    for name, column in columns.items():
+        values = np.asarray(column, dtype=np.float64)
+        result[name] = {
+            'min': np.minimum.reduceat(values, starts),
+            'max': np.maximum.reduceat(values, starts),
+            'mean': np.add.reduceat(values, starts) / counts
+        }
+    return result
+
+def combine_rollups(parts: List[Dict], resolution: str, fields: Iterable[str]) -> Dict:
+    """Merge rollups of consecutive time ranges; a bucket split across parts is combined"""
+    fields = tuple(fields)
+    parts = [part for part in parts if len(part['count'])]
+    if not parts:
+        return _empty_rollup(resolution, fields)
+    if len(parts) == 1:
+        return parts[0]
+
+    timestamps = np.concatenate([part['timestamp'] for part in parts])
+    counts = np.concatenate([part['count'] for part in parts])
+    starts = np.flatnonzero(np.r_[True, timestamps[1:] != timestamps[:-1]])
+    merged_counts = np.add.reduceat(counts, starts)
+
+    result = {'resolution': resolution, 'timestamp': timestamps[starts], 'count': merged_counts}
+    for name in fields:
+        minimum = np.concatenate([part[name]['min'] for part in parts])
+        maximum = np.concatenate([part[name]['max'] for part in parts])
+        mean = np.concatenate([part[name]['mean'] for part in parts])
+        result[name] = {
+            'min': np.minimum.reduceat(minimum, starts),
+            'max': np.maximum.reduceat(maximum, starts),
+            'mean': np.add.reduceat(mean * counts, starts) / merged_counts
+        }
+    return result
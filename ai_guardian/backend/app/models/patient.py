@@ -1,6 +1,12 @@
+import os
+import json
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
+from app.config.settings import Config
+from app.utils.ring_buffer import RingBuffer
+from app.models.metrics_store import MetricsStore, HEALTH_FIELDS, SAFETY_FIELDS, combine_rollups, rollup_columns
+from app.utils.segment_log import SegmentLogReader, SegmentLogWriter
 
 @dataclass
 class Alert:
@@ -10,6 +16,8 @@ class Alert:
     message: str
     timestamp: datetime = field(default_factory=datetime.now)
     details: Dict = field(default_factory=dict)
+    repeat_count: int = 0  # frames/re-raises folded into this alert instead of new ones
+    last_seen: Optional[datetime] = None
 
 @dataclass
 class HealthMetrics:
@@ -30,20 +38,118 @@ class SafetyMetrics:
     dangerous_objects: List[str] = field(default_factory=list)
     timestamp: datetime = field(default_factory=datetime.now)
 
+def alert_record(alert: Alert) -> Dict:
+    """JSON-ready form of an alert for the alert log"""
+    return {
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'timestamp': alert.timestamp.isoformat(),
+        'details': alert.details,
+        'repeat_count': alert.repeat_count,
+        'last_seen': alert.last_seen.isoformat() if alert.last_seen else None
+    }
+
 class PatientSession:
     """Patient monitoring session"""
-    def __init__(self, patient_id: str, patient_name: str):
+    def __init__(self, patient_id: str, patient_name: str, history_size: int = None,
+                 alert_history_size: int = None,
+                 spill: Optional[Callable[[str, List[Any]], None]] = None):
         self.patient_id = patient_id
         self.patient_name = patient_name
         self.session_start = datetime.now()
-        self.health_metrics_history: List[HealthMetrics] = []
-        self.safety_metrics_history: List[SafetyMetrics] = []
-        self.alerts_history: List[Alert] = []
+        
+        # Bounded histories keep memory flat over multi-day stays; evicted records are
+        # passed to spill(kind, items) in batches when given. Metric samples also live in
+        # the segment logs and evicted alerts in the alert log (attach_metric_log).
+        history_size = history_size or Config.METRICS_HISTORY_SIZE
+        alert_history_size = alert_history_size or Config.ALERT_HISTORY_SIZE
+        self._spill = spill
+        self._alert_log = None
+        self.health_metrics_history = RingBuffer(
+            history_size, self._spill_hook('health') if spill else None, Config.HISTORY_SPILL_BATCH
+        )
+        self.safety_metrics_history = RingBuffer(
+            history_size, self._spill_hook('safety') if spill else None, Config.HISTORY_SPILL_BATCH
+        )
+        # Alerts are rare and not segment-logged: each evicted one is written out at once
+        self.alerts_history = RingBuffer(alert_history_size, self._spill_hook('alerts'))
+        
+        # Columnar copies of the numeric metrics for trend queries and rollups
+        self.health_store = MetricsStore(HEALTH_FIELDS, max_rows=Config.METRICS_STORE_MAX_ROWS)
+        self.safety_store = MetricsStore(SAFETY_FIELDS, max_rows=Config.METRICS_STORE_MAX_ROWS)
+        self.metric_logs: List[SegmentLogWriter] = []
+        self.metric_log_dir: Optional[str] = None
         self.current_health_metrics = HealthMetrics()
         self.current_safety_metrics = SafetyMetrics()
         self.current_alerts: List[Alert] = []
         self.risk_level = "SAFE"
         
+    def _spill_hook(self, kind: str):
+        return lambda items: self._on_evicted(kind, items)
+    
+    def _on_evicted(self, kind: str, items: List[Any]):
+        if kind == 'alerts' and self._alert_log is not None:
+            for alert in items:
+                self._alert_log.write(json.dumps(alert_record(alert), default=str) + '\n')
+            self._alert_log.flush()
+        if self._spill is not None:
+            self._spill(kind, items)
+    
+    def flush_history(self):
+        """Spill evicted records still waiting for a full batch"""
+        for history in (self.health_metrics_history, self.safety_metrics_history, self.alerts_history):
+            history.flush()
+    
+    def attach_metric_log(self, directory: str):
+        """Persist every metric sample to segment files under directory/<patient_id>"""
+        directory = os.path.join(directory, self.patient_id)
+        self.metric_log_dir = directory
+        for name, store in (('health', self.health_store), ('safety', self.safety_store)):
+            writer = SegmentLogWriter(
+                directory, name, store.fields,
+                max_segment_bytes=Config.SEGMENT_MAX_BYTES,
+                max_segment_seconds=Config.SEGMENT_MAX_SECONDS
+            )
+            store.sink = writer.append
+            self.metric_logs.append(writer)
+        # Alerts evicted from alerts_history, one JSON object per line
+        self._alert_log = open(os.path.join(directory, 'alerts.jsonl'), 'a')
+    
+    def close_metric_log(self):
+        """Flush and close the segment logs and the alert log"""
+        self.flush_history()
+        if self._alert_log is not None:
+            self._alert_log.close()
+            self._alert_log = None
+        for store in (self.health_store, self.safety_store):
+            store.sink = None
+        for writer in self.metric_logs:
+            writer.close()
+        self.metric_logs = []
+    
+    def metric_rollup(self, name: str, resolution: str = '1min', start: float = None,
+                      end: float = None) -> Dict:
+        """Rollup of 'health' or 'safety' metrics. Samples older than the in-memory store
+        are read from the segment logs through memory-mapped views."""
+        store = {'health': self.health_store, 'safety': self.safety_store}[name]
+        parts = []
+        
+        oldest = store.oldest_timestamp()
+        log_dir = self.metric_log_dir
+        if log_dir is not None and os.path.exists(os.path.join(log_dir, f'{name}.schema.json')) and \
+                (start is None or oldest is None or start < oldest):
+            # Only what memory no longer holds, so no sample is counted twice
+            log_end = end if oldest is None else oldest if end is None else min(end, oldest)
+            reader = SegmentLogReader(log_dir, name)
+            for view in reader.read(start, log_end):
+                parts.append(rollup_columns(
+                    view['timestamp'], {field: view[field] for field in store.fields}, resolution
+                ))
+        
+        parts.append(store.rollup(resolution, start, end))
+        return combine_rollups(parts, resolution, store.fields)
+    
     def add_alert(self, alert: Alert):
         """Add alert to history and current alerts"""
         self.alerts_history.append(alert)
@@ -53,28 +159,26 @@ class PatientSession:
         """Update health metrics"""
         self.current_health_metrics = metrics
         self.health_metrics_history.append(metrics)
+        self.health_store.append(metrics.timestamp.timestamp(), {
+            'heart_rate': metrics.heart_rate,
+            'breathing_rate': metrics.breathing_rate,
+            'stress_level': metrics.stress_level,
+            'tremor_score': metrics.tremor_score
+        })
         
     def update_safety_metrics(self, metrics: SafetyMetrics):
         """Update safety metrics"""
         self.current_safety_metrics = metrics
         self.safety_metrics_history.append(metrics)
+        self.safety_store.append(metrics.timestamp.timestamp(), {
+            'fall_risk': metrics.fall_risk,
+            'self_harm_risk': metrics.self_harm_risk,
+            'aggressive_motion': metrics.aggressive_motion,
+            'dangerous_objects': len(metrics.dangerous_objects)
+        })
         
     def calculate_risk_level(self) -> str:
-        """Calculate overall risk level"""
-        if (self.current_safety_metrics.fall_risk > 0.8 or 
-            self.current_safety_metrics.self_harm_risk > 0.8 or
-            self.current_health_metrics.heart_rate > 150 or
-            self.current_health_metrics.heart_rate < 40):
-            return "CRITICAL"
-        elif (self.current_safety_metrics.fall_risk > 0.6 or
-              self.current_safety_metrics.self_harm_risk > 0.6 or
-              self.current_health_metrics.tremor_score > 0.7):
-            return "HIGH"
-        elif (self.current_safety_metrics.fall_risk > 0.4 or
-              self.current_health_metrics.tremor_score > 0.5 or
-              len(self.current_safety_metrics.dangerous_objects) > 0):
-            return "MEDIUM"
-        elif self.current_safety_metrics.fall_risk > 0.2:
-            return "LOW"
-        else:
-            return "SAFE"
+        """Calculate overall risk level from the risk rule table"""
+        # Imported here: the rule engine builds Alerts from this module
+        from app.utils.rule_engine import risk_level
+        return risk_level(self)
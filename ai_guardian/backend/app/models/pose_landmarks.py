@@ -0,0 +1,71 @@
+import numpy as np
+from enum import IntEnum
+
+NUM_LANDMARKS = 33
+
+# Columns of a landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+FIELDS = ('x', 'y', 'z', 'visibility')
+
+class Joint(IntEnum):
+    """MediaPipe Pose landmark indices"""
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
+
+# Left/right pairs as plain ints; IntEnum members index NumPy arrays noticeably slower
+SHOULDERS = [int(Joint.LEFT_SHOULDER), int(Joint.RIGHT_SHOULDER)]
+HIPS = [int(Joint.LEFT_HIP), int(Joint.RIGHT_HIP)]
+ANKLES = [int(Joint.LEFT_ANKLE), int(Joint.RIGHT_ANKLE)]
+WRISTS = [int(Joint.LEFT_WRIST), int(Joint.RIGHT_WRIST)]
+NOSE = int(Joint.NOSE)
+LEFT_WRIST = int(Joint.LEFT_WRIST)
+
+def empty_landmarks() -> np.ndarray:
+    """Landmark array for a frame with nobody in it"""
+    return np.empty((0, 4), dtype=np.float32)
+
+def landmarks_from_mediapipe(pose_landmarks) -> np.ndarray:
+    """(33, 4) float32 array [x, y, z, visibility] from a MediaPipe landmark list"""
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+        dtype=np.float32
+    )
+
+def as_landmark_array(landmarks) -> np.ndarray:
+    """Accept a landmark array, a stacked window, or the older list-of-dicts form"""
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    if not landmarks:
+        return empty_landmarks()
+    return np.array([[lm[field] for field in FIELDS] for lm in landmarks], dtype=np.float32)
@@ -0,0 +1,490 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing as mp
+import numpy as np
+from typing import Callable, Optional, Dict, List
+from app.config.settings import Config
+from app.models.patient import Alert, HealthMetrics, SafetyMetrics, PatientSession
+from app.monitor_registry import notify_listeners
+from app.utils.camera_utils import CameraManager, EncodedFrameCache, resize_frame
+from app.utils.pipeline_metrics import pipeline_metrics
+from app.utils.shared_frames import SharedFrameRing
+
+def _alert_dict(alert: Alert) -> Dict:
+    return {
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'timestamp': alert.timestamp,
+        'details': alert.details,
+        'repeat_count': alert.repeat_count,
+        'last_seen': alert.last_seen
+    }
+
+def compact_result(monitor, result: Dict, process_ms: float) -> Dict:
+    """Reduce a process_frame result to the small dict sent back to the web process"""
+    session = monitor.patient_session
+    health = session.current_health_metrics
+    safety = session.current_safety_metrics
+
+    return {
+        'frame_number': result['frame_number'],
+        'status': result['status'],
+        'risk_level': session.risk_level,
+        'health': {
+            'heart_rate': float(health.heart_rate),
+            'breathing_rate': float(health.breathing_rate),
+            'stress_level': float(health.stress_level),
+            'tremor_score': float(health.tremor_score),
+            'skin_color_risk': health.skin_color_risk
+        },
+        'safety': {
+            'fall_risk': float(safety.fall_risk),
+            'self_harm_risk': float(safety.self_harm_risk),
+            'aggressive_motion': float(safety.aggressive_motion),
+            'dangerous_objects': list(safety.dangerous_objects)
+        },
+        # Newly raised alerts, and every alert still open
+        'alerts': [_alert_dict(a) for a in result.get('alerts', [])],
+        'current_alerts': [_alert_dict(a) for a in session.current_alerts],
+        'timings': result['timings'],
+        'process_ms': process_ms
+    }
+
+def _pool_worker_main(command_queue, result_queue):
+    """Worker process: runs the PatientMonitors assigned to it"""
+    from app.patient_monitor import PatientMonitor, object_backend_options
+    from app.detectors.object_detector import create_batch_service
+
+    # Monitors in this process share one object model instead of loading a copy each
+    inference_service = None
+    streams = {}
+    while True:
+        message = command_queue.get()
+        kind = message[0]
+
+        if kind == 'stop':
+            break
+
+        if kind == 'add':
+            _, stream_id, patient_name, in_name, out_name, shape, slots = message
+            try:
+                if Config.OBJECT_BATCHING and inference_service is None:
+                    inference_service = create_batch_service(
+                        max_batch_size=Config.OBJECT_BATCH_MAX_SIZE,
+                        max_wait=Config.OBJECT_BATCH_MAX_WAIT,
+                        timeout=Config.OBJECT_BATCH_TIMEOUT,
+                        **object_backend_options()
+                    )
+                streams[stream_id] = (
+                    PatientMonitor(patient_id=stream_id, patient_name=patient_name,
+                                   inference_service=inference_service),
+                    SharedFrameRing.attach(in_name, shape, slots),
+                    SharedFrameRing.attach(out_name, shape, slots)
+                )
+            except Exception as e:
+                result_queue.put(('failed', stream_id, str(e)))
+                continue
+            result_queue.put(('ready', stream_id, os.getpid()))
+
+        elif kind == 'remove':
+            stream = streams.pop(message[1], None)
+            if stream is not None:
+                monitor, in_ring, out_ring = stream
+                monitor.release()
+                in_ring.close()
+                out_ring.close()
+
+        elif kind == 'frame':
+            _, stream_id, slot, seq = message
+            stream = streams.get(stream_id)
+            if stream is None:
+                # Answer anyway so the web process does not count the frame as in flight
+                result_queue.put(('dropped', stream_id, None))
+                continue
+            monitor, in_ring, out_ring = stream
+
+            try:
+                frame = in_ring.read(slot, seq)
+                if frame is None:
+                    result_queue.put(('dropped', stream_id, None))
+                    continue
+
+                timestamp = in_ring.timestamp(slot)
+                started = time.perf_counter()
+                cpu_started = time.process_time()
+                result = monitor.process_frame(frame, timestamp=timestamp)
+                process_ms = 1000 * (time.perf_counter() - started)
+                # Process-wide, so detector threads and the batch service are included
+                cpu_ms = 1000 * (time.process_time() - cpu_started)
+
+                # The annotated frame goes back through shared memory as well
+                out_slot, out_seq = out_ring.write(result['frame'], timestamp)
+                compact = compact_result(monitor, result, process_ms)
+                compact['frame_slot'] = out_slot
+                compact['frame_seq'] = out_seq
+                compact['cpu_ms'] = cpu_ms
+                compact['worker_pid'] = os.getpid()
+                compact['worker_cpu_seconds'] = time.process_time()
+                result_queue.put(('result', stream_id, compact))
+            except Exception as e:
+                result_queue.put(('error', stream_id, str(e)))
+
+    for monitor, in_ring, out_ring in streams.values():
+        monitor.release()
+        in_ring.close()
+        out_ring.close()
+    if inference_service is not None:
+        inference_service.close()
+
+class MonitorPool:
+    """Pool of worker processes, each running one or more PatientMonitors"""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or Config.MONITOR_POOL_WORKERS or os.cpu_count() or 1
+
+        # Spawn rather than fork: the web process already runs capture and detector threads
+        self._context = mp.get_context('spawn')
+        self.result_queue = self._context.Queue()
+        self._command_queues = []
+        self._processes = []
+        for index in range(self.workers):
+            command_queue, process = self._spawn(index)
+            self._command_queues.append(command_queue)
+            self._processes.append(process)
+
+        self._streams: Dict[str, 'PooledMonitorWorker'] = {}
+        self._assignments: Dict[str, int] = {}
+        # Latest cumulative CPU seconds reported by each worker pid (crashed ones included)
+        self._worker_cpu: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name='monitor-pool-results', daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index: int):
+        command_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_pool_worker_main,
+            args=(command_queue, self.result_queue),
+            name=f'monitor-pool-{index}',
+            daemon=True
+        )
+        process.start()
+        return command_queue, process
+
+    @staticmethod
+    def _add_message(stream: 'PooledMonitorWorker'):
+        return (
+            'add', stream.patient_id, stream.patient_name,
+            stream.input_ring.name, stream.output_ring.name, stream.shape, stream.slots
+        )
+
+    def attach(self, stream: 'PooledMonitorWorker'):
+        """Assign a stream to the least loaded worker process"""
+        with self._lock:
+            loads = [0] * self.workers
+            for index in self._assignments.values():
+                loads[index] += 1
+            index = loads.index(min(loads))
+            self._assignments[stream.patient_id] = index
+            self._streams[stream.patient_id] = stream
+            command_queue = self._command_queues[index]
+
+        command_queue.put(self._add_message(stream))
+        return index
+
+    def detach(self, stream: 'PooledMonitorWorker'):
+        """Remove a stream from its worker process"""
+        with self._lock:
+            index = self._assignments.pop(stream.patient_id, None)
+            self._streams.pop(stream.patient_id, None)
+            command_queue = self._command_queues[index] if index is not None else None
+
+        if command_queue is not None:
+            command_queue.put(('remove', stream.patient_id))
+
+    def submit(self, stream: 'PooledMonitorWorker', slot: int, seq: int):
+        """Tell a stream's worker that a new frame is waiting in shared memory"""
+        with self._lock:
+            index = self._assignments.get(stream.patient_id)
+            command_queue = self._command_queues[index] if index is not None else None
+        if command_queue is not None:
+            command_queue.put(('frame', stream.patient_id, slot, seq))
+
+    def record_worker_cpu(self, pid: int, cpu_seconds: float):
+        self._worker_cpu[pid] = max(cpu_seconds, self._worker_cpu.get(pid, 0.0))
+
+    def worker_cpu_seconds(self) -> float:
+        """CPU used by the worker processes, as of their latest results"""
+        return sum(list(self._worker_cpu.values()))
+
+    def _check_workers(self):
+        """Replace crashed worker processes and hand their streams to the replacement.
+        A stream whose worker keeps dying is marked failed instead."""
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or not self._running:
+                continue
+
+            print(f'⚠️ Monitor pool worker {index} exited (code {process.exitcode}); restarting')
+            with self._lock:
+                command_queue, self._processes[index] = self._spawn(index)
+                self._command_queues[index] = command_queue
+                orphans = [self._streams[stream_id] for stream_id, assigned in self._assignments.items()
+                           if assigned == index]
+
+                # Frames sent to the dead process will never be answered
+                for stream in orphans:
+                    stream.on_worker_lost(f'worker process exited with code {process.exitcode}')
+                    if stream.restarts > Config.MONITOR_POOL_MAX_RESTARTS:
+                        self._assignments.pop(stream.patient_id, None)
+                        self._streams.pop(stream.patient_id, None)
+                        stream.fail(f'Worker process crashed {stream.restarts} times')
+                    else:
+                        command_queue.put(self._add_message(stream))
+
+    def _collect(self):
+        """Dispatch worker results to their streams and watch the worker processes"""
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 0.5:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, stream_id, payload = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            stream = self._streams.get(stream_id)
+            if stream is not None:
+                stream.on_message(kind, payload)
+
+    def shutdown(self):
+        """Stop all worker processes"""
+        self._running = False
+        for command_queue in self._command_queues:
+            command_queue.put(('stop',))
+        for process in self._processes:
+            process.join(timeout=2.0)
+
+class PooledMonitorWorker:
+    """Web-process side of a monitor that runs in a MonitorPool worker process"""
+
+    def __init__(self, patient_id: str, patient_name: str, camera_index: int, pool: MonitorPool,
+                 max_fps: float = None):
+        self.patient_id = patient_id
+        self.patient_name = patient_name
+        self.camera_index = camera_index
+        self.pool = pool
+        self.max_fps = max_fps or Config.MONITOR_MAX_FPS
+
+        self.shape = (Config.FRAME_HEIGHT, Config.FRAME_WIDTH, 3)
+        self.slots = Config.SHARED_FRAME_SLOTS
+        self.input_ring: Optional[SharedFrameRing] = None
+        self.output_ring: Optional[SharedFrameRing] = None
+        self.camera_manager = CameraManager(
+            camera_index=camera_index,
+            threaded=Config.CAPTURE_THREADED,
+            grab_on_skip=Config.CAPTURE_GRAB_ON_SKIP
+        )
+
+        # Mirror of the worker's session, rebuilt from compact results
+        self._session: Optional[PatientSession] = None
+        self.latest_frame_number = 0
+        self.frame_cache = EncodedFrameCache(Config.JPEG_QUALITY, pipeline_metrics.encode_observer(patient_id))
+        self._latest_slot = None
+        self.error: Optional[str] = None
+        self.worker_pid: Optional[int] = None
+        self.listeners: List[Callable] = []
+
+        # Resource accounting
+        self.started_at: Optional[float] = None
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+        # Frames sent but not yet answered; kept below the slot count so the
+        # writer never overwrites a frame the worker has not read yet
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.restarts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def session(self) -> Optional[PatientSession]:
+        return self._session
+
+    @property
+    def latest_frame(self) -> Optional[np.ndarray]:
+        """Latest annotated frame, copied out of the output ring"""
+        latest, ring = self._latest_slot, self.output_ring
+        if latest is None or ring is None:
+            return None
+        return ring.read(*latest)
+
+    def _slot_reader(self, latest) -> Callable[[], Optional[np.ndarray]]:
+        def read():
+            ring = self.output_ring
+            return ring.read(*latest) if ring is not None else None
+        return read
+
+    def start(self):
+        """Start capture and hand the stream to a worker process"""
+        if self._running:
+            return
+
+        self._running = True
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._feed, name=f'feeder-{self.patient_id}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop capture, detach from the pool and free shared memory"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self.pool.detach(self)
+        self.camera_manager.release()
+        for ring in (self.input_ring, self.output_ring):
+            if ring is not None:
+                ring.close()
+        self.input_ring = None
+        self.output_ring = None
+        if self._session is not None:
+            self._session.close_metric_log()
+
+    def _feed(self):
+        """Copy camera frames into shared memory and notify the worker"""
+        if not self.camera_manager.initialize():
+            self.error = 'Camera initialization failed'
+            print(f'⚠️ Camera {self.camera_index} initialization failed for {self.patient_id}')
+            self._running = False
+            return
+
+        self.input_ring = SharedFrameRing(self.shape, slots=self.slots)
+        self.output_ring = SharedFrameRing(self.shape, slots=self.slots)
+        self._session = PatientSession(self.patient_id, self.patient_name)
+        if Config.METRICS_PERSIST:
+            self._session.attach_metric_log(Config.METRICS_LOG_DIR)
+        self.pool.attach(self)
+
+        frame_interval = 1.0 / self.max_fps
+        while self._running:
+            started = time.perf_counter()
+            frame = self.camera_manager.read_frame()
+            if frame is None:
+                continue
+
+            with self._lock:
+                if self._in_flight >= self.slots - 1:
+                    self.frames_dropped += 1
+                    continue
+                self._in_flight += 1
+
+            if frame.shape != self.shape:
+                frame = resize_frame(frame, self.shape[1], self.shape[0])
+            slot, seq = self.input_ring.write(frame, self.camera_manager.last_capture_time)
+            self.pool.submit(self, slot, seq)
+
+            elapsed = time.perf_counter() - started
+            if elapsed < frame_interval:
+                time.sleep(frame_interval - elapsed)
+
+    def on_message(self, kind: str, payload):
+        """Handle a message from the worker process (called on the pool's collector thread)"""
+        if kind == 'ready':
+            self.worker_pid = payload
+            self.error = None
+            return
+        if kind == 'failed':
+            self.pool.detach(self)
+            self.fail(f'Monitor could not start in the worker process: {payload}')
+            return
+
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+        if kind == 'dropped':
+            self.frames_dropped += 1
+        elif kind == 'error':
+            print(f'Monitoring error ({self.patient_id}): {payload}')
+        elif kind == 'result':
+            self._apply_result(payload)
+
+    def on_worker_lost(self, reason: str):
+        """The worker process died; nothing sent to it will be answered"""
+        with self._lock:
+            self._in_flight = 0
+        self.restarts += 1
+        self.worker_pid = None
+        self.error = reason
+
+    def fail(self, reason: str):
+        """Stop feeding frames; the registry reports the stream as not running"""
+        self.error = reason
+        self._running = False
+        print(f'❌ Monitoring failed ({self.patient_id}): {reason}')
+
+    def _apply_result(self, compact: Dict):
+        """Update the mirrored session from a compact result"""
+        session = self._session
+        session.update_health_metrics(HealthMetrics(**compact['health']))
+        session.update_safety_metrics(SafetyMetrics(**compact['safety']))
+        session.risk_level = compact['risk_level']
+
+        alerts = [Alert(**a) for a in compact['alerts']]
+        if compact['status'] == 'success':
+            # Open alerts keep their identity across frames, like in the worker process
+            opened = {(a.alert_type, a.timestamp): a for a in session.current_alerts + alerts}
+            current = []
+            for data in compact['current_alerts']:
+                alert = opened.get((data['alert_type'], data['timestamp']))
+                if alert is None:
+                    alert = Alert(**data)
+                alert.repeat_count, alert.last_seen = data['repeat_count'], data['last_seen']
+                current.append(alert)
+            session.current_alerts = current
+        for alert in alerts:
+            session.alerts_history.append(alert)
+
+        self._latest_slot = (compact['frame_slot'], compact['frame_seq'])
+        self.latest_frame_number = compact['frame_number']
+        # Read out of shared memory only if a viewer asks for this frame. The slot is bound
+        # now, so a late read yields this frame or nothing, never a newer one.
+        self.frame_cache.update(self.latest_frame_number, self._slot_reader(self._latest_slot))
+        self.frames_processed += 1
+        self.busy_seconds += compact['process_ms'] / 1000
+        self.cpu_seconds += compact['cpu_ms'] / 1000
+        self.pool.record_worker_cpu(compact['worker_pid'], compact['worker_cpu_seconds'])
+        pipeline_metrics.observe_frame(self.patient_id, compact['timings'])
+        notify_listeners(self, alerts)
+
+    def get_stats(self) -> Dict:
+        """Get per-monitor resource accounting"""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        capture_stats = self.camera_manager.get_capture_stats()
+
+        return {
+            'patient_id': self.patient_id,
+            'camera_index': self.camera_index,
+            'running': self._running,
+            'error': self.error,
+            'worker_pid': self.worker_pid,
+            'uptime_seconds': uptime,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped + capture_stats.get('frames_dropped', 0),
+            'fps': self.frames_processed / uptime if uptime > 0 else 0.0,
+            'avg_process_ms': 1000 * self.busy_seconds / self.frames_processed if self.frames_processed else 0.0,
+            'busy_fraction': self.busy_seconds / uptime if uptime > 0 else 0.0,
+            'cpu_seconds': self.cpu_seconds
+        }
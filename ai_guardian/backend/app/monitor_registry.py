@@ -0,0 +1,398 @@
+import os
+import time
+import threading
+from collections import deque
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, List
+from app.config.settings import Config
+from app.models.patient import PatientSession
+from app.patient_monitor import PatientMonitor, object_backend_options
+from app.detectors.object_detector import create_batch_service
+from app.utils.alert_system import AlertSystem
+from app.utils.camera_utils import EncodedFrameCache
+from app.utils.pipeline_metrics import pipeline_metrics
+
+def notify_listeners(worker, alerts: List):
+    """Pass a processed frame's new alerts to the worker's listeners"""
+    for listener in worker.listeners:
+        try:
+            listener(worker, alerts)
+        except Exception as e:
+            print(f'Listener error ({worker.patient_id}): {e}')
+
+class MonitorWorker:
+    """Runs one patient's capture and processing loop on its own thread"""
+
+    def __init__(self, patient_id: str, patient_name: str, camera_index: int = 0,
+                 executor: ThreadPoolExecutor = None, max_fps: float = None,
+                 inference_service=None, alert_system: AlertSystem = None):
+        self.patient_id = patient_id
+        self.patient_name = patient_name
+        self.camera_index = camera_index
+        self.executor = executor
+        self.inference_service = inference_service
+        # With a shared alert system the registry's ward tick evaluates this patient's rules
+        self.alert_system = alert_system
+        self.max_fps = max_fps or Config.MONITOR_MAX_FPS
+
+        self.monitor: Optional[PatientMonitor] = None
+        self.latest_frame: Optional[np.ndarray] = None
+        self.latest_frame_number = 0
+        self.frame_cache = EncodedFrameCache(Config.JPEG_QUALITY, pipeline_metrics.encode_observer(patient_id))
+        self.error: Optional[str] = None
+
+        # Called as listener(worker, new_alerts) after every processed frame
+        self.listeners: List[Callable] = []
+
+        # Resource accounting
+        self.started_at: Optional[float] = None
+        self.frames_processed = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+        self._evaluated_metrics = None
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def session(self) -> Optional[PatientSession]:
+        """Current patient session, once the monitor has started"""
+        return self.monitor.patient_session if self.monitor else None
+
+    def needs_alert_evaluation(self) -> bool:
+        """True if a frame with a person updated the metrics since the last ward tick"""
+        session = self.session
+        # No frame with a person yet: the default metrics would read as a stopped heart
+        if session is None or not self._running or not len(session.health_metrics_history):
+            return False
+        metrics = (session.current_health_metrics, session.current_safety_metrics)
+        if self._evaluated_metrics is not None and \
+                all(a is b for a, b in zip(metrics, self._evaluated_metrics)):
+            return False
+        self._evaluated_metrics = metrics
+        return True
+
+    def deliver_alerts(self, alerts: List):
+        """Called by the ward tick with alerts newly raised for this patient. With the tick
+        evaluating the rules, only the tick thread writes alerts_history."""
+        for alert in alerts:
+            self.monitor.patient_session.alerts_history.append(alert)
+        notify_listeners(self, alerts)
+
+    def start(self):
+        """Start the monitoring thread"""
+        if self._running:
+            return
+
+        self._running = True
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name=f'monitor-{self.patient_id}', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the monitoring thread and release the camera"""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        if self.monitor is not None:
+            self.monitor.release()
+            self.monitor.patient_session.close_metric_log()
+
+    def _run(self):
+        """Capture and process frames until stopped"""
+        self.monitor = PatientMonitor(
+            patient_id=self.patient_id,
+            patient_name=self.patient_name,
+            camera_index=self.camera_index,
+            executor=self.executor,
+            inference_service=self.inference_service,
+            alert_system=self.alert_system,
+            evaluate_alerts=self.alert_system is None
+        )
+        if not self.monitor.initialize_camera():
+            self.error = 'Camera initialization failed'
+            print(f'⚠️ Camera {self.camera_index} initialization failed for {self.patient_id}')
+            self._running = False
+            return
+
+        # Stopped while the models were loading
+        if not self._running:
+            self.monitor.release()
+            return
+
+        if Config.METRICS_PERSIST:
+            self.monitor.patient_session.attach_metric_log(Config.METRICS_LOG_DIR)
+
+        frame_interval = 1.0 / self.max_fps
+        while self._running:
+            try:
+                started = time.perf_counter()
+                cpu_started = time.thread_time()
+
+                result = self.monitor.process_frame()
+                if 'error' in result:
+                    continue
+
+                self.latest_frame = result.get('frame')
+                self.latest_frame_number = result['frame_number']
+                self.frame_cache.update(self.latest_frame_number, self.latest_frame)
+                self.frames_processed += 1
+                pipeline_metrics.observe_frame(self.patient_id, result['timings'])
+                notify_listeners(self, result.get('alerts', []))
+
+                elapsed = time.perf_counter() - started
+                self.busy_seconds += elapsed
+                self.cpu_seconds += time.thread_time() - cpu_started
+
+                # Cap the processing rate; the camera mailbox always has the newest frame
+                if elapsed < frame_interval:
+                    time.sleep(frame_interval - elapsed)
+            except Exception as e:
+                print(f'Monitoring error ({self.patient_id}): {e}')
+                time.sleep(0.1)
+
+    def get_stats(self) -> Dict:
+        """Get per-monitor resource accounting"""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        capture_stats = self.monitor.camera_manager.get_capture_stats() if self.monitor else {}
+
+        return {
+            'patient_id': self.patient_id,
+            'camera_index': self.camera_index,
+            'running': self._running,
+            'error': self.error,
+            'uptime_seconds': uptime,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': capture_stats.get('frames_dropped', 0),
+            'fps': self.frames_processed / uptime if uptime > 0 else 0.0,
+            'avg_process_ms': 1000 * self.busy_seconds / self.frames_processed if self.frames_processed else 0.0,
+            'busy_fraction': self.busy_seconds / uptime if uptime > 0 else 0.0,
+            'loop_cpu_seconds': self.cpu_seconds,
+            # Loop thread plus the detector work it handed to the shared executor
+            'cpu_seconds': self.cpu_seconds + (self.monitor.offloaded_cpu_seconds if self.monitor else 0.0)
+        }
+
+class MonitorRegistry:
+    """Manages one PatientMonitor per patient/camera on a ward node"""
+
+    def __init__(self, max_monitors: int = None, detector_workers: int = None, execution: str = None):
+        self.max_monitors = max_monitors or Config.MAX_MONITORS
+        self.execution = execution or Config.MONITOR_EXECUTION
+        self._workers: Dict[str, MonitorWorker] = {}
+        self._lock = threading.Lock()
+
+        # Handed to every worker, e.g. the Socket.IO event publisher
+        self.listeners: List[Callable] = []
+
+        # Shared YOLO model batching frames across monitors; loaded on first start, and a
+        # model that failed to load is not retried on every start
+        self.inference_service = None
+        self._inference_unavailable = False
+        self._services_lock = threading.Lock()
+
+        # Shared rule engine; every running monitor's session is evaluated together once per
+        # tick instead of each monitor thread evaluating (or waiting for) its own
+        self.alert_system = None
+        self.alert_ticks = 0
+        self.alert_busy_seconds = 0.0
+        self._alert_thread: Optional[threading.Thread] = None
+        self._alert_stop = threading.Event()
+
+        # Worker processes are started on first use, never at import time
+        self._pool = None
+
+        # One bounded detector pool shared by every monitor on the node
+        self.executor = None
+        if Config.PARALLEL_DETECTORS and self.execution == 'thread':
+            self.executor = ThreadPoolExecutor(
+                max_workers=detector_workers or Config.REGISTRY_DETECTOR_WORKERS or os.cpu_count(),
+                thread_name_prefix='detectors'
+            )
+
+        # (monotonic time, node CPU seconds) samples for windowed utilisation; restarted
+        # when the first monitor starts so idle time before it does not count
+        self._cpu_samples: deque = deque()
+
+    def _ensure_services(self):
+        """Create the shared model and alert services once, outside the registry lock so a
+        slow model load does not block get/stop/list for every other patient"""
+        with self._services_lock:
+            if Config.OBJECT_BATCHING and self.inference_service is None and not self._inference_unavailable:
+                self.inference_service = create_batch_service(
+                    max_batch_size=Config.OBJECT_BATCH_MAX_SIZE,
+                    max_wait=Config.OBJECT_BATCH_MAX_WAIT,
+                    timeout=Config.OBJECT_BATCH_TIMEOUT,
+                    **object_backend_options()
+                )
+                self._inference_unavailable = self.inference_service is None
+            if self.alert_system is None:
+                self.alert_system = AlertSystem()
+                self._alert_stop = threading.Event()
+                self._alert_thread = threading.Thread(
+                    target=self._alert_loop, args=(self.alert_system, self._alert_stop),
+                    name='ward-alerts', daemon=True
+                )
+                self._alert_thread.start()
+
+    def _alert_loop(self, alert_system: AlertSystem, stop: threading.Event):
+        """Ward tick: evaluate the alert rules for every monitor with fresh metrics"""
+        while not stop.wait(Config.ALERT_TICK_INTERVAL):
+            workers = [w for w in self.list() if w.needs_alert_evaluation()]
+            if not workers:
+                continue
+
+            started = time.perf_counter()
+            try:
+                new_alerts = alert_system.evaluate_sessions([w.session for w in workers])
+            except Exception as e:
+                print(f'Alert evaluation error: {e}')
+                continue
+            elapsed = time.perf_counter() - started
+            self.alert_ticks += 1
+            self.alert_busy_seconds += elapsed
+
+            for worker, alerts in zip(workers, new_alerts):
+                # Every patient in the pass waited the whole tick for its alerts
+                pipeline_metrics.observe_stage(worker.patient_id, 'alerts', elapsed)
+                if alerts:
+                    worker.deliver_alerts(alerts)
+
+    def _node_cpu_seconds(self) -> float:
+        """CPU used by this process plus, in process mode, the pool's worker processes"""
+        pool = self._pool
+        return time.process_time() + (pool.worker_cpu_seconds() if pool is not None else 0.0)
+
+    def start(self, patient_id: str, patient_name: str = None, camera_index: int = 0) -> MonitorWorker:
+        """Start monitoring a patient, or return the monitor that is already running"""
+        if self.execution != 'process':
+            self._ensure_services()
+
+        with self._lock:
+            worker = self._workers.get(patient_id)
+            if worker is not None and worker.is_running:
+                return worker
+
+            if not any(w.is_running for w in self._workers.values()):
+                self._cpu_samples.clear()
+                self._cpu_samples.append((time.monotonic(), self._node_cpu_seconds()))
+
+            for other in self._workers.values():
+                if other.is_running and other.camera_index == camera_index:
+                    raise ValueError(f'Camera {camera_index} is already used by patient {other.patient_id}')
+
+            if len([w for w in self._workers.values() if w.is_running]) >= self.max_monitors:
+                raise ValueError(f'Monitor limit reached ({self.max_monitors})')
+
+            if self.execution == 'process':
+                if self._pool is None:
+                    from app.monitor_pool import MonitorPool
+                    self._pool = MonitorPool()
+                from app.monitor_pool import PooledMonitorWorker
+                worker = PooledMonitorWorker(
+                    patient_id, patient_name or patient_id, camera_index, self._pool
+                )
+            else:
+                # A new session starts with no open alerts, even if the last one was not stopped cleanly
+                self.alert_system.reset(patient_id)
+                worker = MonitorWorker(
+                    patient_id, patient_name or patient_id, camera_index, executor=self.executor,
+                    inference_service=self.inference_service, alert_system=self.alert_system
+                )
+            worker.listeners = self.listeners
+            self._workers[patient_id] = worker
+
+        worker.start()
+        return worker
+
+    def add_listener(self, listener: Callable):
+        """Register listener(worker, new_alerts), called after every processed frame"""
+        self.listeners.append(listener)
+
+    def stop(self, patient_id: str) -> bool:
+        """Stop monitoring a patient; returns False if the patient is unknown"""
+        with self._lock:
+            worker = self._workers.pop(patient_id, None)
+
+        if worker is None:
+            return False
+        worker.stop()
+        # Open alerts and cooldowns must not carry over into the patient's next session
+        if self.alert_system is not None:
+            self.alert_system.reset(patient_id)
+        return True
+
+    def stop_all(self):
+        """Stop every monitor"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+
+        for worker in workers:
+            worker.stop()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        # The pool's CPU counters went with it
+        self._cpu_samples.clear()
+        with self._services_lock:
+            if self.inference_service is not None:
+                self.inference_service.close()
+                self.inference_service = None
+            self._inference_unavailable = False
+            if self._alert_thread is not None:
+                self._alert_stop.set()
+                self._alert_thread.join(timeout=2.0)
+                self._alert_thread = None
+                self.alert_system = None
+
+    def get(self, patient_id: str) -> Optional[MonitorWorker]:
+        """Get the monitor for a patient"""
+        with self._lock:
+            return self._workers.get(patient_id)
+
+    def list(self) -> List[MonitorWorker]:
+        """Get all registered monitors"""
+        with self._lock:
+            return list(self._workers.values())
+
+    def get_resource_summary(self) -> Dict:
+        """Per-monitor accounting plus an estimate of how many beds this node can carry"""
+        workers = self.list()
+        running = [w for w in workers if w.is_running]
+
+        # Node CPU use as a share of all cores over roughly the last RESOURCE_WINDOW_SECONDS
+        cpu_count = os.cpu_count() or 1
+        now, cpu_now = time.monotonic(), self._node_cpu_seconds()
+        samples = self._cpu_samples
+        samples.append((now, cpu_now))
+        while len(samples) > 2 and samples[1][0] <= now - Config.RESOURCE_WINDOW_SECONDS:
+            samples.popleft()
+        elapsed = now - samples[0][0]
+        cpu_used = cpu_now - samples[0][1]
+        node_utilization = cpu_used / (elapsed * cpu_count) if elapsed > 0 else 0.0
+
+        estimated_capacity = None
+        if running and node_utilization > 0:
+            estimated_capacity = int(len(running) / node_utilization)
+
+        return {
+            'cpu_count': cpu_count,
+            'active_monitors': len(running),
+            'max_monitors': self.max_monitors,
+            'node_cpu_utilization': node_utilization,
+            'estimated_bed_capacity': estimated_capacity,
+            'object_inference': self.inference_service.get_stats() if self.inference_service else None,
+            'alert_evaluation': dict(
+                self.alert_system.get_stats(), ticks=self.alert_ticks,
+                avg_tick_ms=1000 * self.alert_busy_seconds / self.alert_ticks if self.alert_ticks else 0.0
+            ) if self.alert_system else None,
+            'monitors': [w.get_stats() for w in workers]
+        }
@@ -1,43 +1,102 @@
 import cv2
+import time
+import threading
 import numpy as np
-from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Callable
 from app.detectors.pose_detector import PoseDetector
 from app.detectors.object_detector import ObjectDetector
+from app.utils.batch_inference import BatchInferenceService
 from app.detectors.tremor_detector import TremorDetector
 from app.detectors.heart_rate_detector import HeartRateDetector
 from app.detectors.breathing_detector import BreathingDetector
 from app.detectors.health_color_detector import HealthColorDetector
+from app.detectors.face_detector import FaceDetector
+from app.config.settings import Config
 from app.models.patient import HealthMetrics, SafetyMetrics, PatientSession
 from app.utils.alert_system import AlertSystem
 from app.utils.camera_utils import CameraManager
+from app.utils.frame_context import FrameContext
+from app.utils.detector_scheduler import DetectorScheduler
+
+def object_backend_options() -> Dict:
+    """Object detection backend settings from Config"""
+    return {
+        'backend': Config.OBJECT_BACKEND,
+        'model_path': Config.YOLO_MODEL_PATH,
+        'onnx_path': Config.OBJECT_ONNX_PATH,
+        'int8_path': Config.OBJECT_ONNX_INT8_PATH,
+        'providers': Config.OBJECT_ONNX_PROVIDERS
+    }
 
 class PatientMonitor:
     """Main monitoring system that orchestrates all detectors"""
     
-    def __init__(self, patient_id: str = 'P001', patient_name: str = 'Patient'):
+    def __init__(self, patient_id: str = 'P001', patient_name: str = 'Patient', camera_index: int = 0,
+                 parallel: bool = None, executor: ThreadPoolExecutor = None,
+                 inference_service: BatchInferenceService = None, alert_system: AlertSystem = None,
+                 evaluate_alerts: bool = True, seed: int = None):
         self.patient_session = PatientSession(patient_id, patient_name)
         
         # Initialize detectors
         self.pose_detector = PoseDetector()
-        self.object_detector = ObjectDetector()
-        self.tremor_detector = TremorDetector()
-        self.heart_rate_detector = HeartRateDetector()
-        self.breathing_detector = BreathingDetector()
-        self.health_color_detector = HealthColorDetector()
-        self.alert_system = AlertSystem()
+        self.object_detector = ObjectDetector(inference_service=inference_service, **object_backend_options())
+        self.tremor_detector = TremorDetector(
+            window_size=Config.TREMOR_WINDOW_SIZE,
+            band=Config.TREMOR_BAND_HZ,
+            reference_amplitude=Config.TREMOR_REFERENCE_AMPLITUDE
+        )
+        self.face_detector = FaceDetector(
+            redetect_interval=Config.FACE_REDETECT_INTERVAL,
+            min_track_score=Config.FACE_TRACK_MIN_SCORE
+        )
+        self.heart_rate_detector = HeartRateDetector(face_detector=self.face_detector)
+        self.breathing_detector = BreathingDetector(
+            mode=Config.BREATHING_FLOW_MODE,
+            pyramid_level=Config.BREATHING_PYRAMID_LEVEL
+        )
+        self.seed = Config.RANDOM_SEED if seed is None else seed
+        self.health_color_detector = HealthColorDetector(face_detector=self.face_detector, seed=self.seed)
+        self.alert_system = alert_system or AlertSystem()
+        # False when the owner evaluates the alert rules itself (MonitorRegistry's ward tick)
+        self.evaluate_alerts = evaluate_alerts
         
         # Camera manager
-        self.camera_manager = CameraManager()
+        self.camera_manager = CameraManager(
+            camera_index=camera_index,
+            threaded=Config.CAPTURE_THREADED,
+            grab_on_skip=Config.CAPTURE_GRAB_ON_SKIP
+        )
+        
+        # Optional thread pool for running independent detectors concurrently.
+        # A shared executor may be passed in to bound threads across monitors.
+        if parallel is None:
+            parallel = Config.PARALLEL_DETECTORS
+        self._owns_executor = parallel and executor is None
+        if self._owns_executor:
+            executor = ThreadPoolExecutor(
+                max_workers=Config.DETECTOR_WORKERS,
+                thread_name_prefix=f'detectors-{patient_id}'
+            )
+        self.executor = executor if parallel else None
+        
+        # Per-detector cadence; slow-changing checks reuse their last result
+        self.scheduler = DetectorScheduler(Config.DETECTOR_RATES)
+        
+        # CPU time detectors spent on executor threads, which the caller's thread_time misses
+        self.offloaded_cpu_seconds = 0.0
+        self._cpu_lock = threading.Lock()
         
         # Frame tracking
         self.prev_pose_landmarks = None
         self.frame_count = 0
+        self.conversion_counts: Dict[str, int] = {}
         
     def initialize_camera(self) -> bool:
         """Initialize camera"""
         return self.camera_manager.initialize()
     
-    def process_frame(self, frame: Optional[np.ndarray] = None) -> Dict:
+    def process_frame(self, frame: Optional[np.ndarray] = None, timestamp: float = None) -> Dict:
         """Process a single frame and update patient metrics"""
         
         # Read frame if not provided
@@ -45,45 +104,53 @@ class PatientMonitor:
             frame = self.camera_manager.read_frame()
             if frame is None:
                 return {'error': 'Failed to read frame'}
+            timestamp = self.camera_manager.last_capture_time
+        
+        if timestamp is None:
+            timestamp = time.monotonic()
         
         self.frame_count += 1
+        # Milliseconds per stage; detectors appear only on frames where they actually ran
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
         result = {
             'frame_number': self.frame_count,
             'status': 'processing',
-            'detections': {}
+            'detections': {},
+            'timings': timings
         }
         
+        # Shared colour conversions, computed lazily at most once per frame
+        context = FrameContext(frame)
+        
         # Pose detection
-        frame_pose, pose_data = self.pose_detector.detect_pose(frame)
+        frame_pose, pose_data = self.pose_detector.detect_pose(frame, context)
         result['detections']['pose'] = pose_data
+        stage = time.perf_counter()
+        timings['pose'] = 1000 * (stage - started)
         
-        if pose_data['landmarks']:
-            # Safety analysis
-            fall_risk = self.pose_detector.detect_fall_risk(pose_data['landmarks'])
-            self_harm_risk = self.pose_detector.detect_self_harm_risk(pose_data['landmarks'])
-            aggressive_motion = self.pose_detector.detect_aggressive_motion(
-                pose_data['landmarks'], self.prev_pose_landmarks
-            )
+        if pose_data['has_person']:
+            # Safety analysis on the (33, 4) landmark array
+            risks = self.pose_detector.detect_safety_risks(pose_data['landmarks'], self.prev_pose_landmarks)
+            timings['safety'] = 1000 * (time.perf_counter() - stage)
+            fall_risk = risks['fall_risk']
+            self_harm_risk = risks['self_harm_risk']
+            aggressive_motion = risks['aggressive_motion']
             
             self.prev_pose_landmarks = pose_data['landmarks']
             
-            # Tremor detection
-            tremor_data = self.tremor_detector.detect_tremor(frame)
-            result['detections']['tremor'] = tremor_data
-            
-            # Object detection
-            frame_obj, obj_data = self.object_detector.detect_objects(frame)
-            result['detections']['objects'] = obj_data
-            
-            # Health detectors
-            heart_rate_data = self.heart_rate_detector.detect_heart_rate(frame)
-            result['detections']['heart_rate'] = heart_rate_data
+            # Tremor, object, face and health detectors are independent of each other;
+            # only those due at their configured rate run, the rest carry forward
+            tasks = self._detector_tasks(frame, context, pose_data['landmarks'], timestamp)
+            fresh = self._run_detectors(self.scheduler.select_due(tasks, timestamp), timings)
+            detections = self.scheduler.merge(fresh, tasks.keys(), timestamp)
+            result['detections'].update(detections)
             
-            breathing_data = self.breathing_detector.detect_breathing(frame)
-            result['detections']['breathing'] = breathing_data
-            
-            health_color_data = self.health_color_detector.detect_health_indicators(frame)
-            result['detections']['health_color'] = health_color_data
+            tremor_data = detections['tremor']
+            obj_data = detections['objects']
+            heart_rate_data = detections['heart_rate']
+            breathing_data = detections['breathing']
+            health_color_data = detections['health_color']
             
             # Update patient metrics
             health_metrics = HealthMetrics(
@@ -104,32 +171,102 @@ class PatientMonitor:
             self.patient_session.update_health_metrics(health_metrics)
             self.patient_session.update_safety_metrics(safety_metrics)
             
-            # Update risk level
-            self.patient_session.risk_level = self.patient_session.calculate_risk_level()
-            
-            # Generate alerts
-            new_alerts = self.alert_system.generate_alerts(self.patient_session)
-            new_alerts = self.alert_system.filter_and_deduplicate(new_alerts)
-            
-            # Update current alerts (keep last 5)
-            self.patient_session.current_alerts = new_alerts[-5:]
-            
-            # Add new alerts to history
-            for alert in new_alerts:
-                self.patient_session.add_alert(alert)
+            # Update risk level and open alerts; only newly raised alerts come back
+            new_alerts = []
+            if self.evaluate_alerts:
+                stage = time.perf_counter()
+                # Cooldowns follow frame time, which is video time for recorded footage
+                new_alerts = self.alert_system.generate_alerts(self.patient_session, timestamp)
+                
+                # Add new alerts to history (current_alerts already holds them)
+                for alert in new_alerts:
+                    self.patient_session.alerts_history.append(alert)
+                timings['alerts'] = 1000 * (time.perf_counter() - stage)
             
+            result['alerts'] = new_alerts
             result['status'] = 'success'
         
+        # Accumulate how many conversions each frame actually needed
+        for key, count in context.conversions.items():
+            self.conversion_counts[key] = self.conversion_counts.get(key, 0) + count
+        
         # Draw visualizations
+        stage = time.perf_counter()
         frame = self._draw_visualizations(frame, result)
         result['frame'] = frame
+        timings['draw'] = 1000 * (time.perf_counter() - stage)
+        timings['total'] = 1000 * (time.perf_counter() - started)
         
         return result
     
+    def _detector_tasks(self, frame: np.ndarray, context: FrameContext, landmarks: np.ndarray = None,
+                        timestamp: float = None) -> Dict[str, Callable[[], Dict]]:
+        """Build the per-frame detector calls, keyed by their result name"""
+        def face():
+            face_region = self.face_detector.detect_face(frame, context)
+            return {
+                'face_detected': face_region is not None,
+                'face_region': face_region,
+                'tracked': self.face_detector.tracked
+            }
+        
+        # The face is localised once per frame; later callers get the memoised box
+        return {
+            'tremor': lambda: self.tremor_detector.detect_tremor(frame, context, timestamp),
+            'objects': lambda: self.object_detector.detect_objects(frame, draw=False)[1],
+            'face': face,
+            'heart_rate': lambda: self.heart_rate_detector.detect_heart_rate(
+                frame, self.face_detector.detect_face(frame, context), context
+            ),
+            'breathing': lambda: self.breathing_detector.detect_breathing(frame, context, landmarks),
+            'health_color': lambda: self.health_color_detector.detect_health_indicators(
+                frame, self.face_detector.detect_face(frame, context), context
+            ),
+        }
+    
+    def _run_detectors(self, tasks: Dict[str, Callable[[], Dict]],
+                       timings: Dict[str, float] = None) -> Dict[str, Dict]:
+        """Run detector calls one after another, or concurrently on the thread pool"""
+        if timings is not None:
+            tasks = {name: self._timed(name, task, timings) for name, task in tasks.items()}
+        
+        if self.executor is None:
+            return {name: task() for name, task in tasks.items()}
+        
+        futures = {name: self.executor.submit(self._cpu_accounted(task)) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+    
+    def _cpu_accounted(self, task: Callable[[], Dict]) -> Callable[[], Dict]:
+        """Wrap a detector call run on the pool so its thread CPU time is charged to this monitor"""
+        def run():
+            started = time.thread_time()
+            try:
+                return task()
+            finally:
+                with self._cpu_lock:
+                    self.offloaded_cpu_seconds += time.thread_time() - started
+        return run
+    
+    @staticmethod
+    def _timed(name: str, task: Callable[[], Dict], timings: Dict[str, float]) -> Callable[[], Dict]:
+        """Wrap a detector call to record its own duration (also when run on the pool)"""
+        def run():
+            started = time.perf_counter()
+            try:
+                return task()
+            finally:
+                timings[name] = 1000 * (time.perf_counter() - started)
+        return run
+    
     def _draw_visualizations(self, frame: np.ndarray, detection_result: Dict) -> np.ndarray:
         """Draw detection results on frame"""
         h, w = frame.shape[:2]
         
+        # Draw object boxes only after every detector has read the clean frame
+        obj_data = detection_result['detections'].get('objects')
+        if obj_data:
+            frame = self.object_detector.draw_detections(frame, obj_data)
+        
         # Draw risk level in corner
         risk_level = self.patient_session.risk_level
         color_map = {
@@ -173,6 +310,8 @@ class PatientMonitor:
     def release(self):
         """Release resources"""
         self.camera_manager.release()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
     
     def get_session_summary(self) -> Dict:
         """Get session summary"""
@@ -181,7 +320,7 @@ class PatientMonitor:
             'patient_name': self.patient_session.patient_name,
             'risk_level': self.patient_session.risk_level,
             'frames_processed': self.frame_count,
-            'total_alerts': len(self.patient_session.alerts_history),
+            'total_alerts': self.patient_session.alerts_history.total_count,
             'current_alerts': len(self.patient_session.current_alerts),
             'current_metrics': {
                 'health': {
@@ -1,57 +1,58 @@
-from flask import Blueprint, jsonify
-from app.models.patient import PatientSession
-from app.utils.camera_utils import encode_frame_to_base64
-from app.patient_monitor import PatientMonitor
-import json
-import threading
 import time
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.config.settings import Config
+from app.monitor_registry import MonitorRegistry, MonitorWorker
+from app.utils.pipeline_metrics import pipeline_metrics
 
 main_bp = Blueprint('main', __name__)
 camera_bp = Blueprint('camera', __name__, url_prefix='/api/camera')
 
-# Global session for demo
-current_session: PatientSession = None
-current_frame = None
-monitoring_active = False
-monitor_thread = None
-patient_monitor: PatientMonitor = None
+# One monitor per patient/camera on this node
+registry = MonitorRegistry()
 
-def start_monitoring_thread():
-    """Start the monitoring thread that processes frames continuously"""
-    global monitoring_active, monitor_thread, current_session, current_frame, patient_monitor
-    
-    if monitoring_active:
-        return
-    
-    monitoring_active = True
+def build_status(worker: MonitorWorker, include_frame: bool = True) -> dict:
+    """Build the status payload for one patient's monitor"""
+    session = worker.session if worker else None
+    if session is None:
+        return {
+            'status': 'offline',
+            'message': 'No active session'
+        }
     
-    def monitor():
-        global current_session, current_frame, patient_monitor
-        while monitoring_active:
-            try:
-                if patient_monitor is None:
-                    patient_monitor = PatientMonitor()
-                    if not patient_monitor.initialize_camera():
-                        print('⚠️ Camera initialization failed')
-                        break
-                
-                # Process frame
-                result = patient_monitor.process_frame()
-                if 'error' in result:
-                    continue
-                
-                # Update global session
-                current_session = patient_monitor.patient_session
-                current_frame = result.get('frame')
-                
-                time.sleep(0.05)  # ~20 FPS
-            except Exception as e:
-                print(f'Monitoring error: {e}')
-                time.sleep(0.1)
+    # Encoded once per processed frame and shared by every viewer
+    frame_base64 = None
+    if include_frame:
+        try:
+            _, frame_base64 = worker.frame_cache.get_base64()
+        except:
+            frame_base64 = None
     
-    monitor_thread = threading.Thread(target=monitor, daemon=True)
-    monitor_thread.start()
-    print('✓ Monitoring thread started')
+    return {
+        'status': 'active',
+        'patient_id': session.patient_id,
+        'patient_name': session.patient_name,
+        'risk_level': session.risk_level,
+        'metrics': {
+            'heart_rate': session.current_health_metrics.heart_rate,
+            'breathing_rate': session.current_health_metrics.breathing_rate,
+            'stress_level': session.current_health_metrics.stress_level,
+            'tremor_score': session.current_health_metrics.tremor_score,
+            'fall_risk': session.current_safety_metrics.fall_risk,
+            'self_harm_risk': session.current_safety_metrics.self_harm_risk,
+            'aggressive_motion': session.current_safety_metrics.aggressive_motion,
+        },
+        'alerts': [
+            {
+                'alert_type': a.alert_type,
+                'severity': a.severity,
+                'message': a.message,
+                'timestamp': a.timestamp.isoformat(),
+                'repeat_count': a.repeat_count,
+                'last_seen': a.last_seen.isoformat() if a.last_seen else None
+            } for a in session.current_alerts
+        ],
+        'frame': frame_base64
+    }
 
 @main_bp.route('/')
 def home():
@@ -65,7 +66,13 @@ def home():
                 'status': '/api/status',
                 'session': '/api/session',
                 'alerts': '/api/alerts',
-                'metrics': '/api/metrics'
+                'metrics': '/api/metrics',
+                'patients': '/api/patients',
+                'patient_status': '/api/patients/<patient_id>/status',
+                'patient_history': '/api/patients/<patient_id>/history',
+                'resources': '/api/resources',
+                'stream': '/api/camera/stream',
+                'patient_stream': '/api/camera/<patient_id>/stream'
             }
         }
     })
@@ -119,7 +126,7 @@ def dashboard():
                 <div class="card">
                     <h2>Live Feed</h2>
                     <div class="video-container">
-                        <img id="videoFeed" src="" alt="Live Feed">
+                        <img id="videoFeed" src="/api/camera/stream?fps=15" alt="Live Feed">
                     </div>
                 </div>
                 
@@ -174,114 +181,263 @@ def dashboard():
             </div>
         </div>
         
+        <script src="https://cdn.socket.io/4.7.5/socket.io.min.js"></script>
         <script>
+            function renderStatus(data) {
+                if (data.metrics) {
+                    const m = data.metrics;
+                    document.getElementById('heartRate').textContent = (m.heart_rate || 0).toFixed(0) + ' BPM';
+                    document.getElementById('breathingRate').textContent = (m.breathing_rate || 0).toFixed(0) + ' BPM';
+                    document.getElementById('stressLevel').textContent = (m.stress_level || 0).toFixed(2);
+                    document.getElementById('tremorScore').textContent = (m.tremor_score || 0).toFixed(2);
+                    document.getElementById('fallRisk').textContent = (m.fall_risk || 0).toFixed(2);
+                    document.getElementById('selfHarmRisk').textContent = (m.self_harm_risk || 0).toFixed(2);
+                    document.getElementById('aggression').textContent = (m.aggressive_motion || 0).toFixed(2);
+                    
+                    const riskLevel = data.risk_level || 'SAFE';
+                    const riskBadge = document.getElementById('riskLevel');
+                    riskBadge.textContent = riskLevel;
+                    riskBadge.className = 'metric-value risk-badge risk-' + riskLevel.toLowerCase();
+                }
+                if (data.alerts) {
+                    const alertsList = document.getElementById('alertsList');
+                    alertsList.innerHTML = data.alerts.length > 0 
+                        ? data.alerts.map(a => `<div class="alert ${a.severity.toLowerCase()}">
+                            <strong>${a.alert_type}:</strong> ${a.message}${a.repeat_count ? ` (×${a.repeat_count + 1})` : ''}
+                          </div>`).join('')
+                        : '<div style="color: #00ff00;">✓ No active alerts</div>';
+                }
+            }
+            
+            function renderNewAlerts(alerts) {
+                // Show pushed alerts right away; the next snapshot replaces the list
+                const alertsList = document.getElementById('alertsList');
+                alerts.forEach(a => {
+                    alertsList.insertAdjacentHTML('afterbegin', `<div class="alert ${a.severity.toLowerCase()}">
+                        <strong>${a.alert_type}:</strong> ${a.message}
+                      </div>`);
+                });
+            }
+            
             function updateDashboard() {
-                fetch('/api/status')
+                // Video arrives over the MJPEG stream; poll only metrics and alerts
+                fetch('/api/status?frame=0')
                     .then(r => r.json())
-                    .then(data => {
-                        if (data.frame) {
-                            document.getElementById('videoFeed').src = 'data:image/jpeg;base64,' + data.frame;
-                        }
-                        if (data.metrics) {
-                            const m = data.metrics;
-                            document.getElementById('heartRate').textContent = (m.heart_rate || 0).toFixed(0) + ' BPM';
-                            document.getElementById('breathingRate').textContent = (m.breathing_rate || 0).toFixed(0) + ' BPM';
-                            document.getElementById('stressLevel').textContent = (m.stress_level || 0).toFixed(2);
-                            document.getElementById('tremorScore').textContent = (m.tremor_score || 0).toFixed(2);
-                            document.getElementById('fallRisk').textContent = (m.fall_risk || 0).toFixed(2);
-                            document.getElementById('selfHarmRisk').textContent = (m.self_harm_risk || 0).toFixed(2);
-                            document.getElementById('aggression').textContent = (m.aggressive_motion || 0).toFixed(2);
-                            
-                            const riskLevel = data.risk_level || 'SAFE';
-                            const riskBadge = document.getElementById('riskLevel');
-                            riskBadge.textContent = riskLevel;
-                            riskBadge.className = 'metric-value risk-badge risk-' + riskLevel.toLowerCase();
-                        }
-                        if (data.alerts) {
-                            const alertsList = document.getElementById('alertsList');
-                            alertsList.innerHTML = data.alerts.length > 0 
-                                ? data.alerts.map(a => `<div class="alert ${a.severity.toLowerCase()}">
-                                    <strong>${a.alert_type}:</strong> ${a.message}
-                                  </div>`).join('')
-                                : '<div style="color: #00ff00;">✓ No active alerts</div>';
-                        }
-                    });
+                    .then(renderStatus);
             }
             
             // Auto-start camera on page load
             fetch('/api/camera/start', { method: 'POST' })
                 .then(r => r.json())
-                .then(d => console.log('Camera started:', d))
+                .then(d => {
+                    console.log('Camera started:', d);
+                    // Reconnect the stream now that frames are being produced
+                    document.getElementById('videoFeed').src = '/api/camera/stream?fps=15&t=' + Date.now();
+                })
                 .catch(e => console.error('Camera start error:', e));
             
-            // Update dashboard every 200ms for real-time view
-            setInterval(updateDashboard, 200);
+            // Metrics and alerts are pushed over Socket.IO; poll slowly only while disconnected
+            let pushConnected = false;
+            if (window.io) {
+                const socket = io({ auth: { patient_id: 'P001' } });
+                socket.on('connect', () => { pushConnected = true; });
+                socket.on('disconnect', () => { pushConnected = false; });
+                socket.on('metrics', renderStatus);
+                socket.on('alerts', d => renderNewAlerts(d.alerts));
+            }
+            setInterval(() => { if (!pushConnected) updateDashboard(); }, 2000);
             updateDashboard();
         </script>
     </body>
     </html>
     '''
 
+def status_response(worker: MonitorWorker):
+    """Status JSON tagged with the frame it describes; 304 if the client already has it.
+    Pass ?frame=0 to leave out the image when the live feed comes from the MJPEG stream."""
+    include_frame = request.args.get('frame', '1') != '0'
+    if worker is None or worker.session is None:
+        return jsonify(build_status(worker, include_frame))
+    
+    etag = f'{worker.patient_id}-{int(worker.started_at * 1000)}-{worker.frame_cache.frame_number}'
+    if not include_frame:
+        etag += '-noframe'
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    response = jsonify(build_status(worker, include_frame))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @main_bp.route('/api/status')
 def get_status():
-    """Get current system status"""
-    global current_session, current_frame
+    """Get current system status for the default patient"""
+    return status_response(registry.get(Config.DEFAULT_PATIENT_ID))
+
+@main_bp.route('/api/patients')
+def list_patients():
+    """List all monitored patients"""
+    return jsonify({
+        'patients': [
+            {
+                'patient_id': worker.patient_id,
+                'patient_name': worker.patient_name,
+                'camera_index': worker.camera_index,
+                'running': worker.is_running,
+                'risk_level': worker.session.risk_level if worker.session else None,
+                'error': worker.error
+            } for worker in registry.list()
+        ]
+    })
+
+@main_bp.route('/api/patients/<patient_id>/status')
+def get_patient_status(patient_id):
+    """Get current status for one patient"""
+    worker = registry.get(patient_id)
+    if worker is None:
+        return jsonify({'status': 'error', 'message': f'Unknown patient {patient_id}'}), 404
     
-    if current_session is None:
-        return jsonify({
-            'status': 'offline',
-            'message': 'No active session'
-        })
+    return status_response(worker)
+
+@main_bp.route('/api/patients/<patient_id>/start', methods=['POST'])
+def start_patient(patient_id):
+    """Start monitoring a patient; body may set patient_name and camera_index"""
+    body = request.get_json(silent=True) or {}
+    try:
+        worker = registry.start(
+            patient_id,
+            patient_name=body.get('patient_name'),
+            camera_index=int(body.get('camera_index', Config.CAMERA_INDEX))
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
     
-    frame_base64 = None
-    if current_frame is not None:
-        try:
-            frame_base64 = encode_frame_to_base64(current_frame)
-        except:
-            frame_base64 = None
+    return jsonify({
+        'status': 'success',
+        'message': f'Monitoring started for {worker.patient_id}',
+        'camera_index': worker.camera_index
+    })
+
+@main_bp.route('/api/patients/<patient_id>/stop', methods=['POST'])
+def stop_patient(patient_id):
+    """Stop monitoring a patient"""
+    if not registry.stop(patient_id):
+        return jsonify({'status': 'error', 'message': f'Unknown patient {patient_id}'}), 404
+    
+    return jsonify({'status': 'success', 'message': f'Monitoring stopped for {patient_id}'})
+
+@main_bp.route('/api/patients/<patient_id>/history')
+def get_patient_history(patient_id):
+    """Get min/max/mean metric rollups; query: resolution (1s, 1min, 1h), start, end (epoch s)"""
+    worker = registry.get(patient_id)
+    session = worker.session if worker else None
+    if session is None:
+        return jsonify({'status': 'error', 'message': f'Unknown patient {patient_id}'}), 404
+    
+    resolution = request.args.get('resolution', '1min')
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    try:
+        health = session.metric_rollup('health', resolution, start, end)
+        safety = session.metric_rollup('safety', resolution, start, end)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    def to_json(rollup):
+        return {
+            key: {stat: values.tolist() for stat, values in value.items()} if isinstance(value, dict)
+            else value.tolist() if hasattr(value, 'tolist') else value
+            for key, value in rollup.items()
+        }
     
     return jsonify({
-        'status': 'active',
-        'patient_id': current_session.patient_id,
-        'patient_name': current_session.patient_name,
-        'risk_level': current_session.risk_level,
-        'metrics': {
-            'heart_rate': current_session.current_health_metrics.heart_rate,
-            'breathing_rate': current_session.current_health_metrics.breathing_rate,
-            'stress_level': current_session.current_health_metrics.stress_level,
-            'tremor_score': current_session.current_health_metrics.tremor_score,
-            'fall_risk': current_session.current_safety_metrics.fall_risk,
-            'self_harm_risk': current_session.current_safety_metrics.self_harm_risk,
-            'aggressive_motion': current_session.current_safety_metrics.aggressive_motion,
-        },
-        'alerts': [
-            {
-                'alert_type': a.alert_type,
-                'severity': a.severity,
-                'message': a.message,
-                'timestamp': a.timestamp.isoformat()
-            } for a in current_session.current_alerts
-        ],
-        'frame': frame_base64
+        'patient_id': patient_id,
+        'resolution': resolution,
+        'health': to_json(health),
+        'safety': to_json(safety)
     })
 
+@main_bp.route('/api/resources')
+def get_resources():
+    """Get per-monitor resource accounting and node capacity estimate"""
+    summary = registry.get_resource_summary()
+    publisher = current_app.extensions.get('event_publisher')
+    if publisher is not None:
+        summary['events'] = publisher.get_stats()
+    return jsonify(summary)
+
+@main_bp.route('/api/metrics')
+def get_metrics():
+    """Per-stage latency histograms and frame counters in Prometheus text format"""
+    monitor_stats = [worker.get_stats() for worker in registry.list()]
+    return Response(pipeline_metrics.render(monitor_stats), mimetype='text/plain; version=0.0.4')
+
 @camera_bp.route('/start', methods=['POST'])
 def start_camera():
-    """Start camera monitoring"""
-    global current_session, patient_monitor, monitoring_active
-    
-    if not monitoring_active:
-        start_monitoring_thread()
+    """Start camera monitoring for the default patient"""
+    try:
+        registry.start(Config.DEFAULT_PATIENT_ID, camera_index=Config.CAMERA_INDEX)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
     
     return jsonify({'status': 'success', 'message': 'Camera monitoring started'})
 
 @camera_bp.route('/stop', methods=['POST'])
 def stop_camera():
-    """Stop camera monitoring"""
-    global current_session, monitoring_active, patient_monitor
-    monitoring_active = False
-    current_session = None
-    if patient_monitor:
-        patient_monitor.camera_manager.release()
+    """Stop camera monitoring for the default patient"""
+    registry.stop(Config.DEFAULT_PATIENT_ID)
     
     return jsonify({'status': 'success', 'message': 'Camera monitoring stopped'})
+
+def mjpeg_frames(worker, max_fps: float):
+    """Yield multipart JPEG parts from the monitor's shared frame cache, at most max_fps"""
+    interval = 1.0 / max_fps
+    last_frame_number = 0
+    last_sent = 0.0
+    
+    while worker.is_running:
+        # Per-client rate cap: skip frames published faster than this viewer wants
+        wait = interval - (time.monotonic() - last_sent)
+        if wait > 0:
+            time.sleep(wait)
+        
+        frame_number, jpeg = worker.frame_cache.wait_for_frame(last_frame_number, timeout=1.0)
+        if frame_number == last_frame_number:
+            continue
+        # A frame with no image (e.g. its shared-memory slot was already reused) is skipped
+        # too, so the next wait blocks for a newer frame instead of returning at once
+        last_frame_number = frame_number
+        if jpeg is None:
+            continue
+        
+        last_sent = time.monotonic()
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n'
+               b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' +
+               jpeg + b'\r\n')
+
+def stream_response(worker: MonitorWorker):
+    """MJPEG multipart response for one patient's live feed; ?fps= caps this client's rate"""
+    if worker is None:
+        return jsonify({'status': 'error', 'message': 'No active session'}), 404
+    
+    max_fps = request.args.get('fps', Config.STREAM_MAX_FPS, type=float)
+    max_fps = min(max(max_fps, 0.1), Config.MONITOR_MAX_FPS)
+    return Response(
+        mjpeg_frames(worker, max_fps),
+        mimetype='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-cache, no-store'}
+    )
+
+@camera_bp.route('/stream')
+def stream_camera():
+    """Live MJPEG feed for the default patient"""
+    return stream_response(registry.get(Config.DEFAULT_PATIENT_ID))
+
+@camera_bp.route('/<patient_id>/stream')
+def stream_patient_camera(patient_id):
+    """Live MJPEG feed for one patient"""
+    return stream_response(registry.get(patient_id))
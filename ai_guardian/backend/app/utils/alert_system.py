@@ -1,125 +1,80 @@
-from typing import List, Dict
-from datetime import datetime
+from typing import Dict, List, Tuple
+from app.config.settings import Config
 from app.models.patient import Alert, PatientSession
+from app.utils.rule_engine import RuleEngine
 
-class AlertSystem:
-    """Manages alert generation and filtering"""
+class AlertThrottle:
+    """Per (patient, alert type) cooldown window and token bucket for re-raising alerts"""
     
-    def __init__(self, max_alerts_per_type: int = 5):
-        self.max_alerts_per_type = max_alerts_per_type
-        self.alert_cooldown = {}  # Prevent duplicate alerts
+    def __init__(self, cooldown: float = 30.0, cooldowns: Dict[str, float] = None,
+                 bucket_size: float = 3, refill_rate: float = 1 / 60):
+        self.cooldown = cooldown
+        self.cooldowns = cooldowns or {}
+        self.bucket_size = bucket_size
+        self.refill_rate = refill_rate
+        # (patient_id, alert_type) -> [tokens, last refill, last allowed]
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
         
-    def generate_alerts(self, session: PatientSession) -> List[Alert]:
-        """Generate alerts based on current metrics"""
-        alerts = []
+    def allow(self, patient_id: str, alert_type: str, now: float) -> bool:
+        """Take a token if the alert may be raised again at monotonic time `now`"""
+        bucket = self._buckets.get((patient_id, alert_type))
+        if bucket is None:
+            self._buckets[(patient_id, alert_type)] = [self.bucket_size - 1, now, now]
+            return True
         
-        # Check safety metrics
-        safety_alerts = self._check_safety_metrics(session)
-        alerts.extend(safety_alerts)
+        tokens, refilled, allowed_at = bucket
+        tokens = min(self.bucket_size, tokens + (now - refilled) * self.refill_rate)
+        bucket[0], bucket[1] = tokens, now
+        if now - allowed_at < self.cooldowns.get(alert_type, self.cooldown) or tokens < 1:
+            return False
         
-        # Check health metrics
-        health_alerts = self._check_health_metrics(session)
-        alerts.extend(health_alerts)
-        
-        return alerts
+        bucket[0], bucket[2] = tokens - 1, now
+        return True
     
-    def _check_safety_metrics(self, session: PatientSession) -> List[Alert]:
-        """Check safety-related metrics"""
-        alerts = []
-        metrics = session.current_safety_metrics
-        
-        # Fall detection
-        if metrics.fall_risk > 0.7:
-            alerts.append(Alert(
-                alert_type='FALL_CRITICAL',
-                severity='CRITICAL',
-                message='CRITICAL: Fall detected or imminent!',
-                details={'fall_risk': metrics.fall_risk}
-            ))
-        elif metrics.fall_risk > 0.5:
-            alerts.append(Alert(
-                alert_type='FALL_WARNING',
-                severity='HIGH',
-                message='WARNING: Patient at risk of falling',
-                details={'fall_risk': metrics.fall_risk}
-            ))
-        
-        # Self-harm detection
-        if metrics.self_harm_risk > 0.7:
-            alerts.append(Alert(
-                alert_type='SELF_HARM_CRITICAL',
-                severity='CRITICAL',
-                message='CRITICAL: Potential self-harm detected!',
-                details={'self_harm_risk': metrics.self_harm_risk}
-            ))
-        elif metrics.self_harm_risk > 0.4:
-            alerts.append(Alert(
-                alert_type='SELF_HARM_WARNING',
-                severity='HIGH',
-                message='WARNING: Self-harm risk detected',
-                details={'self_harm_risk': metrics.self_harm_risk}
-            ))
-        
-        # Aggressive motion
-        if metrics.aggressive_motion > 0.6:
-            alerts.append(Alert(
-                alert_type='AGGRESSIVE_MOTION',
-                severity='HIGH',
-                message='WARNING: Aggressive motion detected',
-                details={'aggression_score': metrics.aggressive_motion}
-            ))
-        
-        # Dangerous objects
-        if metrics.dangerous_objects:
-            alerts.append(Alert(
-                alert_type='DANGEROUS_OBJECT',
-                severity='CRITICAL',
-                message=f'CRITICAL: Dangerous object detected: {", ".join(metrics.dangerous_objects)}',
-                details={'objects': metrics.dangerous_objects}
-            ))
-        
-        return alerts
+    def reset(self, patient_id: str = None):
+        if patient_id is None:
+            self._buckets.clear()
+        else:
+            for key in [k for k in self._buckets if k[0] == patient_id]:
+                del self._buckets[key]
+
+class AlertSystem:
+    """Manages alert generation and filtering"""
     
-    def _check_health_metrics(self, session: PatientSession) -> List[Alert]:
-        """Check health-related metrics"""
-        alerts = []
-        metrics = session.current_health_metrics
-        
-        # Heart rate abnormalities
-        if metrics.heart_rate > 140:
-            alerts.append(Alert(
-                alert_type='HIGH_HEART_RATE',
-                severity='HIGH',
-                message=f'WARNING: High heart rate detected: {metrics.heart_rate:.0f} BPM',
-                details={'heart_rate': metrics.heart_rate}
-            ))
-        elif metrics.heart_rate > 0 and metrics.heart_rate < 50:
-            alerts.append(Alert(
-                alert_type='LOW_HEART_RATE',
-                severity='HIGH',
-                message=f'WARNING: Low heart rate detected: {metrics.heart_rate:.0f} BPM',
-                details={'heart_rate': metrics.heart_rate}
-            ))
-        
-        # Tremor detection (Parkinson's indication)
-        if metrics.tremor_score > 0.7:
-            alerts.append(Alert(
-                alert_type='TREMOR_DETECTED',
-                severity='MEDIUM',
-                message='ALERT: Significant tremor detected (Parkinson\'s risk)',
-                details={'tremor_score': metrics.tremor_score}
-            ))
-        
-        # Stress level
-        if metrics.stress_level > 0.8:
-            alerts.append(Alert(
-                alert_type='HIGH_STRESS',
-                severity='MEDIUM',
-                message='ALERT: High stress level detected',
-                details={'stress_level': metrics.stress_level}
-            ))
+    def __init__(self, max_alerts_per_type: int = 5, engine: RuleEngine = None,
+                 throttle: AlertThrottle = None):
+        self.max_alerts_per_type = max_alerts_per_type
+        self.alert_cooldown = dict(Config.ALERT_COOLDOWNS)  # seconds per alert type
+        self.throttle = throttle or AlertThrottle(
+            cooldown=Config.ALERT_COOLDOWN_SECONDS,
+            cooldowns=self.alert_cooldown,
+            bucket_size=Config.ALERT_BUCKET_SIZE,
+            refill_rate=Config.ALERT_BUCKET_RATE
+        )
+        # Alert and risk thresholds live in the rule tables in app/utils/rule_engine.py
+        self.engine = engine or RuleEngine(max_current_alerts=max_alerts_per_type, throttle=self.throttle)
         
-        return alerts
+    def generate_alerts(self, session: PatientSession, now: float = None) -> List[Alert]:
+        """Evaluate the rule table for one session; returns the alerts raised or re-opened since
+        the last call. Also updates session.risk_level and session.current_alerts (the open alerts).
+        `now` is the frame time in seconds for cooldowns (default: time.monotonic())."""
+        return self.engine.evaluate([session], now)[0]
+    
+    def evaluate_sessions(self, sessions: List[PatientSession], now: float = None) -> List[List[Alert]]:
+        """Same as generate_alerts for many sessions in one vectorised pass"""
+        return self.engine.evaluate(sessions, now)
+    
+    def reset(self, patient_id: str = None):
+        """Forget open alerts and throttling state, for one patient or all"""
+        self.engine.reset(patient_id)
+        self.throttle.reset(patient_id)
+    
+    def get_stats(self) -> Dict:
+        return {
+            'alerts_raised': self.engine.alerts_raised,
+            'alerts_reopened': self.engine.alerts_reopened,
+            'repeats_suppressed': self.engine.repeats_suppressed
+        }
     
     def filter_and_deduplicate(self, alerts: List[Alert]) -> List[Alert]:
         """Remove duplicate/similar alerts"""
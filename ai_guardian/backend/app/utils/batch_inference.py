@@ -0,0 +1,118 @@
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, Dict, List
+
+class BatchInferenceService:
+    """Collects frames from many monitors and runs them through one model call per batch"""
+
+    def __init__(self, predict_batch: Callable[[List[np.ndarray]], List[Any]],
+                 max_batch_size: int = 8, max_wait: float = 0.01, name: str = 'inference',
+                 timeout: float = 5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.timeout = timeout  # default for predict(); a stuck model must not hang the monitors
+
+        self.batches_run = 0
+        self.frames_run = 0
+        self.busy_seconds = 0.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._running = True
+        # Orders submit() against close() so nothing is queued after the loop has exited
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f'batch-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray) -> Future:
+        """Queue a frame; the future resolves to that frame's entry of the batch output"""
+        future = Future()
+        with self._lock:
+            if self._running:
+                self._queue.put((frame, future))
+                return future
+        future.set_exception(RuntimeError('Inference service is closed'))
+        return future
+
+    def predict(self, frame: np.ndarray, timeout: float = None) -> Any:
+        """Blocking single-frame prediction through the shared batch; raises TimeoutError
+        after `timeout` seconds (default: the service's timeout)"""
+        future = self.submit(frame)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            # Still queued: leave it out of the batch
+            future.cancel()
+            raise
+
+    def close(self, timeout: float = 2.0):
+        with self._lock:
+            self._running = False
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> Dict:
+        return {
+            'batches_run': self.batches_run,
+            'frames_run': self.frames_run,
+            'avg_batch_size': self.frames_run / self.batches_run if self.batches_run else 0.0,
+            'avg_batch_ms': 1000 * self.busy_seconds / self.batches_run if self.batches_run else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            # Wait at most max_wait after the first frame for other streams to join
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+        # Normally empty; fail anything left rather than leave its caller waiting
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError('Inference service is closed'))
+
+    def _run_batch(self, batch: List):
+        # Callers that timed out have cancelled their futures
+        batch = [(frame, future) for frame, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        frames = [frame for frame, _ in batch]
+        started = time.perf_counter()
+        try:
+            outputs = self.predict_batch(frames)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+
+        if len(outputs) != len(batch):
+            error = RuntimeError(f'Model returned {len(outputs)} outputs for a batch of {len(batch)}')
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        self.batches_run += 1
+        self.frames_run += len(batch)
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
@@ -1,11 +1,14 @@
 import cv2
+import time
+import threading
 import numpy as np
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, Callable, Union
 
 class CameraManager:
     """Manages camera input and frame processing"""
     
-    def __init__(self, camera_index: int = 0, width: int = 640, height: int = 480, fps: int = 30):
+    def __init__(self, camera_index: int = 0, width: int = 640, height: int = 480, fps: int = 30,
+                 threaded: bool = False, grab_on_skip: bool = False, read_timeout: float = 1.0):
         self.camera_index = camera_index
         self.width = width
         self.height = height
@@ -13,6 +16,23 @@ class CameraManager:
         self.cap = None
         self.is_running = False
         
+        # Background capture: a capture thread keeps only the newest frame in a
+        # single-slot mailbox so processing never works on stale buffered frames.
+        # With grab_on_skip, frames nobody is waiting for are grabbed but not decoded.
+        self.threaded = threaded
+        self.grab_on_skip = grab_on_skip
+        self.read_timeout = read_timeout
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.last_capture_time = None
+        self._mailbox_frame = None
+        self._mailbox_time = None
+        self._mailbox_seq = 0
+        self._read_seq = 0
+        self._frame_requested = False
+        self._condition = threading.Condition()
+        self._capture_thread = None
+        
     def initialize(self) -> bool:
         """Initialize camera"""
         try:
@@ -25,6 +45,14 @@ class CameraManager:
             self.cap.set(cv2.CAP_PROP_FPS, self.fps)
             
             self.is_running = True
+            
+            if self.threaded:
+                self._capture_thread = threading.Thread(
+                    target=self._capture_loop,
+                    name=f'capture-{self.camera_index}',
+                    daemon=True
+                )
+                self._capture_thread.start()
             return True
         except Exception as e:
             print(f"Error initializing camera: {e}")
@@ -35,16 +63,88 @@ class CameraManager:
         if self.cap is None or not self.is_running:
             return None
         
+        if self.threaded:
+            return self._take_from_mailbox()
+        
         ret, frame = self.cap.read()
         if ret:
+            self.frames_captured += 1
+            self.last_capture_time = time.monotonic()
             return frame
         return None
     
+    def _take_from_mailbox(self) -> Optional[np.ndarray]:
+        """Wait for a frame newer than the last one read and take it"""
+        with self._condition:
+            self._frame_requested = True
+            has_frame = self._condition.wait_for(
+                lambda: self._mailbox_seq > self._read_seq or not self.is_running,
+                timeout=self.read_timeout
+            )
+            self._frame_requested = False
+            
+            if not has_frame or self._mailbox_frame is None:
+                return None
+            
+            frame = self._mailbox_frame
+            self.last_capture_time = self._mailbox_time
+            self._read_seq = self._mailbox_seq
+            self._mailbox_frame = None
+            return frame
+    
+    def _capture_loop(self):
+        """Continuously drain the camera, keeping only the newest frame"""
+        # The capture is released here, on this thread, so it is never released while
+        # a blocking read() is still in progress (crashes/hangs with V4L2 and MSMF)
+        cap = self.cap
+        try:
+            while self.is_running:
+                if self.grab_on_skip:
+                    if not cap.grab():
+                        time.sleep(0.01)
+                        continue
+                    captured_at = time.monotonic()
+                    
+                    # Skip decoding when no reader is waiting; the frame would be overwritten
+                    with self._condition:
+                        if not self._frame_requested:
+                            self.frames_captured += 1
+                            self.frames_dropped += 1
+                            continue
+                    ret, frame = cap.retrieve()
+                else:
+                    ret, frame = cap.read()
+                    captured_at = time.monotonic()
+                
+                if not ret:
+                    time.sleep(0.01)
+                    continue
+                
+                with self._condition:
+                    # An unread frame in the mailbox is replaced by the fresher one
+                    if self._mailbox_frame is not None:
+                        self.frames_dropped += 1
+                    self.frames_captured += 1
+                    self._mailbox_frame = frame
+                    self._mailbox_time = captured_at
+                    self._mailbox_seq += 1
+                    self._condition.notify_all()
+        finally:
+            cap.release()
+    
     def release(self):
         """Release camera"""
-        if self.cap is not None:
+        self.is_running = False
+        if self._capture_thread is not None:
+            with self._condition:
+                self._condition.notify_all()
+            self._capture_thread.join(timeout=1.0)
+            if self._capture_thread.is_alive():
+                # Still blocked in read(); the thread releases the capture when it returns
+                print(f"⚠️ Capture thread for camera {self.camera_index} still reading; release deferred")
+            self._capture_thread = None
+        elif self.cap is not None:
             self.cap.release()
-            self.is_running = False
     
     def get_frame_info(self) -> Dict:
         """Get current frame information"""
@@ -57,6 +157,16 @@ class CameraManager:
             'fps': self.cap.get(cv2.CAP_PROP_FPS),
             'frame_count': int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
         }
+    
+    def get_capture_stats(self) -> Dict:
+        """Get capture counters for the current camera"""
+        with self._condition:
+            return {
+                'threaded': self.threaded,
+                'frames_captured': self.frames_captured,
+                'frames_dropped': self.frames_dropped,
+                'last_capture_time': self.last_capture_time
+            }
 
 def resize_frame(frame: np.ndarray, width: int = 640, height: int = 480) -> np.ndarray:
     """Resize frame to specified dimensions"""
@@ -70,9 +180,92 @@ def add_text_to_frame(frame: np.ndarray, text: str, position: Tuple = (10, 30),
                font_scale, color, thickness)
     return frame
 
+def encode_frame_to_jpeg(frame: np.ndarray, quality: int = 95) -> bytes:
+    """Encode frame to JPEG bytes"""
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
 def encode_frame_to_base64(frame: np.ndarray) -> str:
     """Encode frame to base64 for web transmission"""
     import base64
-    ret, buffer = cv2.imencode('.jpg', frame)
-    frame_data = base64.b64encode(buffer).decode('utf-8')
+    frame_data = base64.b64encode(encode_frame_to_jpeg(frame)).decode('utf-8')
     return frame_data
+
+class EncodedFrameCache:
+    """Latest processed frame, JPEG-encoded at most once no matter how many viewers ask"""
+    
+    def __init__(self, quality: int = 95, on_encode: Callable[[float], None] = None):
+        self.quality = quality
+        self.frame_number = 0
+        self.encode_count = 0
+        self.on_encode = on_encode  # called with the seconds each encode took
+        self._frame = None
+        self._jpeg: Optional[bytes] = None
+        self._base64: Optional[str] = None
+        self._encoding: Optional[int] = None  # frame number being encoded outside the lock
+        self._condition = threading.Condition()
+    
+    def update(self, frame_number: int, frame: Union[np.ndarray, Callable[[], Optional[np.ndarray]]]):
+        """Publish a new frame; a callable is only resolved if somebody asks for the image"""
+        with self._condition:
+            self.frame_number = frame_number
+            self._frame = frame
+            self._jpeg = None
+            self._base64 = None
+            self._condition.notify_all()
+    
+    def get_jpeg(self) -> Tuple[int, Optional[bytes]]:
+        """Return (frame_number, JPEG bytes), encoding on the first request for this frame.
+        The encode runs outside the lock so update() never waits for it; concurrent
+        viewers of the same frame wait for that one encode instead of repeating it."""
+        with self._condition:
+            while True:
+                frame_number = self.frame_number
+                if self._jpeg is not None or self._frame is None:
+                    return frame_number, self._jpeg
+                if self._encoding != frame_number:
+                    break
+                self._condition.wait()
+            self._encoding = frame_number
+            source = self._frame
+
+        jpeg = None
+        started = time.perf_counter()
+        try:
+            frame = source() if callable(source) else source
+            if frame is not None:
+                jpeg = encode_frame_to_jpeg(frame, self.quality)
+        finally:
+            with self._condition:
+                if self._encoding == frame_number:
+                    self._encoding = None
+                # A newer frame may have been published meanwhile; only cache our own
+                if self.frame_number == frame_number:
+                    self._jpeg = jpeg
+                    self._frame = None
+                if jpeg is not None:
+                    self.encode_count += 1
+                self._condition.notify_all()
+
+        if jpeg is not None and self.on_encode is not None:
+            self.on_encode(time.perf_counter() - started)
+        return frame_number, jpeg
+    
+    def wait_for_frame(self, after_frame_number: int, timeout: float = 1.0) -> Tuple[int, Optional[bytes]]:
+        """Block until a frame newer than after_frame_number is published, then return its JPEG"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.frame_number > after_frame_number, timeout=timeout)
+        return self.get_jpeg()
+    
+    def get_base64(self) -> Tuple[int, Optional[str]]:
+        """Return (frame_number, base64 JPEG), reusing the cached encoding"""
+        import base64
+        frame_number, jpeg = self.get_jpeg()
+        if jpeg is None:
+            return frame_number, None
+        with self._condition:
+            if self.frame_number != frame_number:
+                return frame_number, base64.b64encode(jpeg).decode('utf-8')
+            if self._base64 is None:
+                self._base64 = base64.b64encode(jpeg).decode('utf-8')
+            return frame_number, self._base64
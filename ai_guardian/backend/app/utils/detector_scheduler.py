@@ -0,0 +1,40 @@
+from typing import Dict, Optional, Callable
+
+class DetectorScheduler:
+    """Runs each detector at its own rate and carries its last result forward between runs"""
+
+    def __init__(self, rates: Dict[str, Optional[float]], tolerance: float = 0.005):
+        # Rates are in Hz; None or 0 means run on every frame
+        self.rates = dict(rates)
+        self.tolerance = tolerance
+        self._last_run: Dict[str, float] = {}
+        self._last_result: Dict[str, Dict] = {}
+
+    def is_due(self, name: str, now: float) -> bool:
+        """Check whether a detector should run on the frame captured at `now`"""
+        rate = self.rates.get(name)
+        if not rate or name not in self._last_result:
+            return True
+
+        return now - self._last_run[name] >= 1.0 / rate - self.tolerance
+
+    def select_due(self, tasks: Dict[str, Callable[[], Dict]], now: float) -> Dict[str, Callable[[], Dict]]:
+        """Keep only the detector calls that are due on this frame"""
+        return {name: task for name, task in tasks.items() if self.is_due(name, now)}
+
+    def merge(self, fresh: Dict[str, Dict], names, now: float) -> Dict[str, Dict]:
+        """Record fresh results and fill every other detector with its last result, aged"""
+        for name, result in fresh.items():
+            self._last_run[name] = now
+            self._last_result[name] = result
+
+        merged = {}
+        for name in names:
+            if name in self._last_result:
+                merged[name] = dict(self._last_result[name], age=now - self._last_run[name])
+        return merged
+
+    def reset(self):
+        """Forget all previous runs so every detector is due again"""
+        self._last_run.clear()
+        self._last_result.clear()
@@ -0,0 +1,157 @@
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List
+from flask import request
+
+class ClientQueue:
+    """Send queue for one Socket.IO client; metric snapshots coalesce, alerts drop oldest"""
+
+    def __init__(self, sid: str, patient_id: str, max_alerts: int = 50):
+        self.sid = sid
+        self.patient_ids = {patient_id}
+        self.connected = True
+        self.dropped = 0
+
+        # Only the newest snapshot per patient is worth sending to a client that fell behind
+        self._metrics: Dict[str, Dict] = {}
+        self._alerts: deque = deque(maxlen=max_alerts)
+        self._condition = threading.Condition()
+
+    def put_metrics(self, patient_id: str, snapshot: Dict):
+        with self._condition:
+            if patient_id in self._metrics:
+                self.dropped += 1
+            self._metrics[patient_id] = snapshot
+            self._condition.notify()
+
+    def put_alerts(self, patient_id: str, alerts: List[Dict]):
+        with self._condition:
+            for alert in alerts:
+                if len(self._alerts) == self._alerts.maxlen:
+                    self.dropped += 1
+                self._alerts.append(dict(alert, patient_id=patient_id))
+            self._condition.notify()
+
+    def take(self, timeout: float = 1.0):
+        """Wait for pending events, then hand them all over: (alerts, metric snapshots)"""
+        with self._condition:
+            if not self._alerts and not self._metrics and self.connected:
+                self._condition.wait(timeout)
+            alerts, self._alerts = list(self._alerts), deque(maxlen=self._alerts.maxlen)
+            metrics, self._metrics = self._metrics, {}
+        return alerts, metrics
+
+    def close(self):
+        with self._condition:
+            self.connected = False
+            self._condition.notify()
+
+class EventPublisher:
+    """Pushes metric snapshots and new alerts to dashboards over Socket.IO"""
+
+    def __init__(self, socketio, snapshot: Callable, get_worker: Callable,
+                 min_interval: float = 0.5, max_alerts: int = 50, default_patient_id: str = 'P001'):
+        self.socketio = socketio
+        self.snapshot = snapshot
+        self.get_worker = get_worker
+        self.min_interval = min_interval
+        self.max_alerts = max_alerts
+        self.default_patient_id = default_patient_id
+
+        self.events_sent = 0
+        self._clients: Dict[str, ClientQueue] = {}
+        self._last_snapshot: Dict[str, Dict] = {}
+        self._last_sent_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        socketio.on_event('connect', self._on_connect)
+        socketio.on_event('disconnect', self._on_disconnect)
+        socketio.on_event('subscribe', self._on_subscribe)
+
+    def on_monitor_update(self, worker, alerts: List):
+        """Called from a monitor loop after each processed frame"""
+        patient_id = worker.patient_id
+        if alerts:
+            payload = [self._alert_dict(a) for a in alerts]
+            for client in self._subscribers(patient_id):
+                client.put_alerts(patient_id, payload)
+
+        # Metrics go out only when they changed, and at most once per min_interval
+        now = time.monotonic()
+        if now - self._last_sent_at.get(patient_id, 0.0) < self.min_interval:
+            return
+        snapshot = self.snapshot(worker)
+        if snapshot == self._last_snapshot.get(patient_id):
+            return
+
+        self._last_snapshot[patient_id] = snapshot
+        self._last_sent_at[patient_id] = now
+        for client in self._subscribers(patient_id):
+            client.put_metrics(patient_id, snapshot)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            clients = list(self._clients.values())
+        return {
+            'clients': len(clients),
+            'events_sent': self.events_sent,
+            'events_dropped': sum(c.dropped for c in clients)
+        }
+
+    def _subscribers(self, patient_id: str) -> List[ClientQueue]:
+        with self._lock:
+            return [c for c in self._clients.values() if patient_id in c.patient_ids]
+
+    def _on_connect(self, auth=None):
+        patient_id = (auth or {}).get('patient_id') or self.default_patient_id
+        client = ClientQueue(request.sid, patient_id, self.max_alerts)
+        with self._lock:
+            self._clients[client.sid] = client
+        self._send_current(client, patient_id)
+        self.socketio.start_background_task(self._send_loop, client)
+
+    def _on_disconnect(self, *args):
+        with self._lock:
+            client = self._clients.pop(request.sid, None)
+        if client is not None:
+            client.close()
+
+    def _on_subscribe(self, data):
+        """Switch the client to the given patients: {'patient_ids': [...]} or {'patient_id': ...}"""
+        data = data or {}
+        patient_ids = data.get('patient_ids') or [data.get('patient_id') or self.default_patient_id]
+        with self._lock:
+            client = self._clients.get(request.sid)
+        if client is None:
+            return
+        client.patient_ids = set(patient_ids)
+        for patient_id in patient_ids:
+            self._send_current(client, patient_id)
+
+    def _send_current(self, client: ClientQueue, patient_id: str):
+        """Give a new subscriber the latest snapshot instead of making it wait for a change"""
+        worker = self.get_worker(patient_id)
+        if worker is not None:
+            client.put_metrics(patient_id, self.snapshot(worker))
+
+    def _send_loop(self, client: ClientQueue):
+        """Drain one client's queue; a slow client only ever delays itself"""
+        while client.connected:
+            alerts, metrics = client.take()
+            if alerts:
+                self.socketio.emit('alerts', {'alerts': alerts}, to=client.sid)
+                self.events_sent += 1
+            for patient_id, snapshot in metrics.items():
+                self.socketio.emit('metrics', dict(snapshot, patient_id=patient_id), to=client.sid)
+                self.events_sent += 1
+
+    def _alert_dict(self, alert) -> Dict:
+        timestamp = alert.timestamp
+        return {
+            'alert_type': alert.alert_type,
+            'severity': alert.severity,
+            'message': alert.message,
+            'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp,
+            'repeat_count': alert.repeat_count
+        }
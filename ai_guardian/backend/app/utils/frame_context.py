@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import threading
+from typing import Dict, Optional
+
+class FrameContext:
+    """Per-frame cache of colour conversions and downscaled copies shared by all detectors"""
+
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.conversions: Dict[str, int] = {}
+        self._cache: Dict[str, np.ndarray] = {}
+        # Detectors may run concurrently; pyramid levels recurse, hence reentrant
+        self._lock = threading.RLock()
+
+    @classmethod
+    def of(cls, frame: np.ndarray, context: Optional['FrameContext'] = None) -> 'FrameContext':
+        """Return the given context, or a private one for detectors called standalone"""
+        if context is not None:
+            return context
+        return cls(frame)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB copy of the frame (MediaPipe input)"""
+        return self._get('rgb', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale copy of the frame"""
+        return self._get('gray', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV copy of the frame"""
+        return self._get('hsv', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV))
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """BGR frame downscaled by 2**level"""
+        if level <= 0:
+            return self.frame
+        return self._get(f'pyramid_{level}', lambda: cv2.pyrDown(self.pyramid(level - 1)))
+
+    def gray_pyramid(self, level: int) -> np.ndarray:
+        """Grayscale frame downscaled by 2**level"""
+        if level <= 0:
+            return self.gray
+        return self._get(f'gray_pyramid_{level}', lambda: cv2.pyrDown(self.gray_pyramid(level - 1)))
+
+    def _get(self, key: str, compute) -> np.ndarray:
+        """Compute a derived image on first use and reuse it for the rest of the frame"""
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                value = compute()
+                self._cache[key] = value
+                self.conversions[key] = self.conversions.get(key, 0) + 1
+        return value
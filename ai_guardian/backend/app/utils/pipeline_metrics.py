@@ -0,0 +1,108 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Upper bounds in seconds; frames run at 10-30 fps so most stages land in the low buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Histogram:
+    """Fixed-bucket histogram per label set, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {total!r}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+class PipelineMetrics:
+    """Latency histograms for every process_frame stage and JPEG encode, per patient.
+
+    Frame counters are not kept here: they are read from the monitors' own stats at
+    scrape time, so the frame loop pays only for the histogram updates.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.stage_seconds = Histogram(
+            'ai_guardian_stage_duration_seconds',
+            'Time spent in each stage of processing a frame (detectors, alerts, draw, total)',
+            ('patient_id', 'stage'), buckets
+        )
+        self.encode_seconds = Histogram(
+            'ai_guardian_jpeg_encode_duration_seconds',
+            'Time spent JPEG-encoding a processed frame for viewers',
+            ('patient_id',), buckets
+        )
+
+    def observe_frame(self, patient_id: str, timings_ms: Dict[str, float]):
+        """Record the result['timings'] of one processed frame"""
+        for stage, ms in timings_ms.items():
+            self.stage_seconds.observe((patient_id, stage), ms / 1000)
+
+    def observe_stage(self, patient_id: str, stage: str, seconds: float):
+        """Record a stage that runs outside process_frame, e.g. the ward alert tick"""
+        self.stage_seconds.observe((patient_id, stage), seconds)
+
+    def encode_observer(self, patient_id: str):
+        """Callback for EncodedFrameCache(on_encode=...)"""
+        return lambda seconds: self.encode_seconds.observe((patient_id,), seconds)
+
+    def render(self, monitor_stats: Iterable[Dict] = ()) -> str:
+        """Prometheus text exposition of the histograms plus per-monitor frame counters"""
+        monitor_stats = list(monitor_stats)
+        lines = self.stage_seconds.render() + self.encode_seconds.render()
+
+        for key, help_text in (('frames_processed', 'Frames processed by the monitor'),
+                               ('frames_dropped', 'Frames dropped before processing')):
+            name = f'ai_guardian_{key}_total'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [
+                f'{name}{_labels(("patient_id",), (stats["patient_id"],))} {stats.get(key, 0)}'
+                for stats in monitor_stats
+            ]
+
+        lines += [
+            '# HELP ai_guardian_monitors_running Monitors currently running',
+            '# TYPE ai_guardian_monitors_running gauge',
+            f'ai_guardian_monitors_running {sum(1 for stats in monitor_stats if stats.get("running"))}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+# Shared by every monitor of the web process
+pipeline_metrics = PipelineMetrics()
@@ -0,0 +1,77 @@
+from typing import Any, Callable, Iterator, List, Optional
+
+class RingBuffer:
+    """Fixed-capacity history; the oldest items are evicted to an optional spill hook"""
+
+    def __init__(self, capacity: int, spill: Optional[Callable[[List[Any]], None]] = None,
+                 spill_batch: int = 1):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+
+        self.capacity = capacity
+        self.spill = spill
+        self.spill_batch = max(spill_batch, 1)
+        self.total_count = 0  # items ever appended, including evicted ones
+
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._size = 0
+        self._pending_spill: List[Any] = []
+
+    def append(self, item: Any):
+        """Add an item, evicting the oldest one when full"""
+        if self._size < self.capacity:
+            self._items[(self._start + self._size) % self.capacity] = item
+            self._size += 1
+        else:
+            evicted = self._items[self._start]
+            self._items[self._start] = item
+            self._start = (self._start + 1) % self.capacity
+            if self.spill is not None:
+                self._pending_spill.append(evicted)
+                if len(self._pending_spill) >= self.spill_batch:
+                    self.flush()
+        self.total_count += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def flush(self):
+        """Hand evicted items still waiting for a full batch to the spill hook"""
+        if self._pending_spill and self.spill is not None:
+            batch, self._pending_spill = self._pending_spill, []
+            self.spill(batch)
+
+    def clear(self):
+        """Drop every item, including evicted ones not yet spilled"""
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+        self._pending_spill = []
+
+    def to_list(self) -> List[Any]:
+        """Items from oldest to newest"""
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._items[self._start:end]
+        return self._items[self._start:] + self._items[:end - self.capacity]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.to_list())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('RingBuffer index out of range')
+        return self._items[(self._start + index) % self.capacity]
+
+    def __bool__(self) -> bool:
+        return self._size > 0
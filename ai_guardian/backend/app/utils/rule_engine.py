@@ -0,0 +1,269 @@
+import time
+import threading
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple, Union
+from app.models.patient import Alert, PatientSession
+
+# Metric columns every rule can refer to
+METRICS = (
+    'fall_risk', 'self_harm_risk', 'aggressive_motion', 'dangerous_objects',
+    'heart_rate', 'breathing_rate', 'stress_level', 'tremor_score'
+)
+RISK_LEVELS = ('SAFE', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+
+@dataclass(frozen=True)
+class AlertRule:
+    """One row of the alert table. Rules sharing a group are exclusive: the first match wins."""
+    metric: str
+    comparator: str  # '>', '>=', '<', '<=' or 'between' (exclusive bounds)
+    threshold: Union[float, Tuple[float, float]]
+    severity: str
+    alert_type: str
+    message: str  # formatted with {value} and {objects}
+    detail_key: str = None
+    group: str = None
+    # Hysteresis: once open the alert holds until the metric crosses this instead
+    clear_threshold: Union[float, Tuple[float, float]] = None
+
+@dataclass(frozen=True)
+class RiskRule:
+    """Any matching rule raises the session to at least this risk level"""
+    metric: str
+    comparator: str
+    threshold: Union[float, Tuple[float, float]]
+    level: str
+
+ALERT_RULES = (
+    # Safety
+    AlertRule('fall_risk', '>', 0.7, 'CRITICAL', 'FALL_CRITICAL',
+              'CRITICAL: Fall detected or imminent!', 'fall_risk', group='fall', clear_threshold=0.6),
+    AlertRule('fall_risk', '>', 0.5, 'HIGH', 'FALL_WARNING',
+              'WARNING: Patient at risk of falling', 'fall_risk', group='fall', clear_threshold=0.4),
+    AlertRule('self_harm_risk', '>', 0.7, 'CRITICAL', 'SELF_HARM_CRITICAL',
+              'CRITICAL: Potential self-harm detected!', 'self_harm_risk', group='self_harm',
+              clear_threshold=0.6),
+    AlertRule('self_harm_risk', '>', 0.4, 'HIGH', 'SELF_HARM_WARNING',
+              'WARNING: Self-harm risk detected', 'self_harm_risk', group='self_harm',
+              clear_threshold=0.3),
+    AlertRule('aggressive_motion', '>', 0.6, 'HIGH', 'AGGRESSIVE_MOTION',
+              'WARNING: Aggressive motion detected', 'aggression_score', clear_threshold=0.5),
+    AlertRule('dangerous_objects', '>', 0, 'CRITICAL', 'DANGEROUS_OBJECT',
+              'CRITICAL: Dangerous object detected: {objects}', 'objects'),
+    # Health
+    AlertRule('heart_rate', '>', 140, 'HIGH', 'HIGH_HEART_RATE',
+              'WARNING: High heart rate detected: {value:.0f} BPM', 'heart_rate', group='heart_rate',
+              clear_threshold=130),
+    AlertRule('heart_rate', 'between', (0, 50), 'HIGH', 'LOW_HEART_RATE',
+              'WARNING: Low heart rate detected: {value:.0f} BPM', 'heart_rate', group='heart_rate',
+              clear_threshold=(0, 55)),
+    AlertRule('tremor_score', '>', 0.7, 'MEDIUM', 'TREMOR_DETECTED',
+              'ALERT: Significant tremor detected (Parkinson\'s risk)', 'tremor_score', clear_threshold=0.6),
+    AlertRule('stress_level', '>', 0.8, 'MEDIUM', 'HIGH_STRESS',
+              'ALERT: High stress level detected', 'stress_level', clear_threshold=0.7),
+)
+
+RISK_RULES = (
+    RiskRule('fall_risk', '>', 0.8, 'CRITICAL'),
+    RiskRule('self_harm_risk', '>', 0.8, 'CRITICAL'),
+    RiskRule('heart_rate', '>', 150, 'CRITICAL'),
+    RiskRule('heart_rate', '<', 40, 'CRITICAL'),
+    RiskRule('fall_risk', '>', 0.6, 'HIGH'),
+    RiskRule('self_harm_risk', '>', 0.6, 'HIGH'),
+    RiskRule('tremor_score', '>', 0.7, 'HIGH'),
+    RiskRule('fall_risk', '>', 0.4, 'MEDIUM'),
+    RiskRule('tremor_score', '>', 0.5, 'MEDIUM'),
+    RiskRule('dangerous_objects', '>', 0, 'MEDIUM'),
+    RiskRule('fall_risk', '>', 0.2, 'LOW'),
+)
+
+def metric_row(session: PatientSession) -> List[float]:
+    """Current metrics of one session, in METRICS column order"""
+    safety = session.current_safety_metrics
+    health = session.current_health_metrics
+    return [
+        safety.fall_risk, safety.self_harm_risk, safety.aggressive_motion, len(safety.dangerous_objects),
+        health.heart_rate, health.breathing_rate, health.stress_level, health.tremor_score
+    ]
+
+class CompiledPredicates:
+    """A rule table compiled to interval tests: lower <(=) metric <(=) upper, one column per rule"""
+
+    def __init__(self, rules: Sequence, hold: bool = False):
+        self.columns = np.array([METRICS.index(r.metric) for r in rules], dtype=np.intp)
+        # hold=True compiles the clear thresholds that keep an open alert matching
+        bounds = [
+            self._bounds(r.comparator, r.clear_threshold if hold and r.clear_threshold is not None else r.threshold)
+            for r in rules
+        ]
+        self.lower = np.array([b[0] for b in bounds], dtype=np.float64)
+        self.lower_inclusive = np.array([b[1] for b in bounds], dtype=bool)
+        self.upper = np.array([b[2] for b in bounds], dtype=np.float64)
+        self.upper_inclusive = np.array([b[3] for b in bounds], dtype=bool)
+
+    @staticmethod
+    def _bounds(comparator: str, threshold) -> Tuple[float, bool, float, bool]:
+        if comparator == '>':
+            return threshold, False, np.inf, False
+        if comparator == '>=':
+            return threshold, True, np.inf, False
+        if comparator == '<':
+            return -np.inf, False, threshold, False
+        if comparator == '<=':
+            return -np.inf, False, threshold, True
+        if comparator == 'between':
+            return threshold[0], False, threshold[1], False
+        raise ValueError(f'Unknown comparator {comparator!r}')
+
+    def __call__(self, matrix: np.ndarray) -> np.ndarray:
+        """(sessions, metrics) -> (sessions, rules) bool"""
+        values = matrix[:, self.columns]
+        above = (values > self.lower) | (self.lower_inclusive & (values == self.lower))
+        below = (values < self.upper) | (self.upper_inclusive & (values == self.upper))
+        return above & below
+
+class RuleEngine:
+    """Evaluates the alert and risk tables for many sessions in one NumPy pass.
+
+    Alerts are created only when a rule starts matching; while it keeps matching (down
+    to its clear threshold) the same Alert stays open in session.current_alerts and
+    counts the repeats. A throttle with allow(patient_id, alert_type, now) can refuse a
+    re-raise, in which case the previous Alert of that rule is reopened instead.
+    """
+
+    def __init__(self, alert_rules: Sequence[AlertRule] = ALERT_RULES,
+                 risk_rules: Sequence[RiskRule] = RISK_RULES, max_current_alerts: int = 5,
+                 throttle=None):
+        self.alert_rules = tuple(alert_rules)
+        self.risk_rules = tuple(risk_rules)
+        self.max_current_alerts = max_current_alerts
+        self.throttle = throttle
+
+        self.alerts_raised = 0
+        self.alerts_reopened = 0
+        self.repeats_suppressed = 0
+
+        self._alert_predicates = CompiledPredicates(self.alert_rules)
+        self._hold_predicates = CompiledPredicates(self.alert_rules, hold=True)
+        self._risk_predicates = CompiledPredicates(self.risk_rules)
+        self._risk_levels = np.array([RISK_LEVELS.index(r.level) for r in self.risk_rules])
+
+        # earlier[j, i]: rule j comes before rule i in the same exclusive group
+        count = len(self.alert_rules)
+        self._earlier = np.zeros((count, count), dtype=np.int32)
+        for i, rule in enumerate(self.alert_rules):
+            for j in range(i):
+                if rule.group is not None and self.alert_rules[j].group == rule.group:
+                    self._earlier[j, i] = 1
+
+        # Per-patient matching rules, the alerts they opened and the last alert of each rule
+        self._active: Dict[str, np.ndarray] = {}
+        self._open: Dict[str, Dict[int, Alert]] = {}
+        self._last: Dict[str, Dict[int, Alert]] = {}
+        self._lock = threading.Lock()
+
+    def risk_levels(self, matrix: np.ndarray) -> np.ndarray:
+        """(sessions, metrics) -> index into RISK_LEVELS per session"""
+        matched = self._risk_predicates(matrix)
+        return np.where(matched, self._risk_levels, 0).max(axis=1, initial=0)
+
+    def matching_alerts(self, matrix: np.ndarray, previous: np.ndarray = None) -> np.ndarray:
+        """(sessions, metrics) -> (sessions, alert rules) bool, exclusive groups applied.
+        Rules active in `previous` stay matched until their clear threshold."""
+        matched = self._alert_predicates(matrix)
+        if previous is not None:
+            matched |= previous & self._hold_predicates(matrix)
+        shadowed = (matched.astype(np.int32) @ self._earlier) > 0
+        return matched & ~shadowed
+
+    def evaluate(self, sessions: List[PatientSession], now: float = None) -> List[List[Alert]]:
+        """Update risk level and open alerts of every session; returns the alerts raised or
+        re-opened by this evaluation. While an alert stays open its repeats are only counted."""
+        if not sessions:
+            return []
+
+        now = time.monotonic() if now is None else now
+        seen = datetime.now()
+        matrix = np.array([metric_row(s) for s in sessions], dtype=np.float64)
+        levels = self.risk_levels(matrix)
+
+        with self._lock:
+            previous = np.array([
+                self._active.get(s.patient_id, np.zeros(len(self.alert_rules), dtype=bool))
+                for s in sessions
+            ])
+            active = self.matching_alerts(matrix, previous)
+            raised = active & ~previous
+
+            new_alerts = [[] for _ in sessions]
+            for row, rule_index in zip(*np.nonzero(raised)):
+                session = sessions[row]
+                last = self._last.get(session.patient_id, {}).get(rule_index)
+                alert_type = self.alert_rules[rule_index].alert_type
+                allowed = self.throttle is None or self.throttle.allow(session.patient_id, alert_type, now)
+                if not allowed and last is not None:
+                    # Re-entered after clearing, within cooldown or out of tokens: re-open the
+                    # last alert rather than create another, but still report the transition
+                    alert = last
+                    alert.repeat_count += 1
+                    alert.last_seen = seen
+                    new_alerts[row].append(alert)
+                    self.alerts_reopened += 1
+                else:
+                    alert = self._create_alert(rule_index, session, matrix[row])
+                    self._last.setdefault(session.patient_id, {})[rule_index] = alert
+                    new_alerts[row].append(alert)
+                    self.alerts_raised += 1
+                self._open.setdefault(session.patient_id, {})[rule_index] = alert
+
+            for row, session in enumerate(sessions):
+                opened = self._open.setdefault(session.patient_id, {})
+                for rule_index in np.nonzero(previous[row] & active[row])[0]:
+                    self._repeat(opened[rule_index], seen)
+                for rule_index in np.nonzero(previous[row] & ~active[row])[0]:
+                    opened.pop(rule_index, None)
+                self._active[session.patient_id] = active[row]
+
+                session.risk_level = RISK_LEVELS[levels[row]]
+                session.current_alerts = [opened[i] for i in sorted(opened)][:self.max_current_alerts]
+
+        return new_alerts
+
+    def reset(self, patient_id: str = None):
+        """Forget open alerts, for one patient or all"""
+        with self._lock:
+            if patient_id is None:
+                self._active.clear()
+                self._open.clear()
+                self._last.clear()
+            else:
+                self._active.pop(patient_id, None)
+                self._open.pop(patient_id, None)
+                self._last.pop(patient_id, None)
+
+    def _repeat(self, alert: Alert, seen: datetime):
+        alert.repeat_count += 1
+        alert.last_seen = seen
+        self.repeats_suppressed += 1
+
+    def _create_alert(self, rule_index: int, session: PatientSession, row: np.ndarray) -> Alert:
+        rule = self.alert_rules[rule_index]
+        value = float(row[self._alert_predicates.columns[rule_index]])
+        objects = session.current_safety_metrics.dangerous_objects
+        # The object rule matches on the count but reports the object names
+        detail = list(objects) if rule.metric == 'dangerous_objects' else value
+        return Alert(
+            alert_type=rule.alert_type,
+            severity=rule.severity,
+            message=rule.message.format(value=value, objects=', '.join(objects)),
+            details={rule.detail_key or rule.metric: detail}
+        )
+
+# Stateless use of the default tables, e.g. PatientSession.calculate_risk_level
+_default_engine = RuleEngine()
+
+def risk_level(session: PatientSession) -> str:
+    """Risk level of one session under the default risk table"""
+    matrix = np.array([metric_row(session)], dtype=np.float64)
+    return RISK_LEVELS[_default_engine.risk_levels(matrix)[0]]
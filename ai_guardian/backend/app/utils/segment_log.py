@@ -0,0 +1,156 @@
+import os
+import json
+import glob
+import queue
+import threading
+import numpy as np
+from typing import Dict, Iterable, List
+
+def record_dtype(fields: Iterable[str]) -> np.dtype:
+    """Fixed-size record: float64 timestamp followed by one float32 per metric"""
+    return np.dtype([('timestamp', np.float64)] + [(name, np.float32) for name in fields])
+
+class SegmentLogWriter:
+    """Append-only metric log written in batches to fixed-record segment files on a background thread"""
+
+    def __init__(self, directory: str, name: str, fields: Iterable[str],
+                 max_segment_bytes: int = 64 * 1024 * 1024, max_segment_seconds: float = 3600.0,
+                 batch_size: int = 256, queue_size: int = 100000):
+        self.directory = directory
+        self.name = name
+        self.fields = tuple(fields)
+        self.dtype = record_dtype(self.fields)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.batch_size = batch_size
+
+        self.records_written = 0
+        self.records_dropped = 0
+        self.segments_written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{name}.schema.json'), 'w') as f:
+            json.dump({'fields': list(self.fields), 'dtype': self.dtype.descr}, f)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._segment_start = None
+        self._segment_bytes = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f'segment-log-{name}', daemon=True)
+        self._thread.start()
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """Queue one sample; never blocks the caller"""
+        try:
+            self._queue.put_nowait((timestamp, values))
+        except queue.Full:
+            self.records_dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Write everything still queued and close the current segment"""
+        self._running = False
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except OSError as e:
+                print(f'Segment log error ({self.name}): {e}')
+                self.records_dropped += len(batch)
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self, batch: List):
+        records = np.empty(len(batch), dtype=self.dtype)
+        for row, (timestamp, values) in enumerate(batch):
+            records['timestamp'][row] = timestamp
+            for name in self.fields:
+                records[name][row] = values.get(name, np.nan)
+
+        first_timestamp = float(records['timestamp'][0])
+        if self._should_roll(first_timestamp):
+            self._roll(first_timestamp)
+
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self._segment_bytes += records.nbytes
+        self.records_written += len(records)
+
+    def _should_roll(self, timestamp: float) -> bool:
+        return (self._file is None or
+                self._segment_bytes >= self.max_segment_bytes or
+                timestamp - self._segment_start >= self.max_segment_seconds)
+
+    def _roll(self, timestamp: float):
+        """Close the current segment and start one named after its first timestamp"""
+        if self._file is not None:
+            self._file.close()
+
+        path = os.path.join(self.directory, f'{self.name}-{int(timestamp * 1000):015d}.seg')
+        self._file = open(path, 'ab')
+        self._segment_start = timestamp
+        self._segment_bytes = self._file.tell()
+        self.segments_written += 1
+
+class SegmentLogReader:
+    """Zero-copy reads of segment files through np.memmap"""
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        with open(os.path.join(directory, f'{name}.schema.json')) as f:
+            schema = json.load(f)
+        self.fields = tuple(schema['fields'])
+        self.dtype = record_dtype(self.fields)
+
+    def segments(self) -> List[str]:
+        """Segment paths in time order"""
+        return sorted(glob.glob(os.path.join(self.directory, f'{self.name}-*.seg')))
+
+    def read(self, start: float = None, end: float = None) -> List[np.ndarray]:
+        """Memory-mapped record views with start <= timestamp < end, one per segment"""
+        paths = self.segments()
+        starts = [int(os.path.basename(p)[len(self.name) + 1:-4]) / 1000 for p in paths]
+
+        views = []
+        for index, path in enumerate(paths):
+            # Segments are contiguous in time; skip those outside the range unopened
+            if end is not None and starts[index] >= end:
+                break
+            if start is not None and index + 1 < len(paths) and starts[index + 1] <= start:
+                continue
+
+            # The writer may be mid-batch; only map whole records
+            count = os.path.getsize(path) // self.dtype.itemsize
+            if count == 0:
+                continue
+            records = np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+
+            timestamps = records['timestamp']
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = count if end is None else int(np.searchsorted(timestamps, end, side='left'))
+            if hi > lo:
+                views.append(records[lo:hi])
+        return views
+
+    def read_array(self, start: float = None, end: float = None) -> np.ndarray:
+        """Same range as read(), concatenated into one in-memory array"""
+        views = self.read(start, end)
+        if not views:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(views)
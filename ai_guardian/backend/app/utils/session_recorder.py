@@ -0,0 +1,252 @@
+import os
+import cv2
+import json
+import time
+import queue
+import threading
+import dataclasses
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.config.settings import Config
+
+# Bundle layout: manifest.json, frames/<index>.<ext>, outputs.jsonl (one record per frame)
+BUNDLE_VERSION = 1
+MANIFEST = 'manifest.json'
+OUTPUTS = 'outputs.jsonl'
+
+# Keys that legitimately differ between runs and are skipped when diffing
+VOLATILE_KEYS = ('timings', 'timestamp', 'last_seen')
+
+def to_jsonable(value: Any) -> Any:
+    """Detector outputs, alerts and NumPy values as plain JSON types"""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return to_jsonable(dataclasses.asdict(value))
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+def frame_record(index: int, timestamp: float, result: Dict, session) -> Dict:
+    """Everything a frame produced, minus the annotated image"""
+    return to_jsonable({
+        'index': index,
+        'timestamp': timestamp,
+        'status': result.get('status'),
+        'detections': result.get('detections', {}),
+        'alerts': result.get('alerts', []),
+        'risk_level': session.risk_level,
+        'health': session.current_health_metrics,
+        'safety': session.current_safety_metrics,
+        'timings': result.get('timings', {})
+    })
+
+class SessionRecorder:
+    """Writes input frames and the monitor's outputs to a session bundle.
+
+    Images are encoded on a background thread; PNG (default) is lossless, so a replay
+    sees exactly the pixels the live run saw. JPEG is smaller but replays will drift.
+    """
+
+    def __init__(self, path: str, monitor, image_format: str = 'png', jpeg_quality: int = 95,
+                 queue_size: int = 256):
+        if image_format not in ('png', 'jpg'):
+            raise ValueError(f'Unsupported image format {image_format!r}')
+        self.path = path
+        self.monitor = monitor
+        self.image_format = image_format
+        self.jpeg_quality = jpeg_quality
+        self.frames_recorded = 0
+        self.started_at = datetime.now()
+
+        os.makedirs(os.path.join(path, 'frames'), exist_ok=True)
+        self._outputs = open(os.path.join(path, OUTPUTS), 'w')
+        self._shape = None
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+        # Blocks when full rather than dropping: a bundle with gaps cannot be replayed
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_frames, name='session-recorder', daemon=True)
+        self._thread.start()
+
+    def process(self, frame: np.ndarray, timestamp: float = None) -> Dict:
+        """Run monitor.process_frame on the frame and record input and outputs"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        # process_frame draws on the frame it is given; keep the clean input
+        clean = frame.copy()
+        result = self.monitor.process_frame(frame, timestamp=timestamp)
+
+        index = self.frames_recorded
+        self._queue.put((index, clean))
+        self._outputs.write(json.dumps(frame_record(index, timestamp, result, self.monitor.patient_session)) + '\n')
+
+        self._shape = self._shape or list(clean.shape)
+        self._first_timestamp = timestamp if self._first_timestamp is None else self._first_timestamp
+        self._last_timestamp = timestamp
+        self.frames_recorded += 1
+        return result
+
+    def close(self):
+        """Finish writing frames and outputs, then write the manifest"""
+        self._queue.put(None)
+        self._thread.join()
+        self._outputs.close()
+
+        duration = (self._last_timestamp - self._first_timestamp) if self.frames_recorded else 0.0
+        manifest = {
+            'version': BUNDLE_VERSION,
+            'created': self.started_at.isoformat(),
+            'patient_id': self.monitor.patient_session.patient_id,
+            'frames': self.frames_recorded,
+            'image_format': self.image_format,
+            'shape': self._shape,
+            'duration_seconds': duration,
+            'fps': (self.frames_recorded - 1) / duration if duration > 0 else Config.FPS,
+            'seed': self.monitor.seed,
+            'config': {
+                'detector_rates': Config.DETECTOR_RATES,
+                'breathing_flow_mode': Config.BREATHING_FLOW_MODE,
+                'object_backend': Config.OBJECT_BACKEND
+            }
+        }
+        with open(os.path.join(self.path, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def _write_frames(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if self.image_format == 'jpg' else []
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            index, frame = item
+            cv2.imwrite(os.path.join(self.path, 'frames', f'{index:07d}.{self.image_format}'), frame, params)
+
+class SessionReplayer:
+    """Feeds a recorded bundle back through a PatientMonitor and diffs the outputs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+
+    def frames(self) -> Iterator[Tuple[np.ndarray, float]]:
+        """(frame, recorded timestamp) in order"""
+        for record in self.recorded_outputs():
+            name = f"{record['index']:07d}.{self.manifest['image_format']}"
+            yield cv2.imread(os.path.join(self.path, 'frames', name)), record['timestamp']
+
+    def recorded_outputs(self) -> Iterator[Dict]:
+        with open(os.path.join(self.path, OUTPUTS)) as f:
+            for line in f:
+                yield json.loads(line)
+
+    def create_monitor(self, seed: int = None):
+        """Monitor with the recorded seed; detectors run sequentially so replays are deterministic"""
+        from app.patient_monitor import PatientMonitor
+        return PatientMonitor(
+            patient_id=self.manifest['patient_id'], patient_name=self.manifest['patient_id'],
+            parallel=False, seed=self.manifest['seed'] if seed is None else seed
+        )
+
+    def replay(self, monitor=None, realtime: bool = False) -> Iterator[Tuple[Dict, Dict]]:
+        """Yield (recorded, replayed) records per frame. Recorded timestamps are passed
+        through, so detector rates and alert cooldowns behave the same at any speed."""
+        monitor = monitor or self.create_monitor()
+        started = time.monotonic()
+        first = None
+        try:
+            for index, (recorded, (frame, timestamp)) in enumerate(zip(self.recorded_outputs(), self.frames())):
+                if realtime:
+                    first = timestamp if first is None else first
+                    delay = (timestamp - first) - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                result = monitor.process_frame(frame, timestamp=timestamp)
+                yield recorded, frame_record(index, timestamp, result, monitor.patient_session)
+        finally:
+            monitor.release()
+
+def diff_records(recorded: Any, replayed: Any, tolerance: float = 1e-6, path: str = '',
+                 ignore: Tuple[str, ...] = VOLATILE_KEYS) -> List[Dict]:
+    """Differences between two records as [{'path', 'recorded', 'replayed'}]; numbers
+    compare within an absolute tolerance"""
+    if isinstance(recorded, dict) and isinstance(replayed, dict):
+        differences = []
+        for key in sorted(set(recorded) | set(replayed)):
+            if key in ignore:
+                continue
+            differences += diff_records(recorded.get(key), replayed.get(key), tolerance, f'{path}.{key}', ignore)
+        return differences
+
+    if isinstance(recorded, list) and isinstance(replayed, list) and len(recorded) == len(replayed):
+        # Landmark arrays and alert lists: compare numerically in one go where possible
+        try:
+            a, b = np.asarray(recorded, dtype=np.float64), np.asarray(replayed, dtype=np.float64)
+            if a.shape == b.shape and np.allclose(a, b, atol=tolerance, rtol=0, equal_nan=True):
+                return []
+        except (TypeError, ValueError):
+            pass
+        differences = []
+        for i, (a, b) in enumerate(zip(recorded, replayed)):
+            differences += diff_records(a, b, tolerance, f'{path}[{i}]', ignore)
+        return differences
+
+    numeric = (int, float)
+    if isinstance(recorded, numeric) and isinstance(replayed, numeric) and \
+            not isinstance(recorded, bool) and not isinstance(replayed, bool):
+        if abs(recorded - replayed) <= tolerance or (recorded != recorded and replayed != replayed):
+            return []
+    elif recorded == replayed:
+        return []
+    return [{'path': path.lstrip('.'), 'recorded': recorded, 'replayed': replayed}]
+
+def _percentiles(samples: List[float]) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+def compare_session(replayer: SessionReplayer, monitor=None, realtime: bool = False,
+                    tolerance: float = 1e-6, max_differences: int = 100) -> Dict:
+    """Replay a bundle and report output differences and per-stage timing changes"""
+    frames = mismatched = 0
+    differences = []
+    timings: Dict[str, Tuple[List[float], List[float]]] = {}
+
+    for recorded, replayed in replayer.replay(monitor, realtime):
+        frames += 1
+        frame_differences = diff_records(recorded, replayed, tolerance)
+        if frame_differences:
+            mismatched += 1
+            for difference in frame_differences:
+                if len(differences) < max_differences:
+                    differences.append(dict(difference, frame=recorded['index']))
+        for stage in set(recorded['timings']) | set(replayed['timings']):
+            before, after = timings.setdefault(stage, ([], []))
+            if stage in recorded['timings']:
+                before.append(recorded['timings'][stage])
+            if stage in replayed['timings']:
+                after.append(replayed['timings'][stage])
+
+    return {
+        'bundle': replayer.path,
+        'frames': frames,
+        'frames_mismatched': mismatched,
+        'identical': mismatched == 0,
+        'differences': differences,
+        'timings': {
+            stage: {'recorded': _percentiles(before), 'replayed': _percentiles(after)}
+            for stage, (before, after) in sorted(timings.items())
+        }
+    }
@@ -0,0 +1,87 @@
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+class SharedFrameRing:
+    """Fixed-size frame slots in shared memory, so frames cross processes without pickling"""
+
+    # Per-slot header: sequence number and capture timestamp
+    _HEADER_DTYPE = np.dtype([('seq', np.int64), ('timestamp', np.float64)])
+
+    def __init__(self, shape: Tuple[int, ...], slots: int = 3, name: str = None,
+                 create: bool = True, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_bytes = slots * self._HEADER_DTYPE.itemsize
+        self.owner = create
+
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes, name=name)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._untrack()
+
+        self.header = np.ndarray((slots,), dtype=self._HEADER_DTYPE, buffer=self.shm.buf)
+        self.frames = np.ndarray(
+            (slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf, offset=header_bytes
+        )
+        if create:
+            self.header['seq'] = -1
+
+        self._next_slot = 0
+        self._seq = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...], slots: int, dtype=np.uint8) -> 'SharedFrameRing':
+        """Attach to a ring created by another process"""
+        return cls(shape, slots=slots, name=name, create=False, dtype=dtype)
+
+    def write(self, frame: np.ndarray, timestamp: float) -> Tuple[int, int]:
+        """Copy a frame into the next slot; returns (slot, seq) for the reader"""
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self._seq += 1
+
+        # Invalidate the slot while it is being overwritten
+        self.header['seq'][slot] = -1
+        np.copyto(self.frames[slot], frame)
+        self.header['timestamp'][slot] = timestamp
+        self.header['seq'][slot] = self._seq
+        return slot, self._seq
+
+    def read(self, slot: int, seq: int) -> Optional[np.ndarray]:
+        """Copy a frame out of a slot, or None if the writer has since reused the slot"""
+        if self.header['seq'][slot] != seq:
+            return None
+
+        frame = self.frames[slot].copy()
+        if self.header['seq'][slot] != seq:
+            return None
+        return frame
+
+    def timestamp(self, slot: int) -> float:
+        return float(self.header['timestamp'][slot])
+
+    def close(self):
+        """Detach from the ring; the creating process also frees it"""
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def _untrack(self):
+        # Attaching registers the block with this process's resource tracker, which
+        # would unlink it when the worker exits even though the creator still owns it
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Tuple
+
+class SlidingDFT:
+    """Power spectrum of one frequency band over the last `size` samples.
+
+    Once the window is full each new sample updates only the band bins, so the
+    per-sample cost depends on the band width and not on the window length.
+    """
+
+    def __init__(self, size: int, fps: float, low_hz: float, high_hz: float,
+                 resync_interval: int = None):
+        self.size = size
+        self.fps = fps
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+
+        # Band bins and twiddle factors for the full window, computed once
+        freqs = np.fft.fftfreq(size, 1.0 / fps)
+        self.bins = np.where((freqs > low_hz) & (freqs < high_hz))[0]
+        self.freqs = freqs[self.bins]
+        self._twiddle = np.exp(2j * np.pi * self.bins / size)
+        self._kernel = np.exp(-2j * np.pi * np.outer(self.bins, np.arange(size)) / size)
+
+        # Recomputing the band exactly every so often stops rounding errors accumulating
+        self.resync_interval = resync_interval or size
+        self._since_resync = 0
+
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.size
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self._count:
+            return 0.0
+        variance = self._sum_sq / self._count - self.mean ** 2
+        return float(np.sqrt(variance)) if variance > 1e-12 else 0.0
+
+    def append(self, value: float):
+        """Add one sample, dropping the oldest once the window is full"""
+        value = float(value)
+        old = self._samples[self._next]
+        was_full = self.full
+
+        self._samples[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self._sum += value
+        self._sum_sq += value * value
+
+        if was_full:
+            self._sum -= old
+            self._sum_sq -= old * old
+            # X_k <- (X_k - x_oldest + x_new) * e^(j2pik/N)
+            self._spectrum = (self._spectrum + (value - old)) * self._twiddle
+            self._since_resync += 1
+            if self._since_resync >= self.resync_interval:
+                self._resync()
+        else:
+            self._count += 1
+            if self.full:
+                self._resync()
+
+    def clear(self):
+        self._samples[:] = 0.0
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._spectrum[:] = 0.0
+        self._since_resync = 0
+
+    def band_power(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(frequencies, power) of the band bins for the samples seen so far"""
+        if self.full:
+            return self.freqs, np.abs(self._spectrum) ** 2
+
+        # Still filling: the bins depend on the current length, so take a real FFT of what we have
+        if not self._count:
+            return np.empty(0), np.empty(0)
+        freqs = np.fft.fftfreq(self._count, 1.0 / self.fps)
+        bins = np.where((freqs > self.low_hz) & (freqs < self.high_hz))[0]
+        # Band bins are positive frequencies, which rfft returns at the same indices
+        spectrum = np.fft.rfft(self._samples[:self._count])[bins]
+        return freqs[bins], np.abs(spectrum) ** 2
+
+    def dominant(self) -> Tuple[float, float]:
+        """Strongest frequency in the band and its share of the band power"""
+        freqs, power = self.band_power()
+        total = np.sum(power)
+        if len(power) == 0 or total == 0:
+            return 0.0, 0.0
+
+        peak = np.argmax(power)
+        return float(freqs[peak]), float(power[peak] / total)
+
+    def _resync(self):
+        """Recompute the band bins exactly from the window"""
+        ordered = np.roll(self._samples, -self._next)
+        self._spectrum = self._kernel @ ordered
+        self._since_resync = 0
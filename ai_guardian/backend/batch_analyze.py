@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+AI Guardian - Offline Batch Analysis
+Runs the full detector pipeline over recorded video, split into time chunks across
+worker processes, and streams per-frame results to JSONL or columnar segment files
+"""
+
+import os
+import sys
+import cv2
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing as mp
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Tuple
+from app.models.metrics_store import HEALTH_FIELDS, SAFETY_FIELDS
+from app.utils.rule_engine import RISK_LEVELS
+from app.utils.segment_log import record_dtype
+
+# Columnar record fields after the timestamp; risk_level is an index into RISK_LEVELS
+COLUMNS = ('frame',) + HEALTH_FIELDS + SAFETY_FIELDS + ('risk_level', 'has_person')
+
+def probe(path: str) -> Tuple[int, float]:
+    """(frame count, fps) of a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f'Could not open video {path}')
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+def plan_chunks(frame_count: int, fps: float, chunk_seconds: float,
+                warmup_seconds: float) -> List[Tuple[int, int, int]]:
+    """(warm-up start, start, end) frame ranges. Frames from warm-up start to start only
+    fill the stateful buffers (rPPG, breathing, tremor, open alerts) and are not reported."""
+    chunk = max(int(chunk_seconds * fps), 1)
+    warmup = int(warmup_seconds * fps)
+    return [(max(start - warmup, 0), start, min(start + chunk, frame_count))
+            for start in range(0, frame_count, chunk)]
+
+def _alert_record(alert) -> Dict:
+    return {
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'message': alert.message,
+        'details': alert.details
+    }
+
+def analyze_chunk(task: Dict) -> Dict:
+    """Worker process: run a fresh PatientMonitor over one chunk and write its part file"""
+    from app.patient_monitor import PatientMonitor
+
+    warm_start, start, end = task['range']
+    fps = task['fps']
+    offset = task['start_time']
+    columnar = task['format'] == 'columnar'
+
+    cap = cv2.VideoCapture(task['video'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+    # Detectors run sequentially; the parallelism is across chunks
+    monitor = PatientMonitor(patient_id=task['patient_id'], patient_name=task['patient_id'], parallel=False)
+    session = monitor.patient_session
+
+    records = np.zeros(end - start, dtype=record_dtype(COLUMNS)) if columnar else None
+    frames = alerts = 0
+    started = time.perf_counter()
+
+    with open(task['part'], 'w') as out, open(task['part'] + '.alerts', 'w') as alert_out:
+        for index in range(warm_start, end):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t = index / fps
+            result = monitor.process_frame(frame, timestamp=t)
+            if index < start:
+                continue
+
+            has_person = result['detections']['pose']['has_person']
+            health = session.current_health_metrics
+            safety = session.current_safety_metrics
+            new_alerts = [dict(_alert_record(a), frame=index, t=t, time=offset + t)
+                          for a in result.get('alerts', [])]
+
+            if columnar:
+                row = records[frames]
+                row['timestamp'] = offset + t
+                row['frame'] = index
+                for name in HEALTH_FIELDS:
+                    row[name] = getattr(health, name)
+                for name in SAFETY_FIELDS:
+                    value = getattr(safety, name)
+                    row[name] = len(value) if name == 'dangerous_objects' else value
+                row['risk_level'] = RISK_LEVELS.index(session.risk_level)
+                row['has_person'] = has_person
+            else:
+                out.write(json.dumps({
+                    'frame': index,
+                    't': t,
+                    'time': offset + t,
+                    'has_person': has_person,
+                    'risk_level': session.risk_level,
+                    'health': {name: getattr(health, name) for name in HEALTH_FIELDS},
+                    'safety': {
+                        name: list(getattr(safety, name)) if name == 'dangerous_objects' else getattr(safety, name)
+                        for name in SAFETY_FIELDS
+                    },
+                    'alerts': new_alerts
+                }) + '\n')
+
+            for alert in new_alerts:
+                alert_out.write(json.dumps(alert) + '\n')
+            frames += 1
+            alerts += len(new_alerts)
+
+    cap.release()
+    monitor.release()
+    if columnar:
+        records[:frames].tofile(task['part'])
+
+    return {
+        'index': task['index'],
+        'part': task['part'],
+        'frames': frames,
+        'alerts': alerts,
+        'seconds': time.perf_counter() - started
+    }
+
+def analyze_video(path: str, pool, output_dir: str, fmt: str = 'jsonl', chunk_seconds: float = 300.0,
+                  warmup_seconds: float = 10.0, start_time: float = 0.0) -> Dict:
+    """Analyse one video; chunk results are appended to the output in order as they finish"""
+    frame_count, fps = probe(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    chunks = plan_chunks(frame_count, fps, chunk_seconds, warmup_seconds)
+    part_dir = tempfile.mkdtemp(prefix=f'{name}-', dir=output_dir)
+
+    tasks = [{
+        'index': index,
+        'video': path,
+        'patient_id': name,
+        'range': chunk,
+        'fps': fps,
+        'format': fmt,
+        'start_time': start_time,
+        'part': os.path.join(part_dir, f'{index:06d}.part')
+    } for index, chunk in enumerate(chunks)]
+
+    if fmt == 'columnar':
+        # Same layout as the live metric logs, so SegmentLogReader(output_dir, name) reads it
+        with open(os.path.join(output_dir, f'{name}.schema.json'), 'w') as f:
+            json.dump({'fields': list(COLUMNS), 'dtype': record_dtype(COLUMNS).descr,
+                       'risk_levels': list(RISK_LEVELS), 'fps': fps, 'video': path}, f)
+        output_path = os.path.join(output_dir, f'{name}-{int(start_time * 1000):015d}.seg')
+    else:
+        output_path = os.path.join(output_dir, f'{name}.jsonl')
+    alerts_path = os.path.join(output_dir, f'{name}.alerts.jsonl')
+
+    started = time.perf_counter()
+    frames = alerts = 0
+    try:
+        with open(output_path, 'wb') as out, open(alerts_path, 'wb') as alert_out:
+            for done in pool.imap(analyze_chunk, tasks):
+                for part, target in ((done['part'], out), (done['part'] + '.alerts', alert_out)):
+                    with open(part, 'rb') as f:
+                        shutil.copyfileobj(f, target)
+                    os.remove(part)
+                out.flush()
+                alert_out.flush()
+
+                frames += done['frames']
+                alerts += done['alerts']
+                elapsed = time.perf_counter() - started
+                print(f"   chunk {done['index'] + 1}/{len(tasks)} | {frames}/{frame_count} frames | "
+                      f"{frames / fps / elapsed if elapsed else 0:.1f}x real time")
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'video': path,
+        'output': output_path,
+        'alerts_output': alerts_path,
+        'frames': frames,
+        'alerts': alerts,
+        'video_seconds': frames / fps,
+        'wall_seconds': elapsed,
+        'speedup': frames / fps / elapsed if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='AI Guardian - Offline batch analysis of recorded video'
+    )
+    parser.add_argument(
+        'videos',
+        nargs='+',
+        help='Video files to analyse'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default='analysis',
+        help='Directory for results (default: analysis)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=('jsonl', 'columnar'),
+        default='jsonl',
+        help='One JSON line per frame, or fixed-record segment files (default: jsonl)'
+    )
+    parser.add_argument(
+        '--chunk-seconds',
+        type=float,
+        default=300.0,
+        help='Video seconds per worker task (default: 300)'
+    )
+    parser.add_argument(
+        '--warmup-seconds',
+        type=float,
+        default=10.0,
+        help='Unreported lead-in per chunk for the stateful detectors (default: 10)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes (default: one per core)'
+    )
+    parser.add_argument(
+        '--start-time',
+        type=str,
+        default=None,
+        help='ISO time of the first frame, to stamp results with wall-clock time'
+    )
+
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    start_time = datetime.fromisoformat(args.start_time).timestamp() if args.start_time else 0.0
+
+    print("=" * 70)
+    print("🛡️  AI GUARDIAN - Batch Analysis")
+    print("=" * 70)
+
+    # Spawned, not forked: the parent never loads the models
+    workers = args.workers or os.cpu_count() or 1
+    summaries = []
+    with mp.get_context('spawn').Pool(workers) as pool:
+        for path in args.videos:
+            print(f"\n🎞️  {path} ({workers} workers)")
+            try:
+                summary = analyze_video(
+                    path, pool, args.output_dir, args.format,
+                    args.chunk_seconds, args.warmup_seconds, start_time
+                )
+            except ValueError as e:
+                print(f"❌ {e}")
+                continue
+            summaries.append(summary)
+            print(f"✅ {summary['frames']} frames, {summary['alerts']} alerts in {summary['wall_seconds']:.1f}s "
+                  f"({summary['speedup']:.1f}x real time) -> {summary['output']}")
+
+    return 0 if len(summaries) == len(args.videos) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+AI Guardian - Pipeline Benchmark
+Drives PatientMonitor.process_frame from synthetic frames or a recorded clip (no camera)
+and reports per-stage latency percentiles, sustained FPS and peak RSS as JSON
+"""
+
+import os
+import sys
+import cv2
+import json
+import contextlib
+import time
+import platform
+import argparse
+import itertools
+import subprocess
+import numpy as np
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.config.settings import Config
+from app.models import pose_landmarks as pl
+from app.patient_monitor import PatientMonitor, object_backend_options
+from app.utils.session_recorder import SessionReplayer
+
+PERCENTILES = (50, 95, 99)
+
+def synthetic_frames(count: int, width: int = 640, height: int = 480, fps: float = 30.0,
+                     seed: int = 0) -> Iterator[Tuple[np.ndarray, float]]:
+    """Deterministic frames: noisy background, a face whose green channel pulses at
+    1.2 Hz (72 BPM) and a torso moving at 0.25 Hz (15 breaths/min)"""
+    rng = np.random.default_rng(seed)
+    background = np.zeros((height, width, 3), dtype=np.uint8)
+    background[:] = np.linspace(40, 120, width, dtype=np.uint8)[None, :, None]
+
+    for i in range(count):
+        t = i / fps
+        frame = background.copy()
+        cv2.add(frame, rng.integers(0, 8, frame.shape, dtype=np.uint8), dst=frame)
+
+        pulse = int(6 * np.sin(2 * np.pi * 1.2 * t))
+        cv2.ellipse(frame, (width // 2, height // 4), (50, 65), 0, 0, 360, (120, 150 + pulse, 200), -1)
+
+        chest = int(4 * np.sin(2 * np.pi * 0.25 * t))
+        cv2.rectangle(frame, (width // 2 - 90, height // 4 + 80 - chest),
+                      (width // 2 + 90, height - 60), (90, 60, 140), -1)
+        yield frame, t
+
+def video_frames(path: str, count: Optional[int] = None, loop: bool = False) -> Iterator[Tuple[np.ndarray, float]]:
+    """Frames of a recorded clip, timestamped from the clip's frame rate"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f'Could not open video {path}')
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    index = 0
+    try:
+        while count is None or index < count:
+            ok, frame = cap.read()
+            if not ok:
+                if not loop or index == 0:
+                    return
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            yield frame, index / fps
+            index += 1
+    finally:
+        cap.release()
+
+def standing_pose() -> np.ndarray:
+    """Upright (33, 4) pose used to exercise the person-gated detectors on synthetic frames"""
+    landmarks = np.zeros((pl.NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:] = (0.5, 0.5, 0.0, 1.0)
+    landmarks[pl.NOSE, :2] = (0.5, 0.25)
+    landmarks[pl.SHOULDERS, :2] = [(0.36, 0.42), (0.64, 0.42)]
+    landmarks[pl.HIPS, :2] = [(0.4, 0.75), (0.6, 0.75)]
+    landmarks[pl.WRISTS, :2] = [(0.33, 0.7), (0.67, 0.7)]
+    landmarks[pl.ANKLES, :2] = [(0.42, 0.98), (0.58, 0.98)]
+    return landmarks
+
+def use_synthetic_pose(monitor: PatientMonitor, landmarks: np.ndarray):
+    """Make the monitor's pose detector report `landmarks` after running for real, so the
+    person-gated stages are exercised (and timed) by process_frame on synthetic frames"""
+    detect_pose = monitor.pose_detector.detect_pose
+
+    def detect_with_override(frame, context=None):
+        frame, pose_data = detect_pose(frame, context)
+        return frame, dict(pose_data, landmarks=landmarks, has_person=True)
+    monitor.pose_detector.detect_pose = detect_with_override
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples, dtype=np.float64)
+    summary = {'count': len(values), 'mean_ms': float(values.mean()), 'max_ms': float(values.max())}
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{q}_ms'] = float(value)
+    return summary
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(frames: Iterator[Tuple[np.ndarray, float]], warmup: int = 30, parallel: bool = None,
+                  exercise_detectors: bool = False, seed: int = None) -> Dict:
+    """Process every frame; the first `warmup` frames are not measured"""
+    monitor = PatientMonitor(patient_id='BENCH', patient_name='Benchmark', parallel=parallel, seed=seed)
+    if exercise_detectors:
+        use_synthetic_pose(monitor, standing_pose())
+    stages: Dict[str, List[float]] = {}
+    measured = 0
+    person_frames = 0
+    wall = 0.0
+
+    try:
+        for index, (frame, timestamp) in enumerate(frames):
+            started = time.perf_counter()
+            result = monitor.process_frame(frame, timestamp=timestamp)
+            elapsed = time.perf_counter() - started
+
+            if index < warmup:
+                continue
+            measured += 1
+            wall += elapsed
+            person_frames += result['detections']['pose']['has_person']
+            for stage, ms in result['timings'].items():
+                stages.setdefault(stage, []).append(ms)
+    finally:
+        monitor.release()
+
+    return {
+        'frames': measured,
+        'frames_with_person': person_frames,
+        'wall_seconds': wall,
+        'fps': measured / wall if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': {stage: summarize(samples) for stage, samples in sorted(stages.items())}
+    }
+
+def print_report(report: Dict, baseline: Dict = None, out=sys.stdout):
+    results = report['results']
+    print(f"\n📊 {results['frames']} frames ({results['frames_with_person']} with a person) from {report['source']}",
+          file=out)
+    print(f"   Sustained: {results['fps']:.1f} FPS | Peak RSS: {results['peak_rss_mb'] or 0:.0f} MB", file=out)
+    print(f"\n   {'stage':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'count':>8}", file=out)
+    for stage, summary in results['stages'].items():
+        line = f"   {stage:<14}{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}{summary['count']:>8}"
+        previous = (baseline or {}).get('results', {}).get('stages', {}).get(stage)
+        if previous and previous['p50_ms']:
+            line += f"   p50 {100 * (summary['p50_ms'] / previous['p50_ms'] - 1):+.1f}%"
+        print(line, file=out)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='AI Guardian - Pipeline benchmark (no camera required)'
+    )
+    parser.add_argument(
+        '--video',
+        type=str,
+        default=None,
+        help='Recorded clip to replay (default: synthetic frames)'
+    )
+    parser.add_argument(
+        '--bundle',
+        type=str,
+        default=None,
+        help='Recorded session bundle to replay, with its seed (see session_replay.py)'
+    )
+    parser.add_argument(
+        '--frames',
+        type=int,
+        default=600,
+        help='Frames to measure after warm-up (default: 600)'
+    )
+    parser.add_argument(
+        '--warmup',
+        type=int,
+        default=30,
+        help='Unmeasured frames processed first (default: 30)'
+    )
+    parser.add_argument(
+        '--loop',
+        action='store_true',
+        help='Rewind the clip until --frames have been measured'
+    )
+    parser.add_argument(
+        '--width',
+        type=int,
+        default=640,
+        help='Synthetic frame width (default: 640)'
+    )
+    parser.add_argument(
+        '--height',
+        type=int,
+        default=480,
+        help='Synthetic frame height (default: 480)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Synthetic frame and detector seed (default: 0)'
+    )
+    parser.add_argument(
+        '--parallel',
+        action='store_const',
+        const=True,
+        default=None,
+        help='Run detectors on the thread pool (default: PARALLEL_DETECTORS)'
+    )
+    parser.add_argument(
+        '--sequential',
+        action='store_const',
+        const=False,
+        dest='parallel',
+        help='Run detectors one after another'
+    )
+    parser.add_argument(
+        '--no-detectors',
+        action='store_true',
+        help='Do not run the person-gated stages against a synthetic pose on synthetic frames'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Write the JSON report here (default: stdout)'
+    )
+    parser.add_argument(
+        '--compare',
+        type=str,
+        default=None,
+        help='Earlier JSON report to print p50 changes against'
+    )
+
+    args = parser.parse_args()
+
+    total = args.frames + args.warmup
+    seed = args.seed
+    if args.bundle:
+        replayer = SessionReplayer(args.bundle)
+        frames = itertools.islice(replayer.frames(), total)
+        source = f'bundle {args.bundle}'
+        seed = replayer.manifest['seed']
+    elif args.video:
+        frames = video_frames(args.video, total, loop=args.loop)
+        source = args.video
+    else:
+        frames = synthetic_frames(total, args.width, args.height, seed=args.seed)
+        source = f'synthetic {args.width}x{args.height} seed={args.seed}'
+
+    # With the report on stdout, anything the detectors print goes to stderr
+    with contextlib.redirect_stdout(sys.stderr if args.output is None else sys.stdout):
+        results = run_benchmark(
+            frames, warmup=args.warmup, parallel=args.parallel,
+            exercise_detectors=not args.no_detectors and not args.video and not args.bundle,
+            seed=seed
+        )
+    report = {
+        'created': datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'source': source,
+        'config': {
+            'parallel': Config.PARALLEL_DETECTORS if args.parallel is None else args.parallel,
+            'detector_rates': Config.DETECTOR_RATES,
+            'object_backend': object_backend_options()['backend'],
+            'breathing_flow_mode': Config.BREATHING_FLOW_MODE
+        },
+        'results': results
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_report(report, baseline)
+        print(f"\n✅ Report written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        # Keep stdout pure JSON; the human-readable table goes to stderr
+        print_report(report, baseline, out=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
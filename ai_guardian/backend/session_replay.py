@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+AI Guardian - Session Record & Replay
+Records frames plus every detector's output into a bundle, and replays a bundle
+through PatientMonitor to diff outputs and timings against the recording
+"""
+
+import sys
+import json
+import time
+import argparse
+from app.patient_monitor import PatientMonitor
+from app.utils.camera_utils import CameraManager
+from app.utils.session_recorder import SessionRecorder, SessionReplayer, compare_session
+
+def record(args) -> int:
+    if args.video:
+        import cv2
+        cap = cv2.VideoCapture(args.video)
+        if not cap.isOpened():
+            print(f"❌ Could not open video {args.video}")
+            return 1
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+        def read_video():
+            index = 0
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                # Video time, so the bundle does not depend on how fast it was processed
+                yield frame, index / fps
+                index += 1
+        source = read_video()
+    else:
+        camera_manager = CameraManager(camera_index=args.camera)
+        if not camera_manager.initialize():
+            print("❌ Failed to initialize camera. Exiting.")
+            camera_manager.release()
+            return 1
+
+        def read_camera():
+            while True:
+                frame = camera_manager.read_frame()
+                if frame is None:
+                    return
+                yield frame, camera_manager.last_capture_time
+        source = read_camera()
+
+    monitor = PatientMonitor(patient_id=args.patient_id, patient_name=args.patient_id,
+                             parallel=False, seed=args.seed)
+    recorder = SessionRecorder(args.bundle, monitor, image_format=args.image_format)
+    print(f"⏺️  Recording {args.frames} frames to {args.bundle} (seed {args.seed})")
+
+    try:
+        for frame, timestamp in source:
+            recorder.process(frame, timestamp)
+            if recorder.frames_recorded >= args.frames:
+                break
+    except KeyboardInterrupt:
+        print("\n⏹️  Recording interrupted")
+    finally:
+        recorder.close()
+        monitor.release()
+        if args.video:
+            cap.release()
+        else:
+            camera_manager.release()
+
+    print(f"✅ Recorded {recorder.frames_recorded} frames")
+    return 0
+
+def replay(args) -> int:
+    replayer = SessionReplayer(args.bundle)
+    manifest = replayer.manifest
+    print(f"▶️  Replaying {manifest['frames']} frames from {args.bundle} "
+          f"({'real time' if args.realtime else 'max speed'}, seed {manifest['seed']})")
+
+    started = time.perf_counter()
+    report = compare_session(replayer, realtime=args.realtime, tolerance=args.tolerance)
+    report['wall_seconds'] = time.perf_counter() - started
+
+    for difference in report['differences'][:10]:
+        print(f"   ≠ frame {difference['frame']} {difference['path']}: "
+              f"{difference['recorded']!r} -> {difference['replayed']!r}")
+    print(f"\n   {'stage':<14}{'rec p50':>10}{'new p50':>10}")
+    for stage, values in report['timings'].items():
+        before = values['recorded']['p50_ms'] if values['recorded'] else float('nan')
+        after = values['replayed']['p50_ms'] if values['replayed'] else float('nan')
+        print(f"   {stage:<14}{before:>10.2f}{after:>10.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report['identical']:
+        print(f"\n✅ {report['frames']} frames replayed, outputs identical")
+        return 0
+    print(f"\n❌ {report['frames_mismatched']}/{report['frames']} frames differ")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='AI Guardian - Record and replay monitoring sessions'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='Record a session bundle')
+    record_parser.add_argument('bundle', help='Bundle directory to create')
+    record_parser.add_argument('--camera', type=int, default=0, help='Camera device index (default: 0)')
+    record_parser.add_argument('--video', type=str, default=None, help='Record from a video file instead')
+    record_parser.add_argument('--frames', type=int, default=300, help='Frames to record (default: 300)')
+    record_parser.add_argument('--seed', type=int, default=0, help='Detector random seed (default: 0)')
+    record_parser.add_argument('--patient-id', type=str, default='P001', help='Patient ID (default: P001)')
+    record_parser.add_argument(
+        '--image-format', choices=('png', 'jpg'), default='png',
+        help='png is lossless and replays exactly; jpg is smaller (default: png)'
+    )
+
+    replay_parser = commands.add_parser('replay', help='Replay a bundle and diff the outputs')
+    replay_parser.add_argument('bundle', help='Bundle directory')
+    replay_parser.add_argument('--realtime', action='store_true', help='Pace frames at the recorded rate')
+    replay_parser.add_argument('--tolerance', type=float, default=1e-6,
+                               help='Absolute tolerance for numeric outputs (default: 1e-6)')
+    replay_parser.add_argument('--output', type=str, default=None, help='Write the JSON report here')
+
+    args = parser.parse_args()
+    return record(args) if args.command == 'record' else replay(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -159,6 +159,219 @@ def test_camera_utils():
         traceback.print_exc()
         return False
 
+def test_ring_buffer():
+    """Test bounded session histories"""
+    print("🧪 Testing ring buffer histories...")
+    
+    try:
+        from app.utils.ring_buffer import RingBuffer
+        from app.models.patient import PatientSession, HealthMetrics
+        
+        spilled = []
+        buffer = RingBuffer(3, spill=spilled.extend, spill_batch=2)
+        buffer.extend(range(6))
+        assert buffer.to_list() == [3, 4, 5] and buffer[-1] == 5
+        assert spilled == [0, 1]
+        buffer.flush()
+        assert spilled == [0, 1, 2]
+        print(f"  ✓ Eviction and spill: kept {buffer.to_list()}, spilled {spilled}")
+        
+        buffer.append(6)  # evicts 3 into a half-full spill batch
+        buffer.clear()
+        buffer.flush()
+        assert spilled == [0, 1, 2] and len(buffer) == 0
+        print("  ✓ Clear drops pending spills")
+        
+        session = PatientSession("P001", "Test Patient", history_size=10)
+        for _ in range(25):
+            session.update_health_metrics(HealthMetrics(heart_rate=72))
+        assert len(session.health_metrics_history) == 10
+        print(f"  ✓ Session history bounded: {len(session.health_metrics_history)} of "
+              f"{session.health_metrics_history.total_count} kept")
+        
+        import os, json, tempfile
+        from app.models.patient import Alert
+        with tempfile.TemporaryDirectory() as log_dir:
+            session = PatientSession("P002", "Test Patient", alert_history_size=2)
+            session.attach_metric_log(log_dir)
+            for i in range(5):
+                session.alerts_history.append(Alert(f"TEST_{i}", "LOW", "test"))
+            session.close_metric_log()
+            with open(os.path.join(log_dir, "P002", "alerts.jsonl")) as f:
+                logged = [json.loads(line)['alert_type'] for line in f]
+        assert logged == ["TEST_0", "TEST_1", "TEST_2"]
+        print(f"  ✓ Evicted alerts written to the alert log: {logged}")
+        
+        print("✅ Ring buffer test passed\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ring buffer test failed: {e}\n")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_metrics_store():
+    """Test columnar metric storage and rollups"""
+    print("🧪 Testing metrics store...")
+    
+    try:
+        from app.models.metrics_store import MetricsStore
+        
+        store = MetricsStore(('heart_rate',), chunk_size=16)
+        for i in range(120):
+            store.append(1000.0 + i * 0.5, {'heart_rate': 60 + i % 10})
+        
+        window = store.range(1010.0, 1020.0)
+        assert len(window['timestamp']) == 20
+        print(f"  ✓ Range slice: {len(window['timestamp'])} samples")
+        
+        rollup = store.rollup('1min')
+        assert rollup['count'].sum() == 120
+        print(f"  ✓ 1 min rollup: {len(rollup['timestamp'])} buckets, "
+              f"max HR {rollup['heart_rate']['max'].max():.0f}")
+        
+        # Older samples than memory holds come back from the segment logs
+        import tempfile
+        from app.models.patient import PatientSession
+        from app.models.metrics_store import HEALTH_FIELDS
+        with tempfile.TemporaryDirectory() as log_dir:
+            session = PatientSession("P001", "Test Patient")
+            session.health_store = MetricsStore(HEALTH_FIELDS, chunk_size=16, max_rows=32)
+            session.attach_metric_log(log_dir)
+            for i in range(120):
+                session.health_store.append(1000.0 + i * 0.5, {'heart_rate': 60 + i % 10})
+            session.close_metric_log()
+            assert len(session.health_store) < 120
+            history = session.metric_rollup('health', '1min')
+            assert history['count'].sum() == 120 and history['heart_rate']['max'].max() == 69
+            print(f"  ✓ History beyond memory: {len(session.health_store)} samples in memory, "
+                  f"{history['count'].sum()} rolled up with the segment logs")
+        
+        print("✅ Metrics store test passed\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Metrics store test failed: {e}\n")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_frame_context():
+    """Test shared per-frame conversions"""
+    print("🧪 Testing frame context...")
+    
+    try:
+        from app.utils.frame_context import FrameContext
+        
+        dummy_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        context = FrameContext(dummy_frame)
+        
+        # Repeated access must reuse the first conversion
+        assert context.gray is context.gray
+        assert context.rgb.shape == (480, 640, 3)
+        print(f"  ✓ Lazy conversions: {context.conversions}")
+        
+        level2 = context.gray_pyramid(2)
+        assert level2.shape == (120, 160)
+        print(f"  ✓ Pyramid level 2: {level2.shape}")
+        
+        print("✅ Frame context test passed\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Frame context test failed: {e}\n")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_sliding_dft():
+    """Test the incremental band spectrum against a full FFT"""
+    print("🧪 Testing sliding DFT...")
+    
+    try:
+        from app.utils.spectral import SlidingDFT
+        
+        fps = 30
+        estimator = SlidingDFT(150, fps, 0.7, 4.0)
+        signal = 100 + np.sin(2 * np.pi * 1.2 * np.arange(400) / fps)
+        for value in signal:
+            estimator.append(value)
+        
+        window = signal[-150:]
+        freqs = np.fft.fftfreq(150, 1.0 / fps)
+        idx = np.where((freqs > 0.7) & (freqs < 4.0))[0]
+        expected = np.abs(np.fft.fft(window)[idx]) ** 2
+        _, power = estimator.band_power()
+        assert np.allclose(power, expected)
+        
+        freq, confidence = estimator.dominant()
+        assert abs(freq - 1.2) < 1e-9
+        print(f"  ✓ Dominant frequency: {freq:.2f} Hz ({freq * 60:.0f} BPM), share {confidence:.2f}")
+        
+        print("✅ Sliding DFT test passed\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Sliding DFT test failed: {e}\n")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_rule_engine():
+    """Test batched rule evaluation and alert transitions"""
+    print("🧪 Testing rule engine...")
+    
+    try:
+        from app.utils.rule_engine import RuleEngine
+        from app.models.patient import PatientSession, HealthMetrics, SafetyMetrics
+        
+        engine = RuleEngine()
+        sessions = [PatientSession(f"P{i:03d}", f"Patient {i}") for i in range(3)]
+        for session in sessions:
+            session.update_health_metrics(HealthMetrics(heart_rate=80))
+        sessions[0].update_safety_metrics(SafetyMetrics(fall_risk=0.75))
+        sessions[1].update_health_metrics(HealthMetrics(heart_rate=35))
+        sessions[2].update_safety_metrics(SafetyMetrics(dangerous_objects=['knife']))
+        
+        raised = engine.evaluate(sessions)
+        assert [[a.alert_type for a in alerts] for alerts in raised] == [
+            ['FALL_CRITICAL'], ['LOW_HEART_RATE'], ['DANGEROUS_OBJECT']
+        ]
+        assert [s.risk_level for s in sessions] == ['HIGH', 'CRITICAL', 'MEDIUM']
+        print(f"  ✓ {len(sessions)} sessions evaluated in one pass")
+        
+        # A condition that persists stays open without raising again
+        raised = engine.evaluate(sessions)
+        assert not any(raised) and all(len(s.current_alerts) == 1 for s in sessions)
+        
+        sessions[0].update_safety_metrics(SafetyMetrics(fall_risk=0.1))
+        raised = engine.evaluate(sessions)
+        assert not any(raised) and not sessions[0].current_alerts
+        print("  ✓ Alerts raised on transitions only")
+        
+        # Hysteresis holds the alert just below the threshold; a quick re-raise after clearing
+        # re-opens the same alert and is reported again
+        from app.utils.alert_system import AlertSystem, AlertThrottle
+        alert_system = AlertSystem(throttle=AlertThrottle(cooldown=30.0))
+        session = sessions[0]
+        raised = []
+        for t, fall_risk in enumerate([0.75, 0.65, 0.75, 0.1, 0.75, 0.1]):
+            session.update_safety_metrics(SafetyMetrics(fall_risk=fall_risk))
+            raised += alert_system.engine.evaluate([session], now=float(t))[0]
+        assert len(raised) == 2 and raised[0] is raised[1] and not session.current_alerts
+        assert raised[0].repeat_count == 3 and alert_system.get_stats()['alerts_reopened'] == 1
+        print(f"  ✓ 6 evaluations, 1 alert re-opened once, {raised[0].repeat_count} repeats")
+        
+        print("✅ Rule engine test passed\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Rule engine test failed: {e}\n")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def test_configuration():
     """Test configuration loading"""
     print("🧪 Testing configuration...")
@@ -223,9 +436,14 @@ def main():
     
     results.append(("Imports", test_imports()))
     results.append(("Data Models", test_data_models()))
+    results.append(("Ring Buffer", test_ring_buffer()))
+    results.append(("Metrics Store", test_metrics_store()))
     results.append(("Configuration", test_configuration()))
     results.append(("Alert System", test_alert_system()))
     results.append(("Camera Utils", test_camera_utils()))
+    results.append(("Frame Context", test_frame_context()))
+    results.append(("Sliding DFT", test_sliding_dft()))
+    results.append(("Rule Engine", test_rule_engine()))
     results.append(("Detectors", test_detectors()))
     
     # Summary